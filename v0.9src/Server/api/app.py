@@ -1,11 +1,13 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from pydantic import BaseModel, root_validator
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel, conint, root_validator
 
 import os
 import re
+import json
+import asyncio
 import difflib
 from pathlib import Path
 from typing import Optional, List
@@ -29,8 +31,25 @@ except Exception:
                 os.environ.setdefault(_k.strip(), _v.strip().strip("\"'"))
                 
 # from langChain_v3.RAGLLM.llm_runtime import get_llm
-from langChain_v3.RAGLLM.rag_llm_for_server import answer_with_rag_for_server
-from langChain_v3.RAGLLM.llm_service import generate_answer
+from langChain_v3.RAGLLM.rag_llm_for_server import (
+    answer_with_rag_for_server_async,
+    shutdown_for_server,
+    stream_answer_with_rag_for_server,
+    warmup_for_server,
+)
+from langChain_v3.RAGLLM.llm_service import agenerate_answer, astream_answer
+from langChain_v3.retrieval_engine import get_retrieval_engine
+from langChain_v3.index_bundle import process_memory
+from langChain_v3.RAGLLM.reranker import loaded_rerankers
+from langChain_v3.RAGLLM.rerank_policy import get_rerank_policy
+from langChain_v3.RAGLLM.answer_cache import get_answer_cache
+from langChain_v3.context_cache import get_context_cache
+from langChain_v3.rerank_cache import get_rerank_cache
+from langChain_v3.fanout import get_fanout_executor
+from langChain_v3.shard_router import SHARDED_RETRIEVAL_ENABLED, get_shard_router
+from langChain_v3.lexical_index import get_lexical_index
+from langChain_v3.query_cache import log_query
+from langChain_v3.RAGLLM.rag import semantic_search_batch
 
 
 # ===============================
@@ -53,6 +72,26 @@ DEBUG_RAG_ERRORS = os.getenv("DEBUG_RAG_ERRORS", "1").strip().lower() in {"1", "
 #     print("[Server] Loading LLM once...")
 #     get_llm()
 
+@app.on_event("startup")
+def preload_retrieval():
+    # FAISS 인덱스 + 임베딩 모델 + 리랭커는 워커 프로세스당 1번만 로드
+    if not RAG_ENABLED:
+        return
+    try:
+        warmup_for_server()
+    except Exception as e:
+        # 인덱스가 아직 없더라도 서버는 뜨게 두고, 첫 요청 때 다시 시도
+        print("[Server] retrieval preload failed:", repr(e))
+
+@app.on_event("shutdown")
+def save_caches():
+    if not RAG_ENABLED:
+        return
+    try:
+        shutdown_for_server()
+    except Exception as e:
+        print("[Server] cache save failed:", repr(e))
+
 # ===============================
 # Request Model
 # ===============================
@@ -68,10 +107,34 @@ class ChatRequest(BaseModel):
         values["message"] = str(msg)
         return values
 
+class BatchSearchRequest(BaseModel):
+    queries: List[str]
+    # 질의 수 × k × 문맥 창만큼 DB 조회/응답이 커지므로 범위 제한 (범위 밖이면 422)
+    k: conint(ge=1, le=50) = 5
+    window: conint(ge=0, le=5) = 1
+
+
 @app.get("/api/health")
 def health():
     return {"status": "ok"}
 
+@app.get("/api/diagnostics")
+def diagnostics():
+    return {
+        "status": "ok",
+        # 워커별 RSS (여러 워커면 요청마다 다른 pid가 응답할 수 있음)
+        "process": process_memory(),
+        "retrieval": get_retrieval_engine().info(),
+        "rerankers": loaded_rerankers(),
+        "rerank_policy": get_rerank_policy().stats(),
+        "rerank_cache": get_rerank_cache().stats(),
+        "fanout": get_fanout_executor().stats(),
+        "shards": get_shard_router().info() if SHARDED_RETRIEVAL_ENABLED else None,
+        "context_cache": get_context_cache().stats(),
+        "lexical_index": get_lexical_index().stats(),
+        "answer_cache": get_answer_cache().stats(),
+    }
+
 @app.get("/api/chat")
 def chat_info():
     return {"status": "ok", "detail": "Use POST /api/chat with a message."}
@@ -186,9 +249,9 @@ CATEGORY_RESPONSES = {
 #         if DEBUG_RAG_ERRORS:
 #             resp["rag_error"] = repr(e)
 #         return resp
-@app.post("/api/chat")
-async def chat(req: ChatRequest):
-    msg = re.sub(r"[^\w가-힣]", "", req.message.strip())
+def match_category(message: str) -> Optional[dict]:
+    """규칙 기반 카테고리 응답 (정확/포함 → 초성 → 오타 보정). 없으면 None."""
+    msg = re.sub(r"[^\w가-힣]", "", message.strip())
     categories = list(CATEGORY_RESPONSES.keys())
 
     # 1) 카테고리 매칭
@@ -228,9 +291,19 @@ async def chat(req: ChatRequest):
             "reply": data["reply"],
         }
 
+    return None
+
+
+@app.post("/api/chat")
+async def chat(req: ChatRequest):
+    # 1) ~ 3) 규칙 기반 카테고리 응답
+    category_resp = match_category(req.message)
+    if category_resp is not None:
+        return category_resp
+
     # 4) fallback
     if not RAG_ENABLED:
-        answer = generate_answer(
+        answer = await agenerate_answer(
             system_prompt=(
                 "당신은 가천대학교 AI 챗봇입니다.\n"
                 "한국어 존댓말로 1~3문장으로 답변하세요."
@@ -239,8 +312,11 @@ async def chat(req: ChatRequest):
         )
         return {"type": "llm", "reply": answer, "used_rag": False}
 
+    log_query(req.message)
+
     try:
-        rag_result = answer_with_rag_for_server(
+        # 검색은 스레드로, LLM은 async 클라이언트로 → 이벤트 루프를 막지 않음
+        rag_result = await answer_with_rag_for_server_async(
             question=req.message,
             k=5
             )
@@ -249,10 +325,11 @@ async def chat(req: ChatRequest):
             "reply": rag_result["answer"],
             "contexts": rag_result.get("contexts", []),
             "used_rag": rag_result.get("used_rag", True),
+            "timed_out_sources": rag_result.get("timed_out_sources", []),
         }
 
     except Exception as e:
-        answer = generate_answer(
+        answer = await agenerate_answer(
             system_prompt=(
                 "당신은 가천대학교 AI 챗봇입니다.\n"
                 "한국어 존댓말로 1~3문장으로 답변하세요."
@@ -263,6 +340,85 @@ async def chat(req: ChatRequest):
         if DEBUG_RAG_ERRORS:
             resp["rag_error"] = repr(e)
         return resp
+
+
+@app.post("/api/search/batch")
+async def search_batch(req: BatchSearchRequest):
+    """
+    여러 질문의 검색 결과를 한 번에 반환 (평가 / FAQ 사전 생성용, LLM 호출 없음).
+    임베딩 1회 배치 + FAISS 다중 질의 search + DB 일괄 조회.
+    """
+    if not req.queries:
+        return {"results": []}
+    if len(req.queries) > 256:
+        raise HTTPException(status_code=413, detail="queries는 한 번에 256개까지 가능합니다.")
+    results = await asyncio.to_thread(
+        semantic_search_batch,
+        req.queries,
+        k=req.k,
+        window=req.window,
+    )
+    return {"results": results}
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@app.post("/api/chat/stream")
+async def chat_stream(req: ChatRequest):
+    """
+    Server-Sent Events 스트리밍 채팅.
+    event 순서: sources → token(여러 번) → done  (실패 시 error)
+    """
+
+    async def events():
+        category_resp = match_category(req.message)
+        if category_resp is not None:
+            yield _sse("done", category_resp)
+            return
+
+        if not RAG_ENABLED:
+            pieces = []
+            async for piece in astream_answer(
+                system_prompt=(
+                    "당신은 가천대학교 AI 챗봇입니다.\n"
+                    "한국어 존댓말로 1~3문장으로 답변하세요."
+                ),
+                user_prompt=req.message,
+            ):
+                pieces.append(piece)
+                yield _sse("token", {"text": piece})
+            yield _sse("done", {"type": "llm", "reply": "".join(pieces).strip(), "used_rag": False})
+            return
+
+        log_query(req.message)
+
+        try:
+            async for event, data in stream_answer_with_rag_for_server(
+                question=req.message,
+                k=5,
+            ):
+                if event == "done":
+                    data = {
+                        "type": "rag",
+                        "reply": data.get("answer", ""),
+                        "used_rag": data.get("used_rag", True),
+                        "timed_out_sources": data.get("timed_out_sources", []),
+                    }
+                yield _sse(event, data)
+        except Exception as e:
+            err = {"detail": "RAG streaming failed"}
+            if DEBUG_RAG_ERRORS:
+                err["rag_error"] = repr(e)
+            yield _sse("error", err)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # ===============================
 # React dist 서빙
 # ===============================
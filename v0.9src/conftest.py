@@ -0,0 +1,8 @@
+# pytest 설정: v0.9src를 import 루트로 사용 (langChain_v3.* 절대 import)
+# 모델/DB가 있어야 돌아가는 수동 실행 스크립트는 테스트로 수집하지 않는다.
+collect_ignore = [
+    "langChain_v3/RAGLLM/rag_test.py",
+    "langChain_v3/RAGLLM/test_llm_only.py",
+    "langChain_v3/RAGLLM/load_local_gpt_oss_test.py",
+]
+collect_ignore_glob = ["muhanchatbot-main/*", "eval_jo/*", "cleaningModule/*"]
@@ -1,11 +1,14 @@
 import json
 from datetime import datetime
 
-from rag_pipeline import run_retrieval, generate_answer
+from langChain_v3.RAGLLM.rag import semantic_search_batch
+from rag_pipeline import generate_answer
 # ↑ 이미 있는 함수들에 맞게 이름만 연결하면 됨
 
 TOP_K = 5
 MODEL_NAME = "gpt-4.1-mini"
+# 검색은 질문 여러 개를 묶어서 한 번에 (임베딩 1회 배치 + FAISS 다중 질의 + DB 일괄 조회)
+RETRIEVAL_BATCH_SIZE = 64
 
 def load_dataset(path):
     with open(path, "r", encoding="utf-8") as f:
@@ -16,16 +19,32 @@ def save_jsonl(path, rows):
         for r in rows:
             f.write(json.dumps(r, ensure_ascii=False) + "\n")
 
+def run_retrieval_batch(questions, top_k=TOP_K):
+    """질문 리스트 → 질문별 contexts = [{text, chunk_id, meta_id, score, url}, ...]"""
+    out = []
+    for start in range(0, len(questions), RETRIEVAL_BATCH_SIZE):
+        batch = questions[start:start + RETRIEVAL_BATCH_SIZE]
+        for results in semantic_search_batch(batch, k=top_k):
+            out.append([
+                {
+                    "text": r["context_text"],
+                    "chunk_id": r["chunk_id"],
+                    "meta_id": r["meta_id"],
+                    "score": r["score"],
+                    "url": r.get("url"),
+                } for r in results
+            ])
+    return out
+
 def main():
     dataset = load_dataset("eval_dataset.jsonl")
     eval_logs = []
 
-    for row in dataset:
-        question = row["question"]
+    # 1️⃣ Retrieval (전체 질문 배치 검색)
+    all_contexts = run_retrieval_batch([row["question"] for row in dataset], top_k=TOP_K)
 
-        # 1️⃣ Retrieval
-        contexts = run_retrieval(question, top_k=TOP_K)
-        # contexts = [{text, chunk_id, meta_id, score, url}, ...]
+    for row, contexts in zip(dataset, all_contexts):
+        question = row["question"]
 
         # 2️⃣ Answer generation
         answer = generate_answer(question, contexts)
@@ -0,0 +1,227 @@
+# langChain_v3/RAGLLM/answer_cache.py
+# 의미 기반 답변 캐시: 이전에 답한 질문과 충분히 비슷한(코사인 유사도) 질문이면
+# 검색/리랭크/LLM 호출 없이 저장된 답변을 그대로 돌려준다.
+import copy
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 기본 비활성: 짧은 한국어 질문은 연도/학기/학과만 달라도 임베딩 유사도가 0.95를 넘는 경우가 있어
+# 명시적으로 켰을 때만 사용한다 (켜더라도 answer_cache_version의 정확 일치 조건이 함께 걸린다)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "0").strip().lower() in {
+    "1",
+    "true",
+    "yes",
+    "on",
+}
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL_SEC = float(os.getenv("ANSWER_CACHE_TTL_SEC", str(6 * 3600)))
+ANSWER_CACHE_MAX_SIZE = int(os.getenv("ANSWER_CACHE_MAX_SIZE", "2000"))
+
+_NUMBER = re.compile(r"\d+")
+
+
+def answer_cache_version(
+    index_version: Optional[str],
+    question: str,
+    filters: Dict[str, Any],
+    **settings: Any,
+) -> str:
+    """
+    답변 재사용의 정확 일치 조건 (임베딩 유사도와 별도로 모두 같아야 hit).
+    - 인덱스 버전 + 검색 설정(k / window 등)
+    - 질문에서 추출한 필터 (연도 / source_type / 학과)
+    - 질문 속 숫자 전부: "2023 장학금" / "2024 장학금", "1학기" / "2학기"는 임베딩이 거의 같아도 다른 질문
+    """
+    parts = [str(index_version)]
+    parts += [f"{name}={settings[name]}" for name in sorted(settings)]
+    parts.append(f"filters={sorted(filters.items())}")
+    parts.append(f"numbers={_NUMBER.findall(question or '')}")
+    return ":".join(parts)
+
+
+def _as_unit_row(vec) -> np.ndarray:
+    arr = np.asarray(vec, dtype="float32").reshape(1, -1)
+    faiss.normalize_L2(arr)
+    return arr
+
+
+class _Entry:
+    def __init__(self, question: str, result: Dict[str, Any], index_version: Optional[str], latency: float):
+        self.question = question
+        self.result = result
+        self.index_version = index_version
+        self.latency = latency
+        self.created_at = time.time()
+
+
+class SemanticAnswerCache:
+    """
+    질문 임베딩 FAISS(IndexFlatIP + ID map) 기반 답변 캐시.
+
+    - 같은 버전(answer_cache_version: 인덱스 버전 + 필터 + 질문 속 숫자)에서 만들어진 답변만 재사용
+      버전마다 서브 인덱스를 따로 두고 그 안에서 threshold 이상인 항목을 전부(range_search) 보므로,
+      다른 버전/만료 항목이 아무리 가까이 많이 쌓여도 맞는 항목을 놓치지 않는다
+    - TTL 지난 항목은 조회 시 제거, 크기 상한을 넘으면 오래된 것부터 제거
+    - hit 시 원래 답변 생성에 걸렸던 시간을 saved_seconds로 누적
+    """
+
+    def __init__(
+        self,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        ttl_sec: float = ANSWER_CACHE_TTL_SEC,
+        max_size: int = ANSWER_CACHE_MAX_SIZE,
+    ):
+        self.threshold = threshold
+        self.ttl_sec = ttl_sec
+        self.max_size = max_size
+
+        self._indexes: Dict[Optional[str], faiss.IndexIDMap2] = {}
+        self._dim: Optional[int] = None
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        self.lookups = 0
+        self.hits = 0
+        self.saved_seconds = 0.0
+        self.expired = 0
+        self.evicted = 0
+
+    def _remove_ids(self, ids: List[int]) -> None:
+        by_version: Dict[Optional[str], List[int]] = {}
+        for i in ids:
+            entry = self._entries.pop(i, None)
+            if entry is not None:
+                by_version.setdefault(entry.index_version, []).append(i)
+        for version, version_ids in by_version.items():
+            index = self._indexes.get(version)
+            if index is None:
+                continue
+            index.remove_ids(np.asarray(version_ids, dtype="int64"))
+            if index.ntotal == 0:
+                del self._indexes[version]
+
+    def lookup(self, query_vec, index_version: Optional[str]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self.lookups += 1
+            index = self._indexes.get(index_version)
+            if index is None or index.ntotal == 0:
+                return None
+
+            q = _as_unit_row(query_vec)
+            if q.shape[1] != index.d:
+                return None
+
+            # 내적(코사인) >= threshold인 항목 전부, 유사도 높은 순
+            _, sims, ids = index.range_search(q, self.threshold)
+            order = np.argsort(-sims, kind="stable")
+            now = time.time()
+            stale: List[int] = []
+            found = None
+            for pos in order:
+                entry_id = int(ids[pos])
+                entry = self._entries.get(entry_id)
+                if entry is None:
+                    continue
+                if now - entry.created_at > self.ttl_sec:
+                    stale.append(entry_id)
+                    continue
+                found = (float(sims[pos]), entry)
+                break
+
+            self.expired += len(stale)
+            self._remove_ids(stale)
+
+            if found is None:
+                return None
+
+            sim, entry = found
+            self.hits += 1
+            self.saved_seconds += entry.latency
+
+        out = copy.deepcopy(entry.result)
+        out["answer_cache"] = {
+            "hit": True,
+            "similarity": round(sim, 4),
+            "cached_question": entry.question,
+        }
+        return out
+
+    def store(
+        self,
+        query_vec,
+        question: str,
+        result: Dict[str, Any],
+        index_version: Optional[str],
+        latency: float,
+    ) -> None:
+        if self.max_size <= 0:
+            return
+        v = _as_unit_row(query_vec)
+        with self._lock:
+            if self._dim is None:
+                self._dim = v.shape[1]
+            elif v.shape[1] != self._dim:
+                return
+            index = self._indexes.get(index_version)
+            if index is None:
+                index = self._indexes[index_version] = faiss.IndexIDMap2(faiss.IndexFlatIP(self._dim))
+
+            entry_id = self._next_id
+            self._next_id += 1
+            index.add_with_ids(v, np.asarray([entry_id], dtype="int64"))
+            self._entries[entry_id] = _Entry(question, copy.deepcopy(result), index_version, latency)
+
+            # 삽입 순서 = 생성 순서이므로 앞쪽의 TTL 만료 항목을 저장 시점에 정리
+            now = time.time()
+            expired = []
+            for old_id, old in self._entries.items():
+                if now - old.created_at <= self.ttl_sec:
+                    break
+                expired.append(old_id)
+            self._remove_ids(expired)
+
+            overflow = len(self._entries) - self.max_size
+            if overflow > 0:
+                oldest = list(self._entries.keys())[:overflow]
+                self.evicted += len(oldest)
+                self._remove_ids(oldest)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": ANSWER_CACHE_ENABLED,
+            "entries": len(self._entries),
+            "versions": len(self._indexes),
+            "max_size": self.max_size,
+            "threshold": self.threshold,
+            "ttl_sec": self.ttl_sec,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "saved_seconds": round(self.saved_seconds, 3),
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+
+_cache: Optional[SemanticAnswerCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> SemanticAnswerCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticAnswerCache()
+    return _cache
@@ -0,0 +1,131 @@
+# langChain_v3/RAGLLM/bench_onnx_reranker.py
+# PyTorch CrossEncoder vs ONNX int8 리랭커: 지연 시간 + 순위 일치도 비교
+#
+#   python -m langChain_v3.RAGLLM.bench_onnx_reranker --model Dongjin-kr/ko-reranker-base --k 20
+#   (--queries questions.txt 를 주지 않으면 아래 기본 질문 사용)
+import argparse
+import json
+import statistics
+import time
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from langChain_v3.RAGLLM.rag import semantic_search
+from langChain_v3.RAGLLM.reranker import get_reranker
+
+DEFAULT_QUERIES = [
+    "일반 휴학 최대 몇 학기까지 가능한가요?",
+    "복학 신청 기간은 언제인가요?",
+    "휴학원 양식은 어디서 받나요?",
+    "2025 교육과정 졸업 이수 학점",
+    "등록금 납부 기간은 언제인가요?",
+    "성적 이의신청 방법",
+    "수강신청 정정 기간",
+    "장학금 신청 자격",
+]
+
+
+def _ranks(scores: Sequence[float]) -> np.ndarray:
+    order = np.argsort(-np.asarray(scores))
+    ranks = np.empty(len(order), dtype="float64")
+    ranks[order] = np.arange(len(order))
+    return ranks
+
+
+def spearman(a: Sequence[float], b: Sequence[float]) -> float:
+    if len(a) < 2:
+        return 1.0
+    ra, rb = _ranks(a), _ranks(b)
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+
+def _timed(reranker, pairs, repeat: int) -> List[float]:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        reranker.predict(pairs)
+        times.append((time.perf_counter() - t0) * 1000.0)
+    return times
+
+
+def run(model_name: str, queries: List[str], k: int, top_n: int, repeat: int) -> Dict:
+    torch_rr = get_reranker(model_name, device="cpu", backend="torch")
+    onnx_rr = get_reranker(model_name, backend="onnx")
+
+    per_query = []
+    torch_ms: List[float] = []
+    onnx_ms: List[float] = []
+    for q in queries:
+        rows = semantic_search(q, k=k)
+        pairs = [(q, r["chunk_text"]) for r in rows if r.get("chunk_text")]
+        if not pairs:
+            continue
+
+        # 워밍업 1회 후 측정
+        torch_rr.predict(pairs)
+        onnx_rr.predict(pairs)
+        t_times = _timed(torch_rr, pairs, repeat)
+        o_times = _timed(onnx_rr, pairs, repeat)
+        torch_ms.extend(t_times)
+        onnx_ms.extend(o_times)
+
+        ts = torch_rr.predict(pairs)
+        ox = onnx_rr.predict(pairs)
+        t_top = np.argsort(-np.asarray(ts))[:top_n].tolist()
+        o_top = np.argsort(-np.asarray(ox))[:top_n].tolist()
+        per_query.append(
+            {
+                "query": q,
+                "pairs": len(pairs),
+                "torch_ms": round(statistics.median(t_times), 2),
+                "onnx_ms": round(statistics.median(o_times), 2),
+                "top1_agree": bool(t_top[0] == o_top[0]),
+                f"top{top_n}_overlap": len(set(t_top) & set(o_top)) / float(len(t_top)),
+                "spearman": round(spearman(ts, ox), 4),
+            }
+        )
+
+    if not per_query:
+        return {"model": model_name, "queries": 0}
+
+    return {
+        "model": model_name,
+        "queries": len(per_query),
+        "k": k,
+        "onnx": onnx_rr.info(),
+        "torch_ms_p50": round(statistics.median(torch_ms), 2),
+        "onnx_ms_p50": round(statistics.median(onnx_ms), 2),
+        "speedup": round(statistics.median(torch_ms) / statistics.median(onnx_ms), 2),
+        "top1_agreement": round(sum(r["top1_agree"] for r in per_query) / len(per_query), 4),
+        f"top{top_n}_overlap": round(statistics.mean(r[f"top{top_n}_overlap"] for r in per_query), 4),
+        "spearman_mean": round(statistics.mean(r["spearman"] for r in per_query), 4),
+        "per_query": per_query,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PyTorch vs ONNX int8 cross-encoder benchmark")
+    parser.add_argument("--model", default="Dongjin-kr/ko-reranker-base")
+    parser.add_argument("--queries", help="질문 파일 (한 줄에 하나)")
+    parser.add_argument("--k", type=int, default=20, help="질문당 리랭크할 후보 수")
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    report = run(args.model, queries, k=args.k, top_n=args.top_n, repeat=args.repeat)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
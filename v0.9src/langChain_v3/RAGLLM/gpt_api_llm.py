@@ -1,18 +1,46 @@
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 import os
 
 class GPTAPILLM:
     def __init__(self, model="gpt-4.1"):
         self.client = OpenAI(api_key=os.environ["AI_03_InfoVerse_API_KEY"])
+        # 비동기 서버 경로(/api/chat)용 클라이언트: 이벤트 루프를 막지 않음
+        self.async_client = AsyncOpenAI(api_key=os.environ["AI_03_InfoVerse_API_KEY"])
         self.model = model
 
+    def _messages(self, system_prompt: str, user_prompt: str):
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+
     def generate(self, system_prompt: str, user_prompt: str) -> str:
         resp = self.client.chat.completions.create(
             model=self.model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
+            messages=self._messages(system_prompt, user_prompt),
+            temperature=0.3,
+        )
+        return resp.choices[0].message.content.strip()
+
+    async def agenerate(self, system_prompt: str, user_prompt: str) -> str:
+        resp = await self.async_client.chat.completions.create(
+            model=self.model,
+            messages=self._messages(system_prompt, user_prompt),
             temperature=0.3,
         )
         return resp.choices[0].message.content.strip()
+
+    async def astream(self, system_prompt: str, user_prompt: str):
+        """stream=True로 토큰(delta)이 도착하는 대로 yield"""
+        stream = await self.async_client.chat.completions.create(
+            model=self.model,
+            messages=self._messages(system_prompt, user_prompt),
+            temperature=0.3,
+            stream=True,
+        )
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
@@ -20,6 +20,8 @@
 #     llm = get_llm()          # 🔥 여기서 단 한 번만 로드됨
 #     return llm.generate(system_prompt, user_prompt)
 
+import asyncio
+
 from langChain_v3.RAGLLM.gpt_api_llm import GPTAPILLM
 
 _llm = None
@@ -32,4 +34,55 @@ def get_llm():
 
 def generate_answer(system_prompt, user_prompt):
     llm = get_llm()
-    return llm.generate(system_prompt, user_prompt)
\ No newline at end of file
+    return llm.generate(system_prompt, user_prompt)
+
+async def agenerate_answer(system_prompt, user_prompt):
+    """
+    비동기 버전: async 클라이언트가 있으면 그대로 await,
+    없으면(로컬 모델 등) 스레드로 넘겨 이벤트 루프를 막지 않는다.
+    """
+    llm = get_llm()
+    if hasattr(llm, "agenerate"):
+        return await llm.agenerate(system_prompt, user_prompt)
+    return await asyncio.to_thread(llm.generate, system_prompt, user_prompt)
+
+async def astream_answer(system_prompt, user_prompt):
+    """
+    토큰 스트리밍 버전.
+    - OpenAI(GPTAPILLM): stream=True async 스트림
+    - 로컬 모델(LocalOSSModel.stream): 동기 제너레이터를 스레드에서 돌리며 큐로 전달
+    - 둘 다 없으면 전체 답변을 한 번에 yield
+    """
+    llm = get_llm()
+
+    if hasattr(llm, "astream"):
+        async for piece in llm.astream(system_prompt, user_prompt):
+            yield piece
+        return
+
+    if hasattr(llm, "stream"):
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        def _produce():
+            try:
+                for piece in llm.stream(system_prompt, user_prompt):
+                    loop.call_soon_threadsafe(queue.put_nowait, piece)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        producer = loop.run_in_executor(None, _produce)
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+        await producer
+        return
+
+    yield await agenerate_answer(system_prompt, user_prompt)
@@ -6,14 +6,20 @@ os.environ.setdefault("USE_TF", "0")
 os.environ.setdefault("TRANSFORMERS_NO_TF", "1")
 
 import torch
+import threading
+from queue import Empty
 from transformers import (
     AutoTokenizer,
     AutoModelForCausalLM,
     BitsAndBytesConfig,
     pipeline,
     AutoConfig,
+    TextIteratorStreamer,
 )
 
+# stream(): 다음 토큰 조각을 기다리는 최대 시간(초). 넘기면 TimeoutError (생성 스레드가 멈춘 경우 대비)
+LOCAL_LLM_STREAM_TIMEOUT_SEC = float(os.getenv("LOCAL_LLM_STREAM_TIMEOUT_SEC", "120"))
+
 def load_local_gpt_oss(
     model_path: str = "/home/t25315/models/gpt-oss-20b-bf16",
     max_new_tokens: int = 256,
@@ -175,4 +181,53 @@ def load_local_gpt_oss(
 
             return text
 
+        def stream(self, system_prompt: str, user_prompt: str):
+            """
+            generate()와 같은 설정으로 생성하되, TextIteratorStreamer로
+            디코딩된 토큰 조각을 생성되는 즉시 yield.
+
+            생성 스레드에서 예외(OOM 등)가 나도 streamer를 닫아 소비 쪽이 멈추지 않게 하고,
+            스트림이 끝난 뒤 그 예외를 다시 던진다.
+            """
+            prompt = self._build_prompt(system_prompt, user_prompt)
+            streamer = TextIteratorStreamer(
+                self.tok,
+                skip_prompt=True,
+                skip_special_tokens=True,
+                timeout=LOCAL_LLM_STREAM_TIMEOUT_SEC,
+            )
+            error = []
+
+            def _run():
+                try:
+                    self.pipe(
+                        prompt,
+                        max_new_tokens=self.max_new_tokens,
+                        do_sample=False,
+                        repetition_penalty=1.10,
+                        return_full_text=False,
+                        eos_token_id=self.eos_ids,
+                        pad_token_id=self.tok.pad_token_id,
+                        streamer=streamer,
+                    )
+                except BaseException as e:
+                    error.append(e)
+                finally:
+                    # 정상 종료 시 generate가 이미 end()를 불렀어도 종료 신호가 하나 더 쌓일 뿐 무해
+                    streamer.end()
+
+            worker = threading.Thread(target=_run, daemon=True)
+            worker.start()
+            try:
+                for piece in streamer:
+                    if piece:
+                        yield piece
+            except Empty:
+                raise TimeoutError(
+                    f"로컬 LLM 스트림이 {LOCAL_LLM_STREAM_TIMEOUT_SEC:.0f}초 동안 토큰을 내지 않았습니다."
+                ) from None
+            worker.join()
+            if error:
+                raise error[0]
+
     return LocalOSSModel(pipe, tok, max_new_tokens, eos_ids, debug_print)
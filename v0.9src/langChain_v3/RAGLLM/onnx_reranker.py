@@ -0,0 +1,185 @@
+# langChain_v3/RAGLLM/onnx_reranker.py
+# GPU 없는 서버용 Cross-Encoder 백엔드: ONNX export + 동적 int8 양자화 + ONNX Runtime(CPU) 추론
+# (질문, 청크) 쌍은 최대 길이로 자르고 길이순으로 묶어 padding을 줄인다.
+import logging
+import os
+import re
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl  # type: ignore
+except ImportError:  # Windows: 잠금 없이 임시 디렉터리 + os.replace만
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_AIDATA_DIR = Path(__file__).resolve().parents[2] / "aidata"
+ONNX_RERANK_DIR = os.getenv("ONNX_RERANK_DIR", str(_AIDATA_DIR / "onnx_rerankers")).strip()
+RERANK_MAX_LENGTH = int(os.getenv("RERANK_MAX_LENGTH", "512"))
+RERANK_ONNX_BATCH_SIZE = int(os.getenv("RERANK_ONNX_BATCH_SIZE", "16"))
+# 0이면 onnxruntime 기본값(물리 코어 수)
+RERANK_ONNX_THREADS = int(os.getenv("RERANK_ONNX_THREADS", "0"))
+
+_FP32_FILE = "model.onnx"
+_INT8_FILE = "model.int8.onnx"
+
+
+def _model_dir(model_name: str) -> Path:
+    return Path(ONNX_RERANK_DIR) / re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name)
+
+
+@contextmanager
+def _export_lock(out_dir: Path):
+    """
+    같은 모델의 export를 워커 프로세스 사이에서 직렬화하는 파일 잠금 (<모델 디렉터리>.lock).
+    먼저 잡은 워커가 export하고, 나머지는 기다렸다가 완성된 파일을 로드한다.
+    """
+    out_dir.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_dir.parent / f"{out_dir.name}.lock", "a+") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def export_onnx_reranker(model_name: str, out_dir: Path, quantize: bool = True) -> Path:
+    """
+    HF Cross-Encoder → ONNX(fp32) export → 동적 int8 양자화.
+    토크나이저도 같은 디렉터리에 저장해 서버에서는 torch 없이 로드할 수 있게 한다.
+    export는 임시 디렉터리에서 끝낸 뒤 파일별 os.replace로 옮기고, 추론에 쓸 ONNX 파일을
+    마지막에 옮긴다 → 그 파일이 보이면 토크나이저까지 완성된 상태 (반쯤 쓴 파일을 로드하지 않음).
+    반환: 추론에 쓸 ONNX 파일 경로
+    """
+    import torch  # type: ignore
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer  # type: ignore
+
+    tmp_dir = out_dir.parent / f".{out_dir.name}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    try:
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        model.eval()
+
+        sample = tokenizer(["질문"], ["문서"], return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+        dynamic_axes = {name: {0: "batch", 1: "seq"} for name in input_names}
+        dynamic_axes["logits"] = {0: "batch"}
+
+        fp32_path = tmp_dir / _FP32_FILE
+        logger.info("[RERANK-ONNX] export: %s → %s", model_name, out_dir / _FP32_FILE)
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(sample[name] for name in input_names),
+                str(fp32_path),
+                input_names=input_names,
+                output_names=["logits"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+            )
+        tokenizer.save_pretrained(str(tmp_dir))
+
+        target = _FP32_FILE
+        if quantize:
+            from onnxruntime.quantization import QuantType, quantize_dynamic  # type: ignore
+
+            target = _INT8_FILE
+            logger.info("[RERANK-ONNX] 동적 int8 양자화: %s", out_dir / _INT8_FILE)
+            quantize_dynamic(str(fp32_path), str(tmp_dir / _INT8_FILE), weight_type=QuantType.QInt8)
+
+        out_dir.mkdir(parents=True, exist_ok=True)
+        names = [p.name for p in tmp_dir.iterdir() if p.is_file()]
+        for name in sorted(names, key=lambda n: n == target):
+            os.replace(tmp_dir / name, out_dir / name)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return out_dir / target
+
+
+class OnnxReranker:
+    """
+    WarmReranker와 같은 predict(pairs) 인터페이스의 ONNX Runtime 리랭커.
+
+    - 최초 생성 시 aidata/onnx_rerankers/<모델명>/ 에 export/양자화 결과가 없으면 만든다.
+      (여러 워커가 동시에 떠도 파일 잠금으로 한 워커만 export하고, 결과는 원자적으로 옮긴다)
+    - ONNX Runtime 세션은 스레드 안전하므로 predict에 락을 걸지 않는다.
+    - 점수는 CrossEncoder.predict와 같게 라벨 1개 모델이면 sigmoid를 적용한다.
+    """
+
+    backend = "onnx"
+
+    def __init__(
+        self,
+        model_name: str,
+        quantize: bool = True,
+        max_length: int = RERANK_MAX_LENGTH,
+        batch_size: int = RERANK_ONNX_BATCH_SIZE,
+    ):
+        try:
+            import onnxruntime as ort  # type: ignore
+            from transformers import AutoTokenizer  # type: ignore
+        except Exception as e:
+            raise ImportError("ONNX reranker requires onnxruntime and transformers.") from e
+
+        self.model_name = model_name
+        self.device = "cpu"
+        self.quantization = "int8" if quantize else "fp32"
+        self.max_length = max_length
+        self.batch_size = max(1, batch_size)
+
+        model_dir = _model_dir(model_name)
+        onnx_path = model_dir / (_INT8_FILE if quantize else _FP32_FILE)
+        if not onnx_path.exists():
+            with _export_lock(model_dir):
+                # 잠금을 기다리는 동안 다른 워커가 export를 끝냈으면 그 결과를 그대로 쓴다
+                if not onnx_path.exists():
+                    onnx_path = export_onnx_reranker(model_name, model_dir, quantize=quantize)
+        self.onnx_path = str(onnx_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if RERANK_ONNX_THREADS > 0:
+            options.intra_op_num_threads = RERANK_ONNX_THREADS
+        self._session = ort.InferenceSession(self.onnx_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self._session.get_inputs()}
+        self._tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+        logger.info("[RERANK-ONNX] 세션 로드: %s", self.onnx_path)
+
+    def _score_batch(self, pairs: Sequence[Tuple[str, str]]) -> np.ndarray:
+        enc = self._tokenizer(
+            [q for q, _ in pairs],
+            [t for _, t in pairs],
+            truncation="only_second",
+            max_length=self.max_length,
+            padding="longest",
+            return_tensors="np",
+        )
+        feeds = {name: enc[name].astype(np.int64) for name in self._input_names if name in enc}
+        logits = self._session.run(["logits"], feeds)[0]
+        if logits.shape[1] == 1:
+            return 1.0 / (1.0 + np.exp(-logits[:, 0]))
+        return logits[:, -1]
+
+    def predict(self, pairs: Sequence[Tuple[str, str]]) -> List[float]:
+        if not pairs:
+            return []
+        pairs = list(pairs)
+        # 길이가 비슷한 쌍끼리 같은 배치 → padding 토큰 감소
+        order = sorted(range(len(pairs)), key=lambda i: len(pairs[i][0]) + len(pairs[i][1]))
+        scores = np.empty(len(pairs), dtype="float32")
+        for start in range(0, len(order), self.batch_size):
+            idx = order[start : start + self.batch_size]
+            scores[idx] = self._score_batch([pairs[i] for i in idx])
+        return [float(s) for s in scores]
+
+    def info(self) -> Dict[str, Any]:
+        return {"onnx_path": self.onnx_path, "max_length": self.max_length, "batch_size": self.batch_size}
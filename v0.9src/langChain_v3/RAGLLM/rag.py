@@ -2,13 +2,41 @@
 # FAISS에서 top-k chunk 검색 후, 검색된 결과에 대해 문맥 확장된 청크를 전송
 # rag_engine/rag.py
 import os
-from concurrent.futures import ThreadPoolExecutor
-from typing import List, Dict, Any, Callable, Iterable, Optional
-
-from langChain_v3.vectorstore import load_vectorstore, DEFAULT_INDEX_DIR
-from langChain_v3.db import get_connection
+from typing import List, Dict, Any, Callable, Iterable, Optional, Tuple
+
+from langChain_v3.vectorstore import DEFAULT_INDEX_DIR
+from langChain_v3.retrieval_engine import get_retrieval_engine
+from langChain_v3.repository import fetch_hit_contexts, fetch_parent_contexts
+from langChain_v3.context_cache import get_context_cache
+from langChain_v3.filters import resolve_filters
+from langChain_v3.lexical_index import get_lexical_index, reciprocal_rank_fusion
+from langChain_v3.batching import BatchTimeout
+from langChain_v3.fanout import get_fanout_executor
+from langChain_v3.shard_router import SHARDED_RETRIEVAL_ENABLED, get_shard_router
+from langChain_v3.rerank_cache import RERANK_CACHE_ENABLED, get_rerank_cache, rerank_cache_key
+from langChain_v3.RAGLLM.reranker import _default_rerank_device, get_reranker
+from langChain_v3.RAGLLM.rerank_policy import ADAPTIVE_RERANK_ENABLED, get_rerank_policy
+
+# rerank 경로의 1단계 후보를 FAISS + BM25(한글 bigram) RRF 융합으로 뽑을지
+LEXICAL_FUSION_ENABLED = os.getenv("LEXICAL_FUSION_ENABLED", "0").strip().lower() in {"1", "true", "yes", "on"}
+
+# hybrid_search_rerank 소스별 마감(ms). 0이면 RETRIEVAL_BUDGET_MS
+INTERNAL_SEARCH_DEADLINE_MS = float(os.getenv("INTERNAL_SEARCH_DEADLINE_MS", "0"))
+WEB_SEARCH_DEADLINE_MS = float(os.getenv("WEB_SEARCH_DEADLINE_MS", "1500"))
+
+# small-to-big: 부모 블록(chunk_parents)이 있는 hit는 창 확장 대신 부모 본문을 문맥으로 쓰고,
+# 같은 부모의 자식 hit는 하나로 합친다. 0이면 기존 창 확장만 사용
+PARENT_CONTEXT_ENABLED = os.getenv("PARENT_CONTEXT_ENABLED", "1").strip().lower() not in {
+    "0",
+    "false",
+    "no",
+    "off",
+}
+# 문맥 캐시에서 부모 블록 항목을 창 확장 항목과 구분하는 window 자리 값
+PARENT_WINDOW = -1
 
 # Remove duplicate overlap between adjacent chunks.
+# (start/end 오프셋이 없는 구버전 청크에만 사용. 새 청크는 원문 구간을 직접 잘라 쓴다)
 def _trim_overlap(prev_text: str, next_text: str, max_overlap_chars: int = 1000) -> str:
     if not prev_text or not next_text:
         return next_text
@@ -43,18 +71,6 @@ def _merge_chunks_without_overlap(
     return "\n\n".join(merged)
 
 
-def _default_rerank_device() -> str:
-    forced = os.getenv("RERANK_DEVICE", "").strip().lower()
-    if forced:
-        return forced
-    try:
-        import torch  # type: ignore
-
-        return "cuda" if torch.cuda.is_available() else "cpu"
-    except Exception:
-        return "cpu"
-
-
 def _attach_source(
     rows: Iterable[Dict[str, Any]], source: str
 ) -> List[Dict[str, Any]]:
@@ -134,96 +150,378 @@ def expand_context(cur, meta_id: str, center_index: int, window: int = 1) -> str
     하나의 텍스트 블록으로 만들어준다.
     예: window = 1 → chunk_index 6,7,8 (±1 확장)
     """
-    cur.execute(
-        """
-        SELECT chunk_index, text
-        FROM chunks
-        WHERE meta_id = %s
-          AND chunk_index BETWEEN %s AND %s
-        ORDER BY chunk_index
-        """,
-        (meta_id, center_index - window, center_index + 2*window),
-    )
-    rows = cur.fetchall()
+    key = (meta_id, center_index, window)
+    _, windows, spans = fetch_hit_contexts([key], cur=cur)
+    return _context_text(key, windows, spans)
+
+
+def _context_text(
+    key: Tuple[str, int, int],
+    windows: Dict[Tuple[str, int, int], List[Dict[str, Any]]],
+    spans: Dict[Tuple[str, int, int], str],
+) -> str:
+    # 오프셋이 있으면 원문 구간을 그대로 사용 (겹침 없음)
+    if key in spans:
+        return spans[key]
 
-    # 텍스트만 정렬된 순서대로 이어붙임
-    texts = [r["text"] for r in rows if r["text"]]
+    # 오프셋 없는 구버전 청크: 텍스트를 정렬된 순서대로 이어붙이며 겹침 제거
+    texts = [r["text"] for r in windows.get(key, []) if r["text"]]
     return _merge_chunks_without_overlap(texts)
 
 
+def collapse_siblings(hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    같은 부모 블록(meta_id, parent_index)의 자식 hit는 순위가 가장 높은 것 하나만 남긴다.
+    (부모 본문이 곧 문맥이므로 나머지 자식은 같은 문맥을 중복해서 싣게 된다)
+    부모가 없는 hit(parent_index None)는 그대로 둔다.
+    엔진 hit(번들의 parent_index)에도, build_search_results 결과(부모 문맥을 붙인 parent_index)에도
+    쓸 수 있다 → parent_index를 모르는 BM25 hit는 결과 단계에서 합쳐진다.
+    """
+    if not PARENT_CONTEXT_ENABLED:
+        return hits
+    seen = set()
+    out = []
+    for hit in hits:
+        parent = hit.get("parent_index")
+        if parent is not None:
+            key = (hit["meta_id"], parent)
+            if key in seen:
+                continue
+            seen.add(key)
+        out.append(hit)
+    return out
+
+
+def _fetch_k(k: int, collapse: bool = True) -> int:
+    """형제 hit를 합친 뒤에도 k개가 남도록, 합치는(collapse) 경로의 1단계 검색만 넉넉히."""
+    return k * 2 if collapse and PARENT_CONTEXT_ENABLED else k
+
+
+def _collapsed_results(hits: List[Dict[str, Any]], k: int, window: int) -> List[Dict[str, Any]]:
+    """
+    넉넉히 가져온 1단계 hit → 검색 결과 → 같은 부모 결과 합치기 → 상위 k.
+    번들에서 부모를 아는 hit는 문맥 조회 전에 먼저 합쳐 조회량을 줄이고,
+    부모가 조회 후에야 정해지는 hit(BM25 등)는 결과 단계에서 한 번 더 합친다.
+    """
+    return collapse_siblings(build_search_results(collapse_siblings(hits), window=window))[:k]
+
+
+def _parent_contexts(
+    hits: List[Dict[str, Any]],
+    cache,
+) -> Dict[int, Dict[str, Any]]:
+    """
+    부모 블록 경로: hit(chunk_id) → {"title", "url", "context_text"(부모 본문), "chunk_text", "parent_index"}.
+    문맥 캐시 키는 (meta_id, chunk_index, PARENT_WINDOW). miss만 fetch_parent_contexts 1회로 조회.
+    - parent_index가 있는 hit(부모 포인터가 든 번들) + parent_index를 모르는 hit(BM25 등)만 대상
+    - 부모가 없는(구버전 청크) hit는 결과에 없다 → 창 확장으로 처리
+      조회해도 부모가 없던 hit는 같은 키에 {"no_parent": True} 항목을 캐싱해 다음 요청에서 다시 조회하지 않는다
+    """
+    if not PARENT_CONTEXT_ENABLED:
+        return {}
+
+    out: Dict[int, Dict[str, Any]] = {}
+    missing: Dict[int, Dict[str, Any]] = {}
+    for hit in hits:
+        if "parent_index" in hit and hit["parent_index"] is None:
+            continue
+        if hit["chunk_id"] in out or hit["chunk_id"] in missing:
+            continue
+        cached = cache.get((hit["meta_id"], hit["chunk_index"], PARENT_WINDOW), source_hash=hit.get("source_hash"))
+        if cached is not None:
+            if not cached.get("no_parent"):
+                out[hit["chunk_id"]] = cached
+        else:
+            missing[hit["chunk_id"]] = hit
+
+    if missing:
+        for chunk_id, row in fetch_parent_contexts(missing).items():
+            hit = missing[chunk_id]
+            entry = {
+                "title": row.get("title"),
+                "url": row.get("url"),
+                "context_text": row.get("parent_text") or "",
+                "chunk_text": row.get("chunk_text") or "",
+                "parent_index": row.get("parent_index"),
+                "source_hash": hit.get("source_hash"),
+            }
+            out[chunk_id] = entry
+            cache.put((hit["meta_id"], hit["chunk_index"], PARENT_WINDOW), entry)
+        for chunk_id, hit in missing.items():
+            if chunk_id not in out:
+                # 부모 없음도 캐싱 (source_hash가 바뀌면 get에서 같이 버려진다)
+                entry = {"no_parent": True, "source_hash": hit.get("source_hash")}
+                cache.put((hit["meta_id"], hit["chunk_index"], PARENT_WINDOW), entry)
+    return out
+
+
+def build_search_results(hits: List[Dict[str, Any]], window: int = 1) -> List[Dict[str, Any]]:
+    """
+    엔진 hit 리스트 → 검색 결과 dict 리스트.
+    hit마다 SELECT하지 않고, 전체 hit의 title/url + 문맥을 일괄 조회한다.
+    - 부모 블록이 있는 청크: 미리 저장된 부모 본문을 그대로 문맥으로 사용 (조회 1회)
+    - 그 외(구버전 청크 / 부모 비활성): 주변 청크(chunk_index ± window)를 모아 창 확장
+    자주 나오는 hit는 문맥 캐시에서 바로 꺼내 DB를 거치지 않는다.
+    """
+    if not hits:
+        return []
+
+    cache = get_context_cache()
+    parents = _parent_contexts(hits, cache)
+    keys = [(h["meta_id"], h["chunk_index"], window) for h in hits]
+
+    contexts: Dict[Tuple[str, int, int], Dict[str, Any]] = {}
+    missing: List[Tuple[str, int, int]] = []
+    for hit, key in zip(hits, keys):
+        if hit["chunk_id"] in parents or key in contexts:
+            continue
+        cached = cache.get(key, source_hash=hit.get("source_hash"))
+        if cached is not None:
+            contexts[key] = cached
+        else:
+            missing.append(key)
+
+    if missing:
+        titles, windows, spans = fetch_hit_contexts(missing)
+        hashes = {key: hit.get("source_hash") for hit, key in zip(hits, keys)}
+        for key in dict.fromkeys(missing):
+            doc_info = titles.get(key[0]) or {}
+            center = next((r for r in windows.get(key, []) if r["chunk_index"] == key[1]), None)
+            entry = {
+                "title": doc_info.get("title"),
+                "url": doc_info.get("url"),
+                # 🔥 문맥 확장: chunk_index 주변 window 만큼의 원문 구간
+                "context_text": _context_text(key, windows, spans),
+                # 인덱스 번들에는 청크 본문이 없으므로 hit 청크 본문도 여기서 채운다.
+                "chunk_text": (center or {}).get("text") or "",
+                "source_hash": hashes.get(key),
+            }
+            contexts[key] = entry
+            cache.put(key, entry)
+
+    results: List[Dict[str, Any]] = []
+    for hit, key in zip(hits, keys):
+        ctx = parents.get(hit["chunk_id"]) or contexts[key]
+        results.append(
+            {
+                "meta_id": hit["meta_id"],
+                "chunk_id": hit["chunk_id"],
+                "chunk_index": hit["chunk_index"],
+
+                # 검색 점수(그대로 사용)
+                "score": float(hit["score"]),
+
+                # 문서 정보
+                "title": ctx.get("title"),
+                "url": ctx.get("url"),
+
+                # 기존 단일 청크 텍스트
+                "chunk_text": hit.get("chunk_text") or ctx.get("chunk_text") or "",
+
+                # 🔥 문맥 확장된 블록 (LLM에는 이걸 주면 됨)
+                "context_text": ctx.get("context_text") or "",
+                "context_window": window,
+                # parent: 부모 블록 본문 / window: 주변 청크 창 확장
+                "context_type": "parent" if hit["chunk_id"] in parents else "window",
+                "parent_index": ctx.get("parent_index"),
+            }
+        )
+        # RRF 융합 결과면 단계별 점수도 남긴다
+        for name in ("dense_score", "bm25_score", "rrf_score"):
+            if hit.get(name) is not None:
+                results[-1][name] = float(hit[name])
+        # 빌드 시 근사 중복으로 합쳐진 다른 문서(meta_id)
+        if hit.get("also_in"):
+            results[-1]["also_in"] = list(hit["also_in"])
+
+    return results
+
+
+def _dense_search(query: str, k: int, index_dir: str, filters: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """FAISS 검색 hit. SHARDED_RETRIEVAL_ENABLED면 기본 인덱스 대신 세그먼트 샤드 라우터로 검색."""
+    if SHARDED_RETRIEVAL_ENABLED and index_dir == DEFAULT_INDEX_DIR:
+        return get_shard_router().search(query, k=k, filters=filters)
+    return get_retrieval_engine(index_dir).search(query, k=k, filters=filters)
+
+
 #   의미 기반 검색 함수 + 문맥 확장.
 def semantic_search(
     query: str,
     k: int = 5,
     index_dir: str = DEFAULT_INDEX_DIR,
     window: int = 1,  # 문맥 확장을 위한 추가 파라미터
+    filters: Optional[Dict[str, Any]] = None,  # None이면 질문에서 연도/양식/학과 필터 자동 추출
+    collapse: bool = True,
 ) -> List[Dict[str, Any]]:
     """
-    - FAISS 인덱스에서 top-k chunk 검색
+    - FAISS 인덱스에서 top-k chunk 검색 (연도/source_type/학과 필터는 FAISS 검색 안에서 적용)
     - 각 chunk의 meta_id를 이용해 metadata에서 title, url 조회
-    - 같은 meta_id의 주변 청크(chunk_index ± window)까지 붙여 문맥 확장(context_text) 생성
+    - 부모 블록이 있으면 부모 본문을, 없으면 같은 meta_id의 주변 청크(chunk_index ± window)를
+      문맥(context_text)으로 붙인다. collapse면 같은 부모의 자식 hit는 하나로 합친다 (collapse_siblings)
+      → 합친 뒤에도 k개가 남도록 그때만 1단계 검색을 넉넉히 한다
     - 결과를 리스트[dict] 형태로 반환
+
+    DB 조회는 hit 수(k)와 무관하게 일괄 (부모 블록 1회 + 창 확장이 필요한 hit만 fetch_hit_contexts).
+    semantic_search_rerank / hybrid_search_rerank도 이 경로를 그대로 사용한다.
     """
-    vectorstore, _ = load_vectorstore(index_dir=index_dir)
+    # 프로세스 상주 엔진 (인덱스/임베딩 모델은 최초 1회만 로드)
+    hits = _dense_search(query, _fetch_k(k, collapse), index_dir, resolve_filters(query, filters))
+    if not collapse:
+        return build_search_results(hits, window=window)
+    return _collapsed_results(hits, k, window)
 
-    # doc, score 튜플들을 가져옴
-    docs_and_scores = vectorstore.similarity_search_with_score(query, k=k)
 
-    results: List[Dict[str, Any]] = []
+def semantic_search_batch(
+    queries: List[str],
+    k: int = 5,
+    index_dir: str = DEFAULT_INDEX_DIR,
+    window: int = 1,
+    filters: Optional[List[Optional[Dict[str, Any]]]] = None,
+    collapse: bool = True,
+) -> List[List[Dict[str, Any]]]:
+    """
+    semantic_search의 배치 버전 (평가 / FAQ 사전 생성용).
+    - 질의 임베딩 1회 배치 forward + FAISS 다중 질의 search
+    - 전체 hit의 title/url/문맥 확장을 한 번에 조회 (fetch_hit_contexts 1회)
+    반환: 질의 순서대로 semantic_search와 같은 형식의 결과 리스트
+    """
+    if not queries:
+        return []
+    if filters is None:
+        filters = [None] * len(queries)
+    resolved = [resolve_filters(q, f) for q, f in zip(queries, filters)]
 
-    conn = get_connection()
+    if SHARDED_RETRIEVAL_ENABLED and index_dir == DEFAULT_INDEX_DIR:
+        # semantic_search(_dense_search)와 같은 인덱스를 보도록 샤드 라우터의 배치 경로로
+        hits_per_query = get_shard_router().search_batch(queries, k=_fetch_k(k, collapse), filters=resolved)
+    else:
+        hits_per_query = get_retrieval_engine(index_dir).search_batch(
+            queries, k=_fetch_k(k, collapse), filters=resolved
+        )
+    if collapse:
+        hits_per_query = [collapse_siblings(hits) for hits in hits_per_query]
+
+    flat = [hit for hits in hits_per_query for hit in hits]
+    results = build_search_results(flat, window=window)
+
+    out: List[List[Dict[str, Any]]] = []
+    pos = 0
+    for hits in hits_per_query:
+        rows = results[pos : pos + len(hits)]
+        out.append(collapse_siblings(rows)[:k] if collapse else rows)
+        pos += len(hits)
+    return out
 
-    try:
-        with conn.cursor() as cur:
-            for doc, score in docs_and_scores:
-                meta = doc.metadata
-                meta_id = meta.get("meta_id")
-                chunk_id = meta.get("chunk_id")
-                chunk_index = meta.get("chunk_index")
-
-                # 문서 제목/URL 조회
-                cur.execute(
-                    """
-                    SELECT title, url
-                    FROM metadata
-                    WHERE meta_id = %s
-                    """,
-                    (meta_id,),
-                )
-                row = cur.fetchone()
-                title = row["title"] if row else None
-                url = row["url"] if row else None
-
-                # 🔥 문맥 확장 수행
-                # chunk_index 주변 window 만큼 청크를 합쳐 context_text 생성
-                context_text = expand_context(cur, meta_id, chunk_index, window)
-
-                # 결과 저장
-                results.append(
-                    {
-                        "meta_id": meta_id,
-                        "chunk_id": chunk_id,
-                        "chunk_index": chunk_index,
-
-                        # 검색 점수(그대로 사용)
-                        "score": float(score),
-
-                        # 문서 정보
-                        "title": title,
-                        "url": url,
-
-                        # 기존 단일 청크 텍스트
-                        "chunk_text": doc.page_content,
-
-                        # 🔥 문맥 확장된 블록 (LLM에는 이걸 주면 됨)
-                        "context_text": context_text,
-                        "context_window": window,
-                    }
-                )
-    finally:
-        conn.close()
 
-    return results
+def fused_search(
+    query: str,
+    k: int = 20,
+    index_dir: str = DEFAULT_INDEX_DIR,
+    window: int = 1,
+    filters: Optional[Dict[str, Any]] = None,
+    lexical_k: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    FAISS top-k + BM25 top-lexical_k를 Reciprocal Rank Fusion으로 합쳐 상위 k개.
+    학수번호/양식명처럼 dense 검색이 놓치는 정확한 용어 매칭을 보완한다.
+    반환 형식은 semantic_search와 같고, score는 RRF 점수(높을수록 좋음)이며
+    dense_score(L2) / bm25_score가 함께 붙는다.
+    같은 부모의 자식은 융합 후 결과 단계에서 합친다 (BM25 hit도 부모 문맥 조회 후 같이 합쳐진다).
+    """
+    filters = resolve_filters(query, filters)
+    dense = _dense_search(query, k, index_dir, filters)
+    for hit in dense:
+        hit["dense_score"] = hit["score"]
+    lexical = get_lexical_index().search(query, k=lexical_k or k, filters=filters)
+
+    hits = reciprocal_rank_fusion([dense, lexical], top_n=_fetch_k(k))
+    for hit in hits:
+        hit["score"] = hit["rrf_score"]
+    return _collapsed_results(hits, k, window)
+
+
+def _candidate_search(query: str, k: int, index_dir: str, window: int) -> List[Dict[str, Any]]:
+    """rerank 경로의 1단계 후보 검색 (LEXICAL_FUSION_ENABLED면 RRF 융합)."""
+    if LEXICAL_FUSION_ENABLED and get_lexical_index().exists():
+        return fused_search(query=query, k=k, index_dir=index_dir, window=window)
+    return semantic_search(query=query, k=k, index_dir=index_dir, window=window)
+
+
+def _rerank_scores(
+    reranker,
+    pairs: List[Tuple[str, str]],
+    rows: Optional[List[Dict[str, Any]]] = None,
+) -> Optional[List[float]]:
+    """
+    리랭커 점수. 마이크로 배칭 마감(RERANK_DEADLINE_MS)을 넘기면 None → 검색 순서 그대로 사용.
+    rows(pairs와 같은 순서)를 주면 chunk_id가 있는 쌍은 점수 캐시를 먼저 보고,
+    처음 보는 쌍만 모델에 보낸다.
+    """
+    if not RERANK_CACHE_ENABLED or rows is None:
+        try:
+            return reranker.predict(pairs)
+        except BatchTimeout:
+            return None
+
+    cache = get_rerank_cache()
+    keys = [
+        rerank_cache_key(q, row["chunk_id"], reranker.model_name, text, reranker.backend, reranker.quantization)
+        if row.get("chunk_id") is not None
+        else None
+        for (q, text), row in zip(pairs, rows)
+    ]
+    cached = cache.get_many(key for key in keys if key is not None)
+    scores: List[Optional[float]] = [cached.get(key) if key is not None else None for key in keys]
+
+    todo = [i for i, s in enumerate(scores) if s is None]
+    if todo:
+        try:
+            fresh = reranker.predict([pairs[i] for i in todo])
+        except BatchTimeout:
+            return None
+        new_entries = []
+        for i, s in zip(todo, fresh):
+            scores[i] = float(s)
+            if keys[i] is not None:
+                new_entries.append((keys[i], rows[i].get("meta_id"), float(s)))
+        cache.put_many(new_entries)
+    return [float(s) for s in scores]  # type: ignore[arg-type]
+
+
+def _adaptive_rerank_scores(
+    reranker,
+    pairs: List[Tuple[str, str]],
+    rows: List[Dict[str, Any]],
+    top_n: int,
+) -> Optional[List[float]]:
+    """
+    적응형 리랭크 (rerank_policy).
+    반환: 1단계 순서 앞쪽 len(scores)개 후보의 리랭크 점수.
+    None이면 top1이 확실히 앞서 리랭크를 생략(또는 마감 초과) → 검색 순서 그대로 사용.
+    """
+    policy = get_rerank_policy()
+    available = len(pairs)
+    # RRF 융합 점수는 간격이 의미가 없으므로 생략 판단은 L2 거리일 때만
+    if not any(r.get("rrf_score") is not None for r in rows) and policy.should_skip([r["score"] for r in rows]):
+        policy.record(available, 0, skipped=True)
+        return None
+
+    scores: List[float] = []
+    initial = depth = policy.initial_depth(top_n, available)
+    while True:
+        start = len(scores)
+        step = _rerank_scores(reranker, pairs[start:depth], rows[start:depth])
+        if step is None:
+            policy.record(available, start, timed_out=True)
+            return scores or None
+        scores.extend(step)
+        next_depth = policy.next_depth(scores, start, top_n, available)
+        if next_depth <= depth:
+            break
+        depth = next_depth
+
+    policy.record(available, len(scores), grown=len(scores) > initial)
+    return scores
 
 
 def semantic_search_rerank(
@@ -233,14 +531,17 @@ def semantic_search_rerank(
     index_dir: str = DEFAULT_INDEX_DIR,
     window: int = 1,
     rerank_model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+    adaptive: Optional[bool] = None,  # None이면 ADAPTIVE_RERANK_ENABLED
 ) -> List[Dict[str, Any]]:
     """
     semantic_search()로 FAISS top-k 청크를 가져온 뒤 Cross-Encoder로 rerank하여 top_n을 반환.
 
     - rerank는 rag_test.py와 동일하게 chunk_text(원 청크) 기준으로 점수를 계산
     - 반환 dict에 rerank_score(float) 추가
+    - adaptive면 k개를 모두 리랭크하지 않고 점수 분포에 따라 깊이를 정한다
+      (리랭크를 생략한 경우 rerank_score 없이 검색 순서 그대로)
     """
-    retrieved = semantic_search(
+    retrieved = _candidate_search(
         query=query,
         k=k,
         index_dir=index_dir,
@@ -250,20 +551,8 @@ def semantic_search_rerank(
     if not retrieved or top_n <= 0:
         return []
 
-    # Lazy import: sentence_transformers는 환경에 따라 없을 수 있음.
-    try:
-        from sentence_transformers import CrossEncoder  # type: ignore
-    except Exception as e:
-        raise ImportError(
-            "semantic_search_rerank requires sentence-transformers. "
-            "Install it or use semantic_search() instead."
-        ) from e
-
-    reranker = CrossEncoder(rerank_model_name)
-    # reranker = CrossEncoder(
-    #     "Dongjin-kr/ko-reranker-base",
-    #     device="cuda"
-    # )
+    # 프로세스 전역으로 미리 로드된 리랭커 재사용 (요청마다 모델 생성 X)
+    reranker = get_reranker(rerank_model_name)
 
     pairs = []
     valid_rows: List[Dict[str, Any]] = []
@@ -276,8 +565,16 @@ def semantic_search_rerank(
     if not pairs:
         return []
 
-    scores = reranker.predict(pairs)
+    if adaptive is None:
+        adaptive = ADAPTIVE_RERANK_ENABLED
+    if adaptive:
+        scores = _adaptive_rerank_scores(reranker, pairs, valid_rows, top_n)
+    else:
+        scores = _rerank_scores(reranker, pairs, valid_rows)
+    if scores is None:
+        return [dict(r) for r in valid_rows[:top_n]]
 
+    # adaptive면 점수를 매긴 앞쪽 후보까지만 (zip이 짧은 쪽에 맞춤)
     reranked = sorted(
         zip(valid_rows, scores),
         key=lambda x: x[1],
@@ -305,12 +602,20 @@ def hybrid_search_rerank(
     rerank_model_name: str = "Dongjin-kr/ko-reranker-base",
     web_search_fn: Optional[Callable[..., List[Dict[str, Any]]]] = None,
     parallel: bool = True,
+    fanout_report: Optional[Dict[str, Any]] = None,
 ) -> List[Dict[str, Any]]:
+    """
+    내부(FAISS) + 웹 검색 결과를 합쳐 Cross-Encoder로 rerank한 top_n.
+
+    parallel이면 두 소스를 공용 fan-out 풀에서 동시에 호출하고, 소스별 마감
+    (INTERNAL_SEARCH_DEADLINE_MS / WEB_SEARCH_DEADLINE_MS) 안에 돌아온 결과만으로 진행한다.
+    fanout_report(dict)를 넘기면 timed_out_sources / failed_sources / retrieval_ms를 채운다.
+    """
     if merge_k is None:
         merge_k = faiss_k + web_k
 
     def fetch_internal() -> List[Dict[str, Any]]:
-        return semantic_search(query=query, k=faiss_k, index_dir=index_dir, window=window)
+        return _candidate_search(query=query, k=faiss_k, index_dir=index_dir, window=window)
 
     def fetch_web() -> List[Dict[str, Any]]:
         if web_search_fn is None:
@@ -323,11 +628,14 @@ def hybrid_search_rerank(
         return _collect_web_results(query, web_k, web_search_fn)
 
     if parallel:
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            internal_future = executor.submit(fetch_internal)
-            web_future = executor.submit(fetch_web)
-            internal_rows = internal_future.result()
-            web_rows = web_future.result()
+        fanout = get_fanout_executor().run(
+            {"internal": fetch_internal, "web": fetch_web},
+            deadlines_ms={"internal": INTERNAL_SEARCH_DEADLINE_MS, "web": WEB_SEARCH_DEADLINE_MS},
+        )
+        internal_rows = fanout.get("internal", [])
+        web_rows = fanout.get("web", [])
+        if fanout_report is not None:
+            fanout_report.update(fanout.report())
     else:
         internal_rows = fetch_internal()
         web_rows = fetch_web()
@@ -341,14 +649,7 @@ def hybrid_search_rerank(
     if not merged or top_n <= 0:
         return []
 
-    try:
-        from sentence_transformers import CrossEncoder  # type: ignore
-    except Exception as e:
-        raise ImportError(
-            "hybrid_search_rerank requires sentence-transformers."
-        ) from e
-
-    reranker = CrossEncoder(rerank_model_name, device=_default_rerank_device())
+    reranker = get_reranker(rerank_model_name, device=_default_rerank_device())
 
     pairs: List[tuple[str, str]] = []
     valid_rows: List[Dict[str, Any]] = []
@@ -362,7 +663,9 @@ def hybrid_search_rerank(
     if not pairs:
         return []
 
-    scores = reranker.predict(pairs)
+    scores = _rerank_scores(reranker, pairs, valid_rows)
+    if scores is None:
+        return [dict(r) for r in valid_rows[:top_n]]
     reranked = sorted(
         zip(valid_rows, scores),
         key=lambda x: x[1],
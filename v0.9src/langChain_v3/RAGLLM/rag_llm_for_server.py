@@ -1,5 +1,7 @@
+import asyncio
 import os
-from typing import Dict, Any, List
+import time
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
 
 from langChain_v3.RAGLLM.rag import (
     semantic_search,
@@ -7,7 +9,13 @@ from langChain_v3.RAGLLM.rag import (
     hybrid_search_rerank,
 )
 from langChain_v3.vectorstore import DEFAULT_INDEX_DIR
-from langChain_v3.RAGLLM.llm_service import generate_answer
+from langChain_v3.retrieval_engine import get_retrieval_engine
+from langChain_v3.filters import resolve_filters
+from langChain_v3.rerank_cache import get_rerank_cache
+from langChain_v3.shard_router import SHARDED_RETRIEVAL_ENABLED, get_shard_router
+from langChain_v3.RAGLLM.reranker import preload_rerankers
+from langChain_v3.RAGLLM.answer_cache import ANSWER_CACHE_ENABLED, answer_cache_version, get_answer_cache
+from langChain_v3.RAGLLM.llm_service import agenerate_answer, astream_answer, generate_answer
 
 RAG_RERANK_ENABLED = os.getenv("RAG_RERANK_ENABLED", "1").strip().lower() not in {
     "0",
@@ -29,19 +37,57 @@ WEB_SEARCH_TOP_K = int(os.getenv("WEB_SEARCH_TOP_K", "10"))
 FAISS_SEARCH_TOP_K = int(os.getenv("FAISS_SEARCH_TOP_K", "20"))
 
 
-def answer_with_rag_for_server(
+def warmup_for_server(index_dir: str = DEFAULT_INDEX_DIR) -> None:
+    """
+    서버 startup 시 1회 호출.
+    - FAISS 인덱스 + 임베딩 모델 로드 (+ 질의 임베딩 캐시 워밍)
+    - 현재 설정에서 쓰일 Cross-Encoder 리랭커 로드
+    - SHARDED_RETRIEVAL_ENABLED면 세그먼트 샤드 인덱스도 로드
+    """
+    engine = get_retrieval_engine(index_dir).load()
+    if SHARDED_RETRIEVAL_ENABLED:
+        get_shard_router().load()
+
+    # 질의 임베딩 캐시: 디스크 저장본 로드 + 질문 로그 상위 N개 미리 임베딩
+    qcache = engine.query_cache
+    if qcache is not None:
+        qcache.load()
+        qcache.warm_from_log()
+
+    if WEB_SEARCH_ENABLED:
+        preload_rerankers([KOREAN_RERANK_MODEL_NAME])
+    elif RAG_RERANK_ENABLED:
+        preload_rerankers([RERANK_MODEL_NAME])
+
+
+NO_CONTEXT_SYSTEM_PROMPT = (
+    "당신은 가천대학교 AI 챗봇입니다.\n"
+    "관련 문서를 찾지 못한 경우, 일반적인 안내만 간단히 제공하세요.\n"
+    "추측하지 말고 한국어로 답변하세요."
+)
+
+RAG_SYSTEM_PROMPT = (
+    "당신은 가천대학교 학사정보 RAG 어시스턴트입니다.\n"
+    "아래 제공된 컨텍스트를 근거로만 답변하세요.\n"
+    "컨텍스트에 없는 내용은 '확인할 수 없습니다'라고 답하세요.\n"
+    "한국어 존댓말로 답변하세요."
+)
+
+
+def retrieve_for_server(
     question: str,
     k: int = 5,
     window: int = 1,
     index_dir: str = DEFAULT_INDEX_DIR,
-) -> Dict[str, Any]:
+    report: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
     """
-    FastAPI 서버 전용 RAG 응답 함수
-    - JSON-friendly 반환
+    서버 설정(WEB_SEARCH_ENABLED / RAG_RERANK_ENABLED)에 따른 검색 단계.
+    FAISS + MariaDB + Cross-Encoder를 모두 타는 동기(블로킹) 구간.
+    report(dict)를 넘기면 마감을 넘긴 소스(timed_out_sources) 등을 채운다.
     """
-
     if WEB_SEARCH_ENABLED:
-        retrieved: List[Dict[str, Any]] = hybrid_search_rerank(
+        return hybrid_search_rerank(
             query=question,
             faiss_k=FAISS_SEARCH_TOP_K,
             web_k=WEB_SEARCH_TOP_K,
@@ -49,9 +95,10 @@ def answer_with_rag_for_server(
             window=window,
             index_dir=index_dir,
             rerank_model_name=KOREAN_RERANK_MODEL_NAME,
+            fanout_report=report,
         )
-    elif RAG_RERANK_ENABLED:
-        retrieved = semantic_search_rerank(
+    if RAG_RERANK_ENABLED:
+        return semantic_search_rerank(
             query=question,
             k=max(k * 4, 20),
             top_n=k,
@@ -59,31 +106,16 @@ def answer_with_rag_for_server(
             index_dir=index_dir,
             rerank_model_name=RERANK_MODEL_NAME,
         )
-    else:
-        retrieved = semantic_search(
-            query=question,
-            k=k,
-            window=window,
-            index_dir=index_dir,
-        )
+    return semantic_search(
+        query=question,
+        k=k,
+        window=window,
+        index_dir=index_dir,
+    )
 
-    # 2) 검색 실패
-    if not retrieved:
-        answer = generate_answer(
-            user_prompt=question,
-            system_prompt=(
-                "당신은 가천대학교 AI 챗봇입니다.\n"
-                "관련 문서를 찾지 못한 경우, 일반적인 안내만 간단히 제공하세요.\n"
-                "추측하지 말고 한국어로 답변하세요."
-            ),
-        )
-        return {
-            "answer": answer,
-            "contexts": [],
-            "used_rag": False,
-        }
 
-    # 3) 컨텍스트 구성
+def build_rag_prompts(question: str, retrieved: List[Dict[str, Any]]) -> Tuple[str, str]:
+    """검색 결과 → (system_prompt, user_prompt)"""
     context_blocks = []
     for r in retrieved:
         r.setdefault("source", "internal")
@@ -96,25 +128,21 @@ def answer_with_rag_for_server(
 
     context_text = "\n\n---\n\n".join(context_blocks)
 
-    system_prompt = (
-        "당신은 가천대학교 학사정보 RAG 어시스턴트입니다.\n"
-        "아래 제공된 컨텍스트를 근거로만 답변하세요.\n"
-        "컨텍스트에 없는 내용은 '확인할 수 없습니다'라고 답하세요.\n"
-        "한국어 존댓말로 답변하세요."
-    )
-
     user_prompt = (
         f"[컨텍스트]\n{context_text}\n\n"
         f"[질문]\n{question}\n\n"
         "위 컨텍스트를 활용하여 질문에 답변하세요."
     )
+    return RAG_SYSTEM_PROMPT, user_prompt
 
-    # 4) LLM 호출
-    answer = generate_answer(
-        user_prompt=user_prompt,
-        system_prompt=system_prompt,
-    )
 
+def _rag_result(
+    answer: str,
+    retrieved: List[Dict[str, Any]],
+    k: int,
+    window: int,
+    report: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
     return {
         "answer": answer,
         "contexts": retrieved,
@@ -130,4 +158,201 @@ def answer_with_rag_for_server(
         "web_search_enabled": WEB_SEARCH_ENABLED,
         "web_search_top_k": WEB_SEARCH_TOP_K if WEB_SEARCH_ENABLED else None,
         "faiss_search_top_k": FAISS_SEARCH_TOP_K if WEB_SEARCH_ENABLED else None,
+        # 마감 안에 응답하지 않아 빠진 검색 소스 (부분 결과로 답변했음을 표시)
+        "timed_out_sources": (report or {}).get("timed_out_sources", []),
     }
+
+
+def shutdown_for_server(index_dir: str = DEFAULT_INDEX_DIR) -> None:
+    """
+    서버 종료 시: 질의 임베딩 캐시를 디스크에 저장 (QUERY_EMBED_CACHE_PATH 설정 시),
+    리랭크 점수 캐시를 sqlite에 기록 (RERANK_CACHE_PATH 설정 시).
+    """
+    qcache = get_retrieval_engine(index_dir).query_cache
+    if qcache is not None:
+        qcache.save()
+    get_rerank_cache().flush()
+
+
+def _lookup_answer_cache(question: str, k: int, window: int, index_dir: str):
+    """
+    의미 기반 답변 캐시 조회 → (query_vec, cache_version, cached_result | None)
+    질의 임베딩은 질의 캐시에 남으므로 이어지는 FAISS 검색에서 다시 계산되지 않는다.
+    """
+    if not ANSWER_CACHE_ENABLED:
+        return None, None, None
+    engine = get_retrieval_engine(index_dir).load()
+    query_vec = engine.embeddings.embed_query(question)
+    # 같은 인덱스 버전 + 같은 검색 설정 + 같은 필터/숫자인 질문의 답변만 재사용
+    # ("2024 교육과정" / "2025 교육과정"처럼 임베딩은 비슷해도 필터가 다르면 다른 답변)
+    settings = {"k": k, "window": window}
+    if SHARDED_RETRIEVAL_ENABLED and index_dir == DEFAULT_INDEX_DIR:
+        settings["shards"] = get_shard_router().version
+    version = answer_cache_version(engine.version, question, resolve_filters(question), **settings)
+    return query_vec, version, get_answer_cache().lookup(query_vec, version)
+
+
+def _store_answer_cache(query_vec, version, question: str, result: Dict[str, Any], started: float) -> None:
+    # 일부 소스가 마감을 넘긴 부분 결과 답변은 캐시하지 않는다
+    if query_vec is None or not result.get("used_rag") or result.get("timed_out_sources"):
+        return
+    get_answer_cache().store(query_vec, question, result, version, time.perf_counter() - started)
+
+
+def answer_with_rag_for_server(
+    question: str,
+    k: int = 5,
+    window: int = 1,
+    index_dir: str = DEFAULT_INDEX_DIR,
+) -> Dict[str, Any]:
+    """
+    FastAPI 서버 전용 RAG 응답 함수
+    - JSON-friendly 반환
+    """
+    started = time.perf_counter()
+
+    # 0) 비슷한 질문에 이미 답한 적이 있으면 그대로 반환
+    query_vec, cache_version, cached = _lookup_answer_cache(question, k, window, index_dir)
+    if cached is not None:
+        return cached
+
+    # 1) 검색
+    report: Dict[str, Any] = {}
+    retrieved = retrieve_for_server(question, k=k, window=window, index_dir=index_dir, report=report)
+
+    # 2) 검색 실패
+    if not retrieved:
+        answer = generate_answer(
+            user_prompt=question,
+            system_prompt=NO_CONTEXT_SYSTEM_PROMPT,
+        )
+        return {
+            "answer": answer,
+            "contexts": [],
+            "used_rag": False,
+            "timed_out_sources": report.get("timed_out_sources", []),
+        }
+
+    # 3) 컨텍스트 구성
+    system_prompt, user_prompt = build_rag_prompts(question, retrieved)
+
+    # 4) LLM 호출
+    answer = generate_answer(
+        user_prompt=user_prompt,
+        system_prompt=system_prompt,
+    )
+    result = _rag_result(answer, retrieved, k, window, report)
+    _store_answer_cache(query_vec, cache_version, question, result, started)
+    return result
+
+
+async def answer_with_rag_for_server_async(
+    question: str,
+    k: int = 5,
+    window: int = 1,
+    index_dir: str = DEFAULT_INDEX_DIR,
+) -> Dict[str, Any]:
+    """
+    answer_with_rag_for_server()의 비동기 버전 (/api/chat 전용).
+
+    - 검색 단계(FAISS, pymysql, Cross-Encoder)는 CPU/블로킹 구간이라 스레드로 넘긴다.
+    - LLM 호출은 AsyncOpenAI로 await → 응답 대기 중에도 이벤트 루프가 다른 요청을 처리.
+    """
+    started = time.perf_counter()
+
+    # 0) 의미 기반 답변 캐시 (질의 임베딩도 CPU 구간이라 스레드로)
+    query_vec, cache_version, cached = await asyncio.to_thread(
+        _lookup_answer_cache, question, k, window, index_dir
+    )
+    if cached is not None:
+        return cached
+
+    # 1) 검색 (스레드 오프로딩)
+    report: Dict[str, Any] = {}
+    retrieved = await asyncio.to_thread(
+        retrieve_for_server, question, k, window, index_dir, report
+    )
+
+    # 2) 검색 실패
+    if not retrieved:
+        answer = await agenerate_answer(
+            user_prompt=question,
+            system_prompt=NO_CONTEXT_SYSTEM_PROMPT,
+        )
+        return {
+            "answer": answer,
+            "contexts": [],
+            "used_rag": False,
+            "timed_out_sources": report.get("timed_out_sources", []),
+        }
+
+    # 3) 컨텍스트 구성 + 4) LLM 호출
+    system_prompt, user_prompt = build_rag_prompts(question, retrieved)
+    answer = await agenerate_answer(
+        user_prompt=user_prompt,
+        system_prompt=system_prompt,
+    )
+    result = _rag_result(answer, retrieved, k, window, report)
+    _store_answer_cache(query_vec, cache_version, question, result, started)
+    return result
+
+
+async def stream_answer_with_rag_for_server(
+    question: str,
+    k: int = 5,
+    window: int = 1,
+    index_dir: str = DEFAULT_INDEX_DIR,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    스트리밍용 RAG 응답 (/api/chat/stream 전용). (event, data) 튜플을 순서대로 yield.
+
+    1) "sources": 검색된 컨텍스트 (LLM 호출 전에 먼저 전송)
+    2) "token":   LLM 토큰 조각 {"text": ...} (도착하는 대로)
+    3) "done":    최종 요약 (answer 전문 + 설정 정보)
+
+    의미 기반 답변 캐시에 걸리면 저장된 답변을 token 1개로 바로 보낸다.
+    """
+    started = time.perf_counter()
+
+    query_vec, cache_version, cached = await asyncio.to_thread(
+        _lookup_answer_cache, question, k, window, index_dir
+    )
+    if cached is not None:
+        yield "sources", {"contexts": cached.get("contexts", []), "used_rag": cached.get("used_rag", True)}
+        yield "token", {"text": cached.get("answer", "")}
+        cached.pop("contexts", None)
+        yield "done", cached
+        return
+
+    report: Dict[str, Any] = {}
+    retrieved = await asyncio.to_thread(
+        retrieve_for_server, question, k, window, index_dir, report
+    )
+
+    if retrieved:
+        system_prompt, user_prompt = build_rag_prompts(question, retrieved)
+    else:
+        system_prompt, user_prompt = NO_CONTEXT_SYSTEM_PROMPT, question
+
+    yield "sources", {"contexts": retrieved, "used_rag": bool(retrieved)}
+
+    pieces: List[str] = []
+    async for piece in astream_answer(system_prompt, user_prompt):
+        pieces.append(piece)
+        yield "token", {"text": piece}
+
+    answer = "".join(pieces).strip()
+    if retrieved:
+        summary = _rag_result(answer, retrieved, k, window, report)
+        _store_answer_cache(query_vec, cache_version, question, summary, started)
+        summary = dict(summary)
+    else:
+        summary = {
+            "answer": answer,
+            "contexts": [],
+            "used_rag": False,
+            "timed_out_sources": report.get("timed_out_sources", []),
+        }
+    # contexts는 sources 이벤트에서 이미 보냈으므로 요약에서는 뺀다.
+    summary.pop("contexts", None)
+    yield "done", summary
@@ -0,0 +1,118 @@
+# langChain_v3/RAGLLM/rerank_policy.py
+# 적응형 리랭크 깊이: 1단계(FAISS) 점수 분포와 Cross-Encoder 초반 점수를 보고
+# 몇 개의 후보를 리랭커에 보낼지 정한다.
+#   - top1이 확실히 앞서면 리랭크 생략
+#   - 처음엔 얕게 점수를 매기고, 애매한(꼬리 후보가 여전히 상위권에 드는) 질의만 깊이를 늘린다
+import os
+import threading
+from typing import Any, Dict, Sequence
+
+ADAPTIVE_RERANK_ENABLED = os.getenv("ADAPTIVE_RERANK_ENABLED", "1").strip().lower() not in {
+    "0",
+    "false",
+    "no",
+    "off",
+}
+# 처음 리랭크할 후보 수 하한 (실제로는 max(top_n * 2, 이 값))
+ADAPTIVE_RERANK_MIN_DEPTH = int(os.getenv("ADAPTIVE_RERANK_MIN_DEPTH", "8"))
+# 깊이를 늘릴 때 곱할 배수
+ADAPTIVE_RERANK_GROWTH = float(os.getenv("ADAPTIVE_RERANK_GROWTH", "2"))
+# 리랭크 생략 조건 (L2 거리, 낮을수록 가까움)
+#   top2 - top1 >= SKIP_GAP 이고 top1 <= SKIP_MAX_DIST 이면 top1이 확실히 앞선다고 본다
+ADAPTIVE_RERANK_SKIP_GAP = float(os.getenv("ADAPTIVE_RERANK_SKIP_GAP", "0.2"))
+ADAPTIVE_RERANK_SKIP_MAX_DIST = float(os.getenv("ADAPTIVE_RERANK_SKIP_MAX_DIST", "0.6"))
+
+
+class AdaptiveRerankPolicy:
+    """
+    리랭크 깊이 결정 + 질의별 카운터.
+
+    should_skip(): FAISS L2 거리만 보고 리랭크 생략 여부
+    initial_depth(): 첫 단계 리랭크 후보 수
+    next_depth(): 지금까지의 Cross-Encoder 점수로 더 깊이 볼지 결정.
+        방금 점수를 매긴 구간(가장 낮은 FAISS 순위들)에서 하나라도 현재 top_n에 들어왔으면
+        더 아래에도 좋은 후보가 있을 수 있으므로 깊이를 늘리고, 아니면 멈춘다.
+    """
+
+    def __init__(
+        self,
+        min_depth: int = ADAPTIVE_RERANK_MIN_DEPTH,
+        growth: float = ADAPTIVE_RERANK_GROWTH,
+        skip_gap: float = ADAPTIVE_RERANK_SKIP_GAP,
+        skip_max_dist: float = ADAPTIVE_RERANK_SKIP_MAX_DIST,
+    ):
+        self.min_depth = max(1, min_depth)
+        self.growth = max(1.5, growth)
+        self.skip_gap = skip_gap
+        self.skip_max_dist = skip_max_dist
+
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.skipped = 0
+        self.grown = 0
+        self.full_depth = 0
+        self.timeouts = 0
+        self.pairs_scored = 0
+        self.candidates = 0
+
+    def should_skip(self, distances: Sequence[float]) -> bool:
+        if len(distances) < 2:
+            return len(distances) == 1
+        d1, d2 = float(distances[0]), float(distances[1])
+        return d1 <= self.skip_max_dist and (d2 - d1) >= self.skip_gap
+
+    def initial_depth(self, top_n: int, available: int) -> int:
+        return min(available, max(top_n * 2, self.min_depth))
+
+    def next_depth(self, scores: Sequence[float], scored_from: int, top_n: int, available: int) -> int:
+        """scores: 지금까지 FAISS 순서대로 매긴 리랭크 점수, scored_from: 이번 단계 시작 위치."""
+        depth = len(scores)
+        if depth >= available:
+            return depth
+        # 첫 단계는 앞쪽 top_n개를 빼고 그 뒤 후보들을 꼬리로 본다
+        tail = scores[max(scored_from, top_n) :]
+        if tail:
+            cutoff = sorted(scores, reverse=True)[top_n - 1]
+            if max(tail) < cutoff:
+                return depth
+        return min(available, max(depth + 1, int(depth * self.growth)))
+
+    def record(
+        self,
+        candidates: int,
+        pairs: int,
+        skipped: bool = False,
+        grown: bool = False,
+        timed_out: bool = False,
+    ) -> None:
+        with self._lock:
+            self.queries += 1
+            self.candidates += candidates
+            self.pairs_scored += pairs
+            self.skipped += int(skipped)
+            self.grown += int(grown)
+            self.full_depth += int(not skipped and pairs >= candidates)
+            self.timeouts += int(timed_out)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": ADAPTIVE_RERANK_ENABLED,
+            "min_depth": self.min_depth,
+            "growth": self.growth,
+            "skip_gap": self.skip_gap,
+            "skip_max_dist": self.skip_max_dist,
+            "queries": self.queries,
+            "skipped": self.skipped,
+            "grown": self.grown,
+            "full_depth": self.full_depth,
+            "timeouts": self.timeouts,
+            "avg_candidates": round(self.candidates / self.queries, 2) if self.queries else 0.0,
+            "avg_pairs_scored": round(self.pairs_scored / self.queries, 2) if self.queries else 0.0,
+        }
+
+
+_policy: AdaptiveRerankPolicy = AdaptiveRerankPolicy()
+
+
+def get_rerank_policy() -> AdaptiveRerankPolicy:
+    return _policy
@@ -0,0 +1,163 @@
+# langChain_v3/RAGLLM/reranker.py
+# Cross-Encoder 리랭커를 (모델명, 디바이스)별로 1개만 만들어 두고 요청 간에 공유
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from langChain_v3.batching import MicroBatcher
+
+logger = logging.getLogger(__name__)
+
+# "torch": sentence-transformers CrossEncoder / "onnx": ONNX Runtime + 동적 int8 양자화 (CPU 서버용)
+RERANK_BACKEND = os.getenv("RERANK_BACKEND", "torch").strip().lower()
+
+# 동시 요청들의 (질문, 청크) 쌍을 모아 한 번의 forward로 처리 (0이면 요청별로 바로 predict)
+RERANK_MICROBATCH_ENABLED = os.getenv("RERANK_MICROBATCH_ENABLED", "1").strip().lower() not in {
+    "0",
+    "false",
+    "no",
+    "off",
+}
+RERANK_MAX_BATCH = int(os.getenv("RERANK_MAX_BATCH", "64"))
+RERANK_MAX_WAIT_MS = float(os.getenv("RERANK_MAX_WAIT_MS", "4"))
+# 요청별 마감(ms). 배치가 이 시간 안에 시작되지 못하면 BatchTimeout → 호출 측은 리랭크 없이 진행. 0이면 무제한
+RERANK_DEADLINE_MS = float(os.getenv("RERANK_DEADLINE_MS", "0"))
+
+
+def _default_rerank_device() -> str:
+    forced = os.getenv("RERANK_DEVICE", "").strip().lower()
+    if forced:
+        return forced
+    try:
+        import torch  # type: ignore
+
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    except Exception:
+        return "cpu"
+
+
+class WarmReranker:
+    """
+    미리 로드된 CrossEncoder 래퍼.
+
+    같은 모델 인스턴스를 여러 요청 스레드가 동시에 predict하면
+    GPU 메모리/토크나이저 상태가 꼬일 수 있어 predict는 락으로 직렬화한다.
+    (모델 생성 비용은 없어지고 추론 시간만 남음)
+    """
+
+    backend = "torch"
+    quantization = "fp32"
+
+    def __init__(self, model_name: str, device: str):
+        # Lazy import: sentence_transformers는 환경에 따라 없을 수 있음.
+        try:
+            from sentence_transformers import CrossEncoder  # type: ignore
+        except Exception as e:
+            raise ImportError(
+                "Reranking requires sentence-transformers. "
+                "Install it or use semantic_search() instead."
+            ) from e
+
+        self.model_name = model_name
+        self.device = device
+        self._model = CrossEncoder(model_name, device=device)
+        self._lock = threading.Lock()
+
+    def predict(self, pairs: Sequence[Tuple[str, str]]) -> List[float]:
+        if not pairs:
+            return []
+        with self._lock:
+            scores = self._model.predict(list(pairs))
+        return [float(s) for s in scores]
+
+
+class BatchedReranker:
+    """
+    리랭커 앞단의 마이크로 배칭 스케줄러.
+    여러 요청 스레드의 predict(pairs)를 max_wait_ms 동안(또는 max_batch 쌍까지) 모아
+    내부 리랭커의 predict를 한 번만 호출하고 점수를 요청별로 나눠 준다.
+    """
+
+    def __init__(
+        self,
+        reranker,
+        max_batch: int = RERANK_MAX_BATCH,
+        max_wait_ms: float = RERANK_MAX_WAIT_MS,
+        deadline_ms: float = RERANK_DEADLINE_MS,
+    ):
+        self.reranker = reranker
+        self.model_name = reranker.model_name
+        self.device = reranker.device
+        self.backend = reranker.backend
+        self.quantization = reranker.quantization
+        self.deadline_ms = deadline_ms
+        self._batcher: MicroBatcher = MicroBatcher(
+            f"rerank:{reranker.model_name}",
+            reranker.predict,
+            max_batch=max_batch,
+            max_wait_ms=max_wait_ms,
+        )
+
+    def predict(self, pairs: Sequence[Tuple[str, str]], deadline_ms: Optional[float] = None) -> List[float]:
+        """마감 초과 시 langChain_v3.batching.BatchTimeout(TimeoutError)."""
+        return self._batcher.submit(pairs, timeout_ms=deadline_ms or self.deadline_ms or None)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._batcher.stats()
+
+
+_rerankers: Dict[Tuple[str, str, str], Any] = {}
+_rerankers_lock = threading.Lock()
+
+
+def get_reranker(model_name: str, device: Optional[str] = None, backend: Optional[str] = None):
+    """
+    (model_name, device, backend)별 프로세스 전역 리랭커 반환.
+    최초 호출 시에만 모델을 로드하고, 동시에 들어온 요청은 같은 인스턴스를 기다렸다 공유한다.
+    backend를 생략하면 RERANK_BACKEND를 따른다. onnx 백엔드는 항상 CPU.
+    RERANK_MICROBATCH_ENABLED면 요청 간 마이크로 배칭 스케줄러(BatchedReranker)로 감싼다.
+    """
+    backend = (backend or RERANK_BACKEND).strip().lower()
+    device = "cpu" if backend == "onnx" else (device or _default_rerank_device())
+    key = (model_name, device, backend)
+    reranker = _rerankers.get(key)
+    if reranker is None:
+        with _rerankers_lock:
+            reranker = _rerankers.get(key)
+            if reranker is None:
+                logger.info("[RERANK] 모델 로드: %s (device=%s, backend=%s)", model_name, device, backend)
+                if backend == "onnx":
+                    from langChain_v3.RAGLLM.onnx_reranker import OnnxReranker
+
+                    reranker = OnnxReranker(model_name)
+                else:
+                    reranker = WarmReranker(model_name, device)
+                if RERANK_MICROBATCH_ENABLED:
+                    reranker = BatchedReranker(reranker)
+                _rerankers[key] = reranker
+    return reranker
+
+
+def preload_rerankers(
+    model_names: Iterable[str],
+    device: Optional[str] = None,
+    backend: Optional[str] = None,
+) -> None:
+    """서버 startup에서 호출: 사용할 리랭커를 미리 로드 (onnx면 최초 1회 export/양자화 포함)."""
+    for name in model_names:
+        if name:
+            get_reranker(name, device=device, backend=backend)
+
+
+def loaded_rerankers() -> List[Dict[str, Any]]:
+    return [
+        {
+            "model_name": name,
+            "device": device,
+            "backend": backend,
+            "quantization": reranker.quantization,
+            "batching": reranker.stats() if isinstance(reranker, BatchedReranker) else None,
+        }
+        for (name, device, backend), reranker in list(_rerankers.items())
+    ]
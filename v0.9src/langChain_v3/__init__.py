@@ -1,5 +1,5 @@
 # rag_engine/__init__.py
 
 from .embeddings import load_embedding_model
-from .vectorstore import build_vectorstore, load_vectorstore
+from .vectorstore import build_sharded_vectorstore, build_vectorstore, load_index, load_vectorstore
 # from .rag import semantic_search
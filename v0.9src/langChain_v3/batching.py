@@ -0,0 +1,189 @@
+# rag_engine/batching.py
+# 동시 요청들의 작은 작업을 몇 ms 동안 모아 한 번의 배치 호출로 처리하는 마이크로 배처
+# (리랭커 forward, 질의 임베딩 + FAISS search 등에서 공용으로 사용)
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Generic, List, Optional, Sequence, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class BatchTimeout(TimeoutError):
+    """요청 마감 시간 안에 배치 처리가 끝나지 않음."""
+
+
+class _Request(Generic[T, R]):
+    __slots__ = ("items", "deadline", "enqueued_at", "event", "result", "error", "cancelled")
+
+    def __init__(self, items: List[T], deadline: Optional[float]):
+        self.items = items
+        self.deadline = deadline
+        self.enqueued_at = time.monotonic()
+        self.event = threading.Event()
+        self.result: Optional[List[R]] = None
+        self.error: Optional[BaseException] = None
+        self.cancelled = False
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    여러 스레드가 submit(items)한 작업을 모아 process_fn(모든 items)을 한 번 호출하고
+    결과를 요청별로 다시 나눠 돌려준다.
+
+    - 가장 오래 기다린 요청 기준 max_wait_ms가 지나거나 모인 item 수가 max_batch에 닿으면 실행
+    - 요청 하나가 max_batch보다 커도 쪼개지 않고 단독 배치로 처리
+    - timeout_ms(요청별 마감): 배치가 시작되기 전에 마감이 지나면 처리하지 않고 BatchTimeout
+    - 처리는 전용 워커 스레드 1개 → 모델 호출이 직렬화되어 락 경합이 없다
+    - process_fn이 item 자리에 예외 객체를 돌려주면 그 item이 속한 요청만 실패한다
+      (process_fn 자체가 예외를 던지면 배치의 모든 요청이 실패)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        process_fn: Callable[[List[T]], Sequence[R]],
+        max_batch: int = 64,
+        max_wait_ms: float = 5.0,
+    ):
+        self.name = name
+        self.process_fn = process_fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: Deque[_Request] = deque()
+        self._queued_items = 0
+        self._cond = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+
+        self.requests = 0
+        self.batches = 0
+        self.batched_items = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.max_queue_depth = 0
+        self._wait_ms_total = 0.0
+        self._run_ms_total = 0.0
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._loop, name=f"microbatch-{self.name}", daemon=True)
+            self._worker.start()
+
+    def submit(self, items: Sequence[T], timeout_ms: Optional[float] = None) -> List[R]:
+        """items를 다음 배치에 태우고 결과가 나올 때까지 대기 (블로킹)."""
+        items = list(items)
+        if not items:
+            return []
+        timeout = timeout_ms / 1000.0 if timeout_ms else None
+        req: _Request = _Request(items, time.monotonic() + timeout if timeout else None)
+
+        with self._cond:
+            self._ensure_worker()
+            self._queue.append(req)
+            self._queued_items += len(items)
+            self.requests += 1
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+            self._cond.notify()
+
+        if not req.event.wait(timeout):
+            with self._cond:
+                if not req.event.is_set():
+                    # 아직 배치에 안 들어갔으면 빼고, 실행 중이면 결과만 버린다
+                    req.cancelled = True
+                    self.timeouts += 1
+        if req.cancelled:
+            raise BatchTimeout(f"[{self.name}] {timeout_ms}ms 안에 처리되지 않았습니다.")
+
+        if req.error is not None:
+            raise req.error
+        return req.result  # type: ignore[return-value]
+
+    def _take_batch(self) -> List[_Request]:
+        """조건(크기/대기 시간)이 찰 때까지 기다렸다가 이번 배치에 넣을 요청들을 꺼낸다."""
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+
+            while self._queued_items < self.max_batch:
+                remaining = self._queue[0].enqueued_at + self.max_wait - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch: List[_Request] = []
+            size = 0
+            now = time.monotonic()
+            while self._queue:
+                req = self._queue[0]
+                if batch and size + len(req.items) > self.max_batch:
+                    break
+                self._queue.popleft()
+                self._queued_items -= len(req.items)
+                if req.cancelled:
+                    continue
+                if req.deadline is not None and now > req.deadline:
+                    req.cancelled = True
+                    self.timeouts += 1
+                    req.event.set()
+                    continue
+                batch.append(req)
+                size += len(req.items)
+            return batch
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                continue
+
+            flat: List[T] = [item for req in batch for item in req.items]
+            started = time.monotonic()
+            try:
+                results = list(self.process_fn(flat))
+                if len(results) != len(flat):
+                    raise RuntimeError(f"[{self.name}] 결과 수({len(results)})가 입력 수({len(flat)})와 다릅니다.")
+                pos = 0
+                for req in batch:
+                    req.result = results[pos : pos + len(req.items)]
+                    pos += len(req.items)
+                    req.error = next((r for r in req.result if isinstance(r, BaseException)), None)
+                    if req.error is not None:
+                        self.errors += 1
+            except Exception as e:  # 요청 스레드로 그대로 전달
+                logger.exception("[BATCH] %s 배치 처리 실패 (%d items)", self.name, len(flat))
+                self.errors += 1
+                for req in batch:
+                    req.error = e
+            finished = time.monotonic()
+
+            self.batches += 1
+            self.batched_items += len(flat)
+            self._run_ms_total += (finished - started) * 1000.0
+            self._wait_ms_total += sum((started - req.enqueued_at) * 1000.0 for req in batch)
+            for req in batch:
+                req.event.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            depth = len(self._queue)
+            queued_items = self._queued_items
+        return {
+            "name": self.name,
+            "max_batch": self.max_batch,
+            "max_wait_ms": round(self.max_wait * 1000.0, 2),
+            "queue_depth": depth,
+            "queued_items": queued_items,
+            "max_queue_depth": self.max_queue_depth,
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch_items": round(self.batched_items / self.batches, 2) if self.batches else 0.0,
+            "avg_queue_wait_ms": round(self._wait_ms_total / self.requests, 3) if self.requests else 0.0,
+            "avg_batch_run_ms": round(self._run_ms_total / self.batches, 3) if self.batches else 0.0,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+        }
@@ -1,27 +1,40 @@
 # rag_engine/chunker.py
 from typing import Optional
 import logging
+import os
 
+from .context_cache import get_context_cache
+from .rerank_cache import get_rerank_cache
 from .db import get_connection
-from .preprocess import chunk_text, sha256_text
+from .preprocess import chunk_text_with_offsets, group_parent_blocks, sha256_text
 from .repository import (
+    ensure_chunk_offset_columns,
+    ensure_parent_tables,
     load_main_texts,
     get_existing_source_hash,
     delete_chunks_for_meta,
     insert_chunk,
+    insert_parent,
 )
 
 logger = logging.getLogger(__name__)
 
+# 부모 블록(small-to-big) 최대 토큰 수. 0이면 부모 블록을 만들지 않는다(창 확장으로 문맥 구성)
+PARENT_CHUNK_SIZE = int(os.getenv("PARENT_CHUNK_SIZE", "1200"))
+
 
 def rebuild_chunks(
     chunk_size: int = 350,
     overlap: int = 60,
     limit: Optional[int] = None,
+    parent_size: int = PARENT_CHUNK_SIZE,
 ):
     """
     meta_id 기준으로 chunks를 재구성.
 
+    parent_size > 0이면 연속된 자식 청크를 묶은 부모 블록을 chunk_parents에 함께 저장하고
+    자식마다 parent_index(자식 → 부모 포인터)를 기록한다. 검색 시 부모 본문을 그대로 문맥으로 쓴다.
+
     중요:
     - meta_id/청크마다 새 DB 커넥션을 열면 Windows에서 로컬 포트(TIME_WAIT) 고갈로
       WinError 10048이 발생할 수 있어, 1개의 커넥션을 재사용합니다.
@@ -29,6 +42,8 @@ def rebuild_chunks(
     conn = get_connection()
     try:
         with conn.cursor() as cur:
+            ensure_chunk_offset_columns(cur=cur)
+            ensure_parent_tables(cur=cur)
             rows = load_main_texts(limit=limit, cur=cur)
             logger.info(f"[CHUNKER] 청킹 대상 문서 수 {len(rows)} (limit={limit})")
 
@@ -46,7 +61,12 @@ def rebuild_chunks(
                     logger.error(f"[SKIP] 빈 텍스트 meta_id={meta_id}")
                     continue
 
-                new_hash = sha256_text(text + f"\n__chunk_size={chunk_size},overlap={overlap}__")
+                # offsets=1: 오프셋 컬럼 도입 전 청크도 한 번은 재청킹되도록 해시에 포함
+                # parents=N: 부모 블록 크기가 바뀌거나 처음 도입될 때도 재청킹
+                params = f"chunk_size={chunk_size},overlap={overlap},offsets=1"
+                if parent_size > 0:
+                    params += f",parents={parent_size}"
+                new_hash = sha256_text(text + f"\n__{params}__")
                 old_hash = get_existing_source_hash(meta_id, cur=cur)
 
                 if old_hash == new_hash:
@@ -55,19 +75,42 @@ def rebuild_chunks(
 
                 delete_chunks_for_meta(meta_id, cur=cur, commit=False)
 
-                chunks = chunk_text(text, chunk_size=chunk_size, overlap=overlap)
-                for idx, chunk in enumerate(chunks):
+                chunks = chunk_text_with_offsets(text, chunk_size=chunk_size, overlap=overlap)
+
+                parent_of = {}
+                parents = group_parent_blocks(text, chunks, parent_size=parent_size) if parent_size > 0 else []
+                for p_idx, (parent_text, start, end, members) in enumerate(parents):
+                    insert_parent(
+                        meta_id=meta_id,
+                        parent_index=p_idx,
+                        text=parent_text,
+                        source_hash=new_hash,
+                        start_offset=start,
+                        end_offset=end,
+                        cur=cur,
+                        commit=False,
+                    )
+                    for pos in members:
+                        parent_of[pos] = p_idx
+
+                for idx, (chunk, start, end) in enumerate(chunks):
                     insert_chunk(
                         meta_id=meta_id,
                         chunk_index=idx,
                         text=chunk,
                         source_hash=new_hash,
+                        start_offset=start,
+                        end_offset=end,
+                        parent_index=parent_of.get(idx),
                         cur=cur,
                         commit=False,
                     )
 
                 conn.commit()
-                logger.info(f"[CHUNKER] meta_id={meta_id} 청킹 완료 ({len(chunks)} chunks)")
+                # 같은 프로세스에 캐싱된 예전 문맥 확장 결과 / 리랭크 점수 제거
+                get_context_cache().invalidate_meta(meta_id)
+                get_rerank_cache().invalidate_meta(meta_id)
+                logger.info(f"[CHUNKER] meta_id={meta_id} 청킹 완료 ({len(chunks)} chunks, {len(parents)} parents)")
 
         logger.info("[DONE] chunks 테이블 재구성 완료")
     finally:
@@ -0,0 +1,136 @@
+# rag_engine/context_cache.py
+# 문맥 확장 결과(title, url, context_text)를 (meta_id, chunk_index, window) 단위로 캐싱하는 프로세스 내 LRU
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+CacheKey = Tuple[str, int, int]
+
+CONTEXT_CACHE_MAX_MB = float(os.getenv("CONTEXT_CACHE_MAX_MB", "64"))
+
+
+def _entry_size(entry: Dict[str, Any]) -> int:
+    # 대부분 한글 텍스트라 utf-8 바이트 수로 대략적인 메모리 사용량을 잡는다.
+    size = 0
+    for v in entry.values():
+        if isinstance(v, str):
+            size += len(v.encode("utf-8"))
+    return size + 64
+
+
+class ContextWindowCache:
+    """
+    메모리 상한(바이트) 기반 LRU.
+
+    - value: {"title", "url", "context_text", "source_hash"}
+    - window 자리가 -1(rag.PARENT_WINDOW)인 키는 창 확장 대신 부모 블록 본문 항목
+      (부모가 없는 청크면 {"no_parent": True, "source_hash"} 음성 항목)
+    - source_hash가 다른 hit로 조회되면(재청킹된 문서) 해당 meta_id 전체를 버린다.
+    - rebuild_chunks()가 meta_id를 재청킹하면 invalidate_meta()로 즉시 제거된다 (같은 프로세스).
+    - 다른 프로세스에서 재청킹/재빌드된 문서는 각 워커가 새 인덱스를 로드할 때
+      RetrievalEngine.reload()가 바뀐 meta_id만 invalidate_metas()로 제거한다.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[CacheKey, Dict[str, Any]]" = OrderedDict()
+        self._sizes: Dict[CacheKey, int] = {}
+        self._by_meta: Dict[str, Set[CacheKey]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: CacheKey, source_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if source_hash is not None and entry.get("source_hash") not in (None, source_hash):
+                self._drop_meta(key[0])
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: CacheKey, entry: Dict[str, Any]) -> None:
+        size = _entry_size(entry)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = entry
+            self._sizes[key] = size
+            self._by_meta.setdefault(key[0], set()).add(key)
+            self._bytes += size
+
+            while self._bytes > self.max_bytes and self._data:
+                old_key = next(iter(self._data))
+                self._remove(old_key)
+                self.evictions += 1
+
+    def invalidate_meta(self, meta_id: str) -> None:
+        with self._lock:
+            self._drop_meta(meta_id)
+
+    def invalidate_metas(self, meta_ids: Iterable[str]) -> None:
+        with self._lock:
+            for meta_id in meta_ids:
+                self._drop_meta(meta_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._by_meta.clear()
+            self._bytes = 0
+
+    def _drop_meta(self, meta_id: str) -> None:
+        keys = self._by_meta.pop(meta_id, None)
+        if not keys:
+            return
+        for key in list(keys):
+            self._remove(key)
+        self.invalidations += 1
+
+    def _remove(self, key: CacheKey) -> None:
+        self._data.pop(key, None)
+        self._bytes -= self._sizes.pop(key, 0)
+        keys = self._by_meta.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                self._by_meta.pop(key[0], None)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+_cache: Optional[ContextWindowCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_context_cache() -> ContextWindowCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ContextWindowCache(int(CONTEXT_CACHE_MAX_MB * 1024 * 1024))
+    return _cache
@@ -0,0 +1,245 @@
+# rag_engine/dedup.py
+# 인덱스 빌드 시 거의 같은 청크(반복 공지 문구, 여러 페이지에 붙은 같은 첨부파일) 제거:
+# 문자 n-gram MinHash + LSH banding
+# 클러스터마다 대표 청크 하나만 임베딩하고, 나머지는 대표에 매핑해 인용(also_in)에 쓴다.
+# 중복 판정은 기본적으로 전체 청크에서 한다 (CHUNK_DEDUP_SCOPE=global). 빠진 청크의 필터/샤드 속성
+# (year, source_type, department, segment)은 duplicates 항목에 남겨, 대표가 그 합집합으로도
+# 필터(DuplicateAliases → filter_mask)와 샤드 배치(segments)에 걸리게 한다.
+# CHUNK_DEDUP_SCOPE=group이면 속성이 모두 같은 청크끼리만 중복으로 본다.
+import json
+import logging
+import os
+import re
+import zlib
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CHUNK_DEDUP_ENABLED = os.getenv("CHUNK_DEDUP_ENABLED", "1").strip().lower() not in {
+    "0",
+    "false",
+    "no",
+    "off",
+}
+# 추정 Jaccard 유사도가 이 값 이상이면 중복으로 본다
+CHUNK_DEDUP_THRESHOLD = float(os.getenv("CHUNK_DEDUP_THRESHOLD", "0.85"))
+CHUNK_DEDUP_NUM_PERM = int(os.getenv("CHUNK_DEDUP_NUM_PERM", "64"))
+CHUNK_DEDUP_BANDS = int(os.getenv("CHUNK_DEDUP_BANDS", "16"))
+CHUNK_DEDUP_SHINGLE = int(os.getenv("CHUNK_DEDUP_SHINGLE", "5"))
+# 중복 판정 범위: "global"(전체) | "group"(dedup_group 속성이 같은 청크끼리만)
+CHUNK_DEDUP_SCOPE = os.getenv("CHUNK_DEDUP_SCOPE", "global").strip().lower()
+DEDUP_SCOPES = ("global", "group")
+# duplicates 항목에 남기는 빠진 청크의 속성 (filters.FILTER_ATTRS + 샤드 세그먼트)
+DUPLICATE_ATTRS = ("year", "source_type", "department", "segment")
+
+# 인덱스 디렉터리에 저장하는 대표 chunk_id → 중복 청크 목록
+DUPLICATES_FILE = "duplicates.json"
+
+_SPACES = re.compile(r"\s+")
+_PRIME = (1 << 31) - 1
+
+
+def shingle_hashes(text: str, n: int = CHUNK_DEDUP_SHINGLE) -> np.ndarray:
+    """공백 정리 후 문자 n-gram → crc32 해시 집합 (한글은 띄어쓰기가 흔들려 단어 대신 문자 단위)."""
+    text = _SPACES.sub(" ", text or "").strip().lower()
+    if len(text) <= n:
+        grams = {text}
+    else:
+        grams = {text[i : i + n] for i in range(len(text) - n + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype="uint64", count=len(grams))
+
+
+class MinHasher:
+    """(a * x + b) mod p 해시 num_perm개로 MinHash 시그니처 생성 (시드 고정 → 빌드마다 같은 결과)."""
+
+    def __init__(self, num_perm: int = CHUNK_DEDUP_NUM_PERM, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(1, _PRIME, size=(num_perm, 1), dtype="uint64")
+        self._b = rng.integers(0, _PRIME, size=(num_perm, 1), dtype="uint64")
+
+    def signature(self, hashes: np.ndarray) -> np.ndarray:
+        x = (hashes % _PRIME)[None, :]
+        # a, x < 2^31 → a * x < 2^62 (uint64 범위 안)
+        return ((self._a * x + self._b) % _PRIME).min(axis=1)
+
+
+def _priority(meta: Dict[str, Any]) -> Tuple[int, int]:
+    """대표 청크 우선순위: 최신 연도 먼저, 같으면 먼저 만들어진(chunk_id 작은) 청크."""
+    return (-(meta.get("year") or 0), int(meta.get("chunk_id") or 0))
+
+
+def dedup_group(meta: Dict[str, Any]) -> Tuple[str, str, int, str]:
+    """중복 판정 범위: 필터(filter_mask)와 샤드 라우팅(shards_for_filters)이 보는 속성이 모두 같은 청크끼리."""
+    return (
+        meta.get("segment") or "",
+        meta.get("source_type") or "",
+        int(meta.get("year") or 0),
+        meta.get("department") or "",
+    )
+
+
+def find_near_duplicates(
+    texts: Sequence[str],
+    metas: Sequence[Dict[str, Any]],
+    threshold: float = CHUNK_DEDUP_THRESHOLD,
+    num_perm: int = CHUNK_DEDUP_NUM_PERM,
+    bands: int = CHUNK_DEDUP_BANDS,
+    groups: Optional[Sequence[Hashable]] = None,
+) -> List[int]:
+    """
+    청크별 대표 위치 반환: canonical[i] == i면 대표, 아니면 대표 청크의 위치.
+
+    우선순위 순서로 훑으면서 LSH 버킷에서 후보 대표를 찾고, 시그니처 일치 비율(추정 Jaccard)이
+    threshold 이상인 첫 대표에 붙인다. 대표만 버킷에 넣으므로 클러스터가 사슬처럼 번지지 않는다.
+    groups(청크별 그룹 키)를 주면 버킷 키에 그룹을 넣어 같은 그룹 안에서만 중복으로 본다.
+    """
+    rows = max(1, num_perm // bands)
+    hasher = MinHasher(num_perm=rows * bands)
+    signatures = [hasher.signature(shingle_hashes(t)) for t in texts]
+
+    canonical = list(range(len(texts)))
+    buckets: Dict[Tuple[Optional[Hashable], int, bytes], List[int]] = {}
+    order = sorted(range(len(texts)), key=lambda i: _priority(metas[i]))
+    for i in order:
+        sig = signatures[i]
+        group = groups[i] if groups is not None else None
+        keys = [(group, b, sig[b * rows : (b + 1) * rows].tobytes()) for b in range(bands)]
+
+        match: Optional[int] = None
+        seen = set()
+        for key in keys:
+            for c in buckets.get(key, ()):
+                if c in seen:
+                    continue
+                seen.add(c)
+                if float(np.mean(signatures[c] == sig)) >= threshold:
+                    match = c
+                    break
+            if match is not None:
+                break
+
+        if match is None:
+            for key in keys:
+                buckets.setdefault(key, []).append(i)
+        else:
+            canonical[i] = match
+    return canonical
+
+
+def dedupe_documents(
+    documents: List[Any],
+    threshold: float = CHUNK_DEDUP_THRESHOLD,
+    scope: str = CHUNK_DEDUP_SCOPE,
+) -> List[Any]:
+    """
+    Document 리스트 → 대표 Document만 남긴 리스트 (원래 순서 유지).
+    대표 Document.metadata에는 duplicates=[{"chunk_id", "meta_id", year/source_type/department/segment}, ...],
+    also_in=[중복이 있던 다른 meta_id...], segments=[대표 + 중복 청크의 세그먼트 합집합]을 붙인다.
+    scope="group"이면 dedup_group이 같은 청크끼리만 찾는다 (다른 연도/세그먼트의 같은 문구는 각각 남긴다).
+    """
+    if scope not in DEDUP_SCOPES:
+        raise ValueError(f"지원하지 않는 CHUNK_DEDUP_SCOPE: {scope} (가능: {', '.join(DEDUP_SCOPES)})")
+    if len(documents) < 2:
+        return documents
+    metas = [d.metadata for d in documents]
+    canonical = find_near_duplicates(
+        [d.page_content for d in documents],
+        metas,
+        threshold=threshold,
+        groups=[dedup_group(m) for m in metas] if scope == "group" else None,
+    )
+
+    for i, c in enumerate(canonical):
+        if c == i:
+            continue
+        meta = metas[c]
+        entry = {"chunk_id": metas[i]["chunk_id"], "meta_id": metas[i]["meta_id"]}
+        entry.update({name: metas[i].get(name) for name in DUPLICATE_ATTRS if name in metas[i]})
+        meta.setdefault("duplicates", []).append(entry)
+        if metas[i]["meta_id"] != meta["meta_id"] and metas[i]["meta_id"] not in meta.setdefault("also_in", []):
+            meta["also_in"].append(metas[i]["meta_id"])
+        if metas[i].get("segment"):
+            segments = meta.setdefault("segments", [meta.get("segment") or "etc"])
+            if metas[i]["segment"] not in segments:
+                segments.append(metas[i]["segment"])
+
+    kept = [d for i, d in enumerate(documents) if canonical[i] == i]
+    removed = len(documents) - len(kept)
+    logger.info(
+        "[DEDUP] 청크 %d개 → %d개 (근사 중복 %d개 제거, %.1f%%, threshold=%.2f)",
+        len(documents),
+        len(kept),
+        removed,
+        100.0 * removed / len(documents),
+        threshold,
+    )
+    return kept
+
+
+def save_duplicate_map(index_dir: str, documents: List[Any]) -> int:
+    """대표 chunk_id → 중복 청크 목록을 index_dir/duplicates.json에 저장 (없으면 파일 제거). 반환: 대표 수."""
+    mapping = {
+        str(d.metadata["chunk_id"]): {
+            "also_in": d.metadata.get("also_in", []),
+            "duplicates": d.metadata["duplicates"],
+        }
+        for d in documents
+        if d.metadata.get("duplicates")
+    }
+    path = os.path.join(index_dir, DUPLICATES_FILE)
+    if not mapping:
+        if os.path.exists(path):
+            os.remove(path)
+        return 0
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(mapping, f, ensure_ascii=False)
+    os.replace(tmp, path)
+    return len(mapping)
+
+
+class DuplicateAliases:
+    """
+    빠진 중복 청크의 필터 속성 컬럼 + 그 대표 청크의 FAISS row.
+    filters.filter_mask가 IdStore와 같은 방식으로 읽어, 중복 청크가 통과하면 대표 row도 통과시킨다.
+    """
+
+    def __init__(self, rows: np.ndarray, year: np.ndarray, source_type: np.ndarray, department: np.ndarray):
+        self.rows = rows
+        self.year = year
+        self.source_type = source_type
+        self.department = department
+
+    def __len__(self) -> int:
+        return int(self.rows.shape[0])
+
+    @classmethod
+    def from_map(cls, duplicates: Dict[int, Dict[str, Any]], chunk_ids: np.ndarray) -> Optional["DuplicateAliases"]:
+        """duplicates.json(load_duplicate_map) + 번들 chunk_id 컬럼 → 별칭 컬럼. 속성이 없는 구버전 맵이면 None."""
+        row_of = {int(c): r for r, c in enumerate(np.asarray(chunk_ids).tolist())}
+        entries = [
+            (row_of[rep_id], dup)
+            for rep_id, info in duplicates.items()
+            if rep_id in row_of
+            for dup in info.get("duplicates", [])
+            if "year" in dup
+        ]
+        if not entries:
+            return None
+        return cls(
+            rows=np.asarray([r for r, _ in entries], dtype="int64"),
+            year=np.asarray([d.get("year") or 0 for _, d in entries], dtype="int16"),
+            source_type=np.asarray([d.get("source_type") or "" for _, d in entries], dtype=str),
+            department=np.asarray([d.get("department") or "" for _, d in entries], dtype=str),
+        )
+
+
+def load_duplicate_map(index_dir: str) -> Dict[int, Dict[str, Any]]:
+    path = os.path.join(index_dir, DUPLICATES_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return {int(k): v for k, v in json.load(f).items()}
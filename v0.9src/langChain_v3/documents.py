@@ -1,17 +1,23 @@
 # rag_engine/documents.py
 # 청킹한 조각을 임베딩하기 위해 LangChain Document 객체로 변환
-from typing import List
+from typing import List, Optional
 from langchain_core.documents import Document
 
+from .dedup import CHUNK_DEDUP_ENABLED, dedupe_documents
+from .filters import document_attrs
 from .repository import load_all_chunks
+from .shards import segment_of
 import logging
 logger = logging.getLogger(__name__)
 
 
-def build_documents_from_chunks() -> List[Document]:
+def build_documents_from_chunks(dedupe: Optional[bool] = None) -> List[Document]:
     """
     chunks 테이블의 내용을 LangChain Document 리스트로 변환.
     meta_id 기준 구조.
+
+    dedupe(None이면 CHUNK_DEDUP_ENABLED): 근사 중복 청크는 대표 하나만 남기고,
+    대표 metadata의 duplicates / also_in에 나머지를 기록한다 (dedup.py).
     """
     rows = load_all_chunks()
     docs: List[Document] = []
@@ -24,9 +30,18 @@ def build_documents_from_chunks() -> List[Document]:
                     "chunk_id": row["chunk_id"],
                     "meta_id": row["meta_id"],          # ✅ 문서 식별자
                     "chunk_index": row["chunk_index"],  # ✅ 문서 내 위치
+                    "source_hash": row.get("source_hash"),  # 문맥 캐시 무효화 판단용
+                    # 부모 블록 번호 (chunk_parents, 없으면 None → 창 확장)
+                    "parent_index": row.get("parent_index"),
+                    # 검색 필터 속성 (year / source_type / department)
+                    **document_attrs(row["meta_id"], row.get("title"), row.get("file_path")),
+                    # 샤드 인덱스 세그먼트 (board / subview / file / manual / etc)
+                    "segment": segment_of(row["meta_id"], row.get("url"), row.get("file_path")),
                 },
             )
         )
 
     logger.info(f"[INFO] Document 개수: {len(docs)}")
+    if CHUNK_DEDUP_ENABLED if dedupe is None else dedupe:
+        docs = dedupe_documents(docs)
     return docs
@@ -63,10 +63,39 @@ class E5PrefixedEmbeddings(Embeddings):
     def embed_query(self, text: str) -> List[float]:
         return self._base.embed_query(_maybe_prefix(text, self.query_prefix))
 
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        # 여러 질의를 한 번의 forward로 (query prefix는 유지)
+        prefixed = [_maybe_prefix(t, self.query_prefix) for t in texts]
+        return self._base.embed_documents(prefixed)
+
     def __getattr__(self, name: str):
         return getattr(self._base, name)
 
 
+def embed_queries(embeddings: Any, texts: List[str]) -> List[List[float]]:
+    """
+    여러 질의 임베딩을 가능한 한 한 번의 배치 forward로 계산.
+
+    - embed_queries()를 제공하는 래퍼(E5, 캐시 래퍼)는 그대로 사용
+    - HuggingFaceEmbeddings.embed_query는 embed_documents([text])[0]과 같으므로 배치로 대체
+    - 그 외에는 embed_query 반복
+    """
+    if not texts:
+        return []
+    if hasattr(type(embeddings), "embed_queries"):
+        return embeddings.embed_queries(list(texts))
+    if isinstance(embeddings, HuggingFaceEmbeddings):
+        return embeddings.embed_documents(list(texts))
+    return [embeddings.embed_query(t) for t in texts]
+
+
+def embedding_model_id(embeddings: Any) -> str:
+    """캐시 키 등에 쓰는 임베딩 모델 식별자: "<mode>:<model_name>" """
+    mode = os.getenv("EMBEDDINGS_MODE", "ko").strip().lower()
+    model_name = getattr(embeddings, "model_name", None) or type(embeddings).__name__
+    return f"{mode}:{model_name}"
+
+
 def load_embedding_model():
     """
     기본값: 한국어 전용 임베딩 + GPU 사용.
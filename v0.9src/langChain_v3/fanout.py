@@ -0,0 +1,132 @@
+# rag_engine/fanout.py
+# 검색 소스(내부 FAISS, 웹 검색 등) 병렬 호출: 프로세스 공용 스레드 풀 + 소스별 마감 시간
+# 마감 안에 돌아온 소스 결과만으로 진행하고, 늦은 소스는 취소/폐기 후 이름만 보고한다.
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+RETRIEVAL_FANOUT_WORKERS = int(os.getenv("RETRIEVAL_FANOUT_WORKERS", "16"))
+# 요청 전체 검색 예산(ms). 소스별 마감이 없으면 이 값을 쓴다
+RETRIEVAL_BUDGET_MS = float(os.getenv("RETRIEVAL_BUDGET_MS", "3000"))
+
+
+class FanOutResult:
+    def __init__(self):
+        self.results: Dict[str, Any] = {}
+        self.timed_out: List[str] = []
+        self.failed: Dict[str, str] = {}
+        self.elapsed_ms = 0.0
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.results.get(name, default)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "timed_out_sources": list(self.timed_out),
+            "failed_sources": dict(self.failed),
+            "retrieval_ms": round(self.elapsed_ms, 2),
+        }
+
+
+class FanOutExecutor:
+    """
+    요청마다 ThreadPoolExecutor를 만들지 않고 하나의 풀을 공유한다.
+    풀 안의 작업이 같은 풀에 다시 fan-out하면 워커가 서로를 기다리며 고갈될 수 있으므로,
+    안쪽 단계(샤드 검색 등)는 name이 다른 별도 FanOutExecutor를 쓴다.
+
+    run(tasks, deadlines_ms): 모든 소스를 동시에 시작하고
+    - 소스별 마감(deadlines_ms[name], 없으면 budget_ms)을 넘긴 소스는 future.cancel() 후 timed_out에 기록
+      (이미 실행 중인 호출은 파이썬 스레드 특성상 중단되지 않으므로 결과만 버린다)
+    - 예외가 난 소스는 failed에 기록
+    - 나머지 소스 결과로 바로 반환 → 요청 지연은 가장 느린 백엔드가 아니라 예산으로 제한된다
+    """
+
+    def __init__(self, max_workers: int = RETRIEVAL_FANOUT_WORKERS, name: str = "retrieval-fanout"):
+        self.name = name
+        self.max_workers = max(2, max_workers)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.timeouts: Dict[str, int] = {}
+        self.failures: Dict[str, int] = {}
+        self.abandoned = 0
+
+    def run(
+        self,
+        tasks: Mapping[str, Callable[[], Any]],
+        deadlines_ms: Optional[Mapping[str, float]] = None,
+        budget_ms: float = RETRIEVAL_BUDGET_MS,
+    ) -> FanOutResult:
+        out = FanOutResult()
+        started = time.monotonic()
+        deadlines_ms = deadlines_ms or {}
+
+        futures: Dict[Future, str] = {}
+        deadline_at: Dict[str, float] = {}
+        for name, fn in tasks.items():
+            futures[self._pool.submit(fn)] = name
+            limit = min(deadlines_ms.get(name) or budget_ms, budget_ms)
+            deadline_at[name] = started + limit / 1000.0
+
+        pending = set(futures)
+        while pending:
+            now = time.monotonic()
+            nearest = min(deadline_at[futures[f]] for f in pending)
+            done, pending = wait(pending, timeout=max(0.0, nearest - now), return_when=FIRST_COMPLETED)
+
+            for f in done:
+                name = futures[f]
+                try:
+                    out.results[name] = f.result()
+                except Exception as e:
+                    logger.warning("[FANOUT] %s 실패: %s", name, e)
+                    out.failed[name] = repr(e)
+
+            now = time.monotonic()
+            for f in [f for f in pending if deadline_at[futures[f]] <= now]:
+                pending.discard(f)
+                name = futures[f]
+                if not f.cancel():
+                    with self._lock:
+                        self.abandoned += 1
+                out.timed_out.append(name)
+                logger.warning("[FANOUT] %s 마감 초과 → 결과 없이 진행", name)
+
+        out.elapsed_ms = (time.monotonic() - started) * 1000.0
+        with self._lock:
+            self.requests += 1
+            for name in out.timed_out:
+                self.timeouts[name] = self.timeouts.get(name, 0) + 1
+            for name in out.failed:
+                self.failures[name] = self.failures.get(name, 0) + 1
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "max_workers": self.max_workers,
+            "budget_ms": RETRIEVAL_BUDGET_MS,
+            "requests": self.requests,
+            "timeouts": dict(self.timeouts),
+            "failures": dict(self.failures),
+            # 마감 후에도 계속 실행된(취소 불가) 호출 수
+            "abandoned": self.abandoned,
+        }
+
+
+_executor: Optional[FanOutExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_fanout_executor() -> FanOutExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = FanOutExecutor()
+    return _executor
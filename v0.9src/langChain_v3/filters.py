@@ -0,0 +1,213 @@
+# rag_engine/filters.py
+# 벡터별 필터 속성(연도 / html·file / 학과) 추출 + 질의에서 필터 자동 추출
+# + FAISS 검색 안에서 적용하는 ID selector(bitmap) 생성
+import logging
+import os
+import re
+from typing import Any, Dict, Optional, Tuple
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 질의에서 필터를 자동 추출할지 (semantic_search에 filters를 직접 주면 그 값이 우선)
+RAG_AUTO_FILTERS = os.getenv("RAG_AUTO_FILTERS", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+# selector를 지원하지 않는 인덱스(IndexPQ 등)에서 필터 없이 뽑을 후보 배수 (모자라면 2배씩 늘려 재검색)
+FILTER_OVERFETCH = int(os.getenv("FILTER_OVERFETCH", "4"))
+
+SOURCE_TYPES = ("html", "file")
+# 번들에 저장하는 필터 속성 컬럼 (IdStore 속성명)
+FILTER_ATTRS = ("year", "source_type", "department")
+
+_YEAR = re.compile(r"(?<!\d)(20\d{2})(?!\d)")
+_SHORT_YEAR = re.compile(r"(?<!\d)(\d{2})\s*학년도")
+_DEPARTMENT = re.compile(r"([가-힣A-Za-z]{2,}(?:학과|학부|전공))")
+# 학과명이 아닌 전공 제도 용어
+_NOT_DEPARTMENT = {"복수전공", "연계전공", "융합전공", "심화전공", "주전공", "세부전공", "자유전공", "학생설계전공"}
+# "양식/서식"을 찾는 질문은 첨부파일(hwp/pdf 등) 문서에 답이 있다.
+_FILE_HINT = re.compile(r"(양식|서식|신청서|첨부\s*파일|hwp|pdf)", re.IGNORECASE)
+
+
+def parse_year(*texts: Optional[str]) -> int:
+    """meta_id / title 등에서 첫 번째 연도(20xx) 추출. 없으면 0."""
+    for text in texts:
+        if not text:
+            continue
+        m = _YEAR.search(text)
+        if m:
+            return int(m.group(1))
+        m = _SHORT_YEAR.search(text)
+        if m:
+            return 2000 + int(m.group(1))
+    return 0
+
+
+def parse_department(*texts: Optional[str]) -> str:
+    """'컴퓨터공학과', '경영학부' 같은 학과/전공명 추출. 없으면 ''."""
+    for text in texts:
+        if not text:
+            continue
+        for m in _DEPARTMENT.finditer(text):
+            if m.group(1) not in _NOT_DEPARTMENT:
+                return m.group(1)
+    return ""
+
+
+def source_type(file_path: Optional[str]) -> str:
+    """DBfetcher와 같은 기준: metadata.file_path가 있으면 'file', 없으면 'html'."""
+    return "file" if file_path else "html"
+
+
+def document_attrs(meta_id: Optional[str], title: Optional[str], file_path: Optional[str]) -> Dict[str, Any]:
+    """문서(meta_id) 단위 필터 속성. 청크 Document.metadata에 그대로 들어간다."""
+    return {
+        "year": parse_year(meta_id, title, file_path),
+        "source_type": source_type(file_path),
+        "department": parse_department(title, file_path),
+    }
+
+
+def extract_query_filters(query: str) -> Dict[str, Any]:
+    """
+    질문에서 필터 자동 추출.
+    예) "2025 교육과정" → {"year": 2025}, "휴학원 양식" → {"source_type": "file"}
+    """
+    filters: Dict[str, Any] = {}
+    year = parse_year(query)
+    if year:
+        filters["year"] = year
+    if _FILE_HINT.search(query or ""):
+        filters["source_type"] = "file"
+    department = parse_department(query)
+    if department:
+        filters["department"] = department
+    return filters
+
+
+def resolve_filters(query: str, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """명시한 filters가 있으면 그대로, None이면 (RAG_AUTO_FILTERS일 때) 질문에서 추출. {}는 필터 없음."""
+    if filters is not None:
+        return filters
+    return extract_query_filters(query) if RAG_AUTO_FILTERS else {}
+
+
+def filter_mask(ids, filters: Optional[Dict[str, Any]], aliases=None) -> Optional[np.ndarray]:
+    """
+    IdStore 속성 컬럼 → 통과 여부 bool 마스크 [ntotal]. 적용할 필터가 없으면 None.
+
+    - year / department: 값이 다른 문서만 제외 (연도·학과 정보가 없는 공통 문서는 유지)
+    - source_type: 정확히 일치하는 것만
+    번들에 해당 컬럼이 없으면(구버전) 그 필터는 무시한다.
+    aliases(dedup.DuplicateAliases): 빌드 시 빠진 중복 청크의 속성. 중복 청크가 통과하면 그 대표 row도 통과.
+    """
+    if not filters:
+        return None
+    mask = _attr_mask(ids, filters)
+    if mask is None or aliases is None or not len(aliases):
+        return mask
+    alias_mask = _attr_mask(aliases, filters)
+    if alias_mask is None:
+        return mask
+    mask = mask.copy()
+    mask[np.asarray(aliases.rows)[alias_mask]] = True
+    return mask
+
+
+def _attr_mask(ids, filters: Dict[str, Any]) -> Optional[np.ndarray]:
+    mask: Optional[np.ndarray] = None
+    for name in FILTER_ATTRS:
+        value = filters.get(name)
+        column = getattr(ids, name, None)
+        if value in (None, "") or column is None:
+            continue
+        column = np.asarray(column)
+        if name == "source_type":
+            cond = column == value
+        elif name == "year":
+            cond = (column == int(value)) | (column == 0)
+        else:
+            cond = (column == value) | (column == "")
+        mask = cond if mask is None else (mask & cond)
+    return mask
+
+
+def search_params_with_selector(index, mask: np.ndarray) -> Tuple[Any, Any]:
+    """
+    bool 마스크 → IDSelectorBitmap을 담은 SearchParameters.
+    인덱스 타입별 검색 파라미터(nprobe / efSearch)는 현재 인덱스 값을 그대로 유지한다.
+    반환: (params, keepalive) — keepalive(bitmap/selector)는 검색이 끝날 때까지 참조를 유지해야 한다.
+    """
+    bitmap = np.packbits(mask.astype(np.uint8), bitorder="little")
+    selector = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap))
+
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        ivf = None
+
+    if ivf is not None:
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=int(ivf.nprobe))
+    else:
+        base = faiss.downcast_index(index)
+        if hasattr(base, "hnsw"):
+            params = faiss.SearchParametersHNSW(sel=selector, efSearch=int(base.hnsw.efSearch))
+        else:
+            params = faiss.SearchParameters(sel=selector)
+    return params, (bitmap, selector)
+
+
+def supports_selector(index) -> bool:
+    """
+    SearchParameters(sel=...)를 지원하는 인덱스인지.
+    flat+pq(IndexPQ)는 selector를 넘기면 search가 RuntimeError를 낸다.
+    """
+    return not isinstance(faiss.downcast_index(index), faiss.IndexPQ)
+
+
+def search_post_filtered(
+    index,
+    queries: np.ndarray,
+    k: int,
+    mask: np.ndarray,
+    overfetch: int = FILTER_OVERFETCH,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    selector 없이 필터 적용: 필터 없이 k * overfetch개를 검색한 뒤 mask를 통과한 id만 남긴다.
+    질의마다 통과한 후보가 k개(통과 가능한 벡터 수가 그보다 적으면 그 수)가 안 되면 후보 수를 2배로 늘려 재검색.
+    반환 형식은 index.search와 같다 (빈 자리는 거리 inf / id -1).
+    """
+    ntotal = int(index.ntotal)
+    need = min(k, int(mask.sum()))
+    fetch = min(ntotal, max(k, k * max(1, overfetch)))
+    while True:
+        D, I = index.search(queries, fetch)
+        keep = (I >= 0) & mask[np.maximum(I, 0)]
+        if fetch >= ntotal or keep.sum(axis=1).min() >= need:
+            break
+        fetch = min(ntotal, fetch * 2)
+
+    out_d = np.full((len(queries), k), np.inf, dtype="float32")
+    out_i = np.full((len(queries), k), -1, dtype="int64")
+    for qi in range(len(queries)):
+        pos = np.flatnonzero(keep[qi])[:k]
+        out_d[qi, : pos.size] = D[qi, pos]
+        out_i[qi, : pos.size] = I[qi, pos]
+    return out_d, out_i
+
+
+def filtered_search(index, queries: np.ndarray, k: int, mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    mask를 통과한 벡터만 대상으로 검색.
+    selector를 지원하면 FAISS 검색 안에서(IDSelectorBitmap), 아니면 후보를 넉넉히 뽑아 사후 필터.
+    """
+    if not supports_selector(index):
+        return search_post_filtered(index, queries, k, mask)
+    params, _keepalive = search_params_with_selector(index, mask)
+    try:
+        return index.search(queries, k, params=params)
+    except RuntimeError as e:
+        # supports_selector가 모르는 타입 → 사후 필터로 대체
+        logger.warning("[FILTER] %s 인덱스가 selector를 지원하지 않아 사후 필터로 검색: %s", type(index).__name__, e)
+        return search_post_filtered(index, queries, k, mask)
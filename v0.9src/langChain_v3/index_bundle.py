@@ -0,0 +1,358 @@
+# rag_engine/index_bundle.py
+# 피클 없는 인덱스 번들: index.faiss + FAISS row 순서에 맞춘 ID 컬럼(.npy) + manifest
+# 청크 본문은 번들에 넣지 않는다 (DB chunks 테이블이 원본).
+# mmap 로드 시 여러 uvicorn 워커가 같은 파일의 page cache 한 벌을 공유한다.
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FORMAT = "faiss-bundle-v1"
+MANIFEST_FILE = "bundle.json"
+INDEX_FILE = "index.faiss"
+# 컬럼 이름 → 파일명
+ID_COLUMNS = {
+    "chunk_id": "chunk_id.npy",
+    "meta_id": "meta_id.npy",
+    "chunk_index": "chunk_index.npy",
+    "source_hash": "source_hash.npy",
+}
+# 필터 속성 컬럼 (filters.FILTER_ATTRS). 구버전 번들에는 없을 수 있다.
+ATTR_COLUMNS = {
+    "year": "year.npy",
+    "source_type": "source_type.npy",
+    "department": "department.npy",
+}
+# 자식 → 부모 블록 포인터 (chunk_parents.parent_index, 부모 없음 = -1). 구버전 번들에는 없을 수 있다.
+PARENT_COLUMNS = {
+    "parent_index": "parent_index.npy",
+}
+# Flat 인덱스를 mmap으로 검색할 때 쓰는 float32 벡터 파일 (index_factory.RESCORE_VECTORS_FILE과 동일)
+VECTORS_FILE = "vectors.npy"
+BUNDLE_FILES = (
+    (MANIFEST_FILE, INDEX_FILE)
+    + tuple(ID_COLUMNS.values())
+    + tuple(ATTR_COLUMNS.values())
+    + tuple(PARENT_COLUMNS.values())
+)
+
+# 기본적으로 read-only mmap 로드 (0/false면 전부 RAM으로 읽음)
+FAISS_MMAP = os.getenv("FAISS_MMAP", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+class MmapFlatIndex:
+    """
+    IndexFlatL2 대체: vectors.npy를 mmap으로 열어 faiss.knn으로 직접 brute-force 검색.
+    faiss.read_index는 Flat 코드를 프로세스 메모리로 복사하므로, 워커마다 사본이 생기는 것을 피한다.
+    (index.search와 같은 (D, I) / 제곱 L2 거리 반환)
+    """
+
+    is_trained = True
+    metric_type = faiss.METRIC_L2
+    # 필터 검색 시 한 번에 보는 행 수 / 이 비율보다 통과 행이 적은 블록은 통과 행만 모아 계산
+    SUBSET_BLOCK_ROWS = 16384
+    SUBSET_GATHER_RATIO = 0.25
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+        self.ntotal, self.d = int(vectors.shape[0]), int(vectors.shape[1])
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        queries = np.ascontiguousarray(queries, dtype="float32")
+        return faiss.knn(queries, self.vectors, k, metric=faiss.METRIC_L2)
+
+    def search_subset(self, queries: np.ndarray, k: int, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        필터를 통과한 row(ids, 오름차순)만 대상으로 검색. 반환 I는 전체 row id 기준.
+
+        부분집합을 통째로 복사하지 않고 mmap을 연속 블록(SUBSET_BLOCK_ROWS행) 단위로 훑는다.
+        - 통과 행이 많은 블록: 블록 슬라이스(mmap 뷰, 복사 없음) 전체 거리 계산 후 미통과 행 제외
+        - 통과 행이 적은 블록: 그 행들만 모아(블록 크기 이하의 임시 복사) 계산
+        블록별 top-k를 누적 병합하므로 요청당 추가 메모리는 블록 하나 분량이다.
+        """
+        queries = np.ascontiguousarray(queries, dtype="float32")
+        ids = np.asarray(ids, dtype="int64")
+        nq = queries.shape[0]
+        best_d = np.full((nq, 0), np.inf, dtype="float32")
+        best_i = np.full((nq, 0), -1, dtype="int64")
+
+        block = self.SUBSET_BLOCK_ROWS
+        for start in range(0, self.ntotal, block):
+            end = min(start + block, self.ntotal)
+            lo, hi = np.searchsorted(ids, [start, end])
+            sel = ids[lo:hi]
+            if sel.size == 0:
+                continue
+            if sel.size < (end - start) * self.SUBSET_GATHER_RATIO:
+                cand = sel
+                dist = faiss.pairwise_distances(queries, self.vectors[sel])
+            else:
+                cand = np.arange(start, end, dtype="int64")
+                dist = faiss.pairwise_distances(queries, self.vectors[start:end])
+                excluded = np.ones(end - start, dtype=bool)
+                excluded[sel - start] = False
+                dist[:, excluded] = np.inf
+
+            kk = min(k, dist.shape[1])
+            top = np.argpartition(dist, kk - 1, axis=1)[:, :kk]
+            best_d = np.concatenate([best_d, np.take_along_axis(dist, top, axis=1)], axis=1)
+            best_i = np.concatenate([best_i, cand[top]], axis=1)
+            if best_d.shape[1] > k:
+                keep = np.argpartition(best_d, k - 1, axis=1)[:, :k]
+                best_d = np.take_along_axis(best_d, keep, axis=1)
+                best_i = np.take_along_axis(best_i, keep, axis=1)
+
+        order = np.argsort(best_d, axis=1)
+        D = np.full((nq, k), np.inf, dtype="float32")
+        I = np.full((nq, k), -1, dtype="int64")
+        n = min(k, best_d.shape[1])
+        D[:, :n] = np.take_along_axis(best_d, order, axis=1)[:, :n]
+        I[:, :n] = np.take_along_axis(best_i, order, axis=1)[:, :n]
+        I[~np.isfinite(D)] = -1
+        return D, I
+
+
+class IdStore:
+    """
+    FAISS row id(0..n-1) → (chunk_id, meta_id, chunk_index, source_hash) 컬럼 저장소.
+    Document 객체 없이 numpy 배열만 들고 있어 로드가 빠르고 메모리가 작다.
+    year / source_type / department는 검색 시 필터(ID selector)용 속성 컬럼이다.
+    parent_index는 부모 블록 포인터(-1 = 부모 없음)로, 같은 부모의 자식 hit를 하나로 합칠 때 쓴다.
+    """
+
+    def __init__(
+        self,
+        chunk_id: np.ndarray,
+        meta_id: np.ndarray,
+        chunk_index: np.ndarray,
+        source_hash: np.ndarray,
+        year: Optional[np.ndarray] = None,
+        source_type: Optional[np.ndarray] = None,
+        department: Optional[np.ndarray] = None,
+        parent_index: Optional[np.ndarray] = None,
+    ):
+        n = len(chunk_id)
+        columns = [meta_id, chunk_index, source_hash, year, source_type, department, parent_index]
+        if any(c is not None and len(c) != n for c in columns):
+            raise ValueError("IdStore 컬럼 길이가 서로 다릅니다.")
+        self.chunk_id = chunk_id
+        self.meta_id = meta_id
+        self.chunk_index = chunk_index
+        self.source_hash = source_hash
+        self.year = year
+        self.source_type = source_type
+        self.department = department
+        self.parent_index = parent_index
+
+    def __len__(self) -> int:
+        return len(self.chunk_id)
+
+    def row(self, faiss_id: int) -> Dict[str, Any]:
+        source_hash = str(self.source_hash[faiss_id])
+        return {
+            "chunk_id": int(self.chunk_id[faiss_id]),
+            "meta_id": str(self.meta_id[faiss_id]),
+            "chunk_index": int(self.chunk_index[faiss_id]),
+            "source_hash": source_hash or None,
+            "parent_index": self.parent_of(faiss_id),
+        }
+
+    def parent_of(self, faiss_id: int) -> Optional[int]:
+        if self.parent_index is None:
+            return None
+        p = int(self.parent_index[faiss_id])
+        return p if p >= 0 else None
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> "IdStore":
+        """chunk row(dict) 또는 Document.metadata 리스트 → 컬럼. 필터 속성이 없는 row면 속성 컬럼은 None."""
+        rows = list(rows)
+        has_attrs = bool(rows) and all("year" in r for r in rows)
+        has_parents = bool(rows) and all("parent_index" in r for r in rows)
+        return cls(
+            chunk_id=np.asarray([r["chunk_id"] for r in rows], dtype="int64"),
+            meta_id=np.asarray([str(r["meta_id"]) for r in rows], dtype=str),
+            chunk_index=np.asarray([r["chunk_index"] for r in rows], dtype="int32"),
+            source_hash=np.asarray([r.get("source_hash") or "" for r in rows], dtype=str),
+            year=np.asarray([r["year"] or 0 for r in rows], dtype="int16") if has_attrs else None,
+            source_type=np.asarray([r["source_type"] or "" for r in rows], dtype=str) if has_attrs else None,
+            department=np.asarray([r["department"] or "" for r in rows], dtype=str) if has_attrs else None,
+            parent_index=(
+                np.asarray([-1 if r["parent_index"] is None else r["parent_index"] for r in rows], dtype="int32")
+                if has_parents
+                else None
+            ),
+        )
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore) -> "IdStore":
+        """구버전(LangChain pickle) 인덱스 → IdStore 변환."""
+        ntotal = int(vectorstore.index.ntotal)
+        metas: List[Dict[str, Any]] = []
+        for faiss_id in range(ntotal):
+            doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[faiss_id])
+            metas.append(doc.metadata)
+        return cls.from_rows(metas)
+
+
+def changed_metas(old: IdStore, new: IdStore) -> Set[str]:
+    """
+    두 인덱스 스냅샷 사이에 청크 구성이 달라진 meta_id
+    (새로 생기거나 사라졌거나 source_hash가 바뀐 = 재청킹된 문서).
+    """
+    old_pairs = set(zip(np.asarray(old.meta_id).tolist(), np.asarray(old.source_hash).tolist()))
+    new_pairs = set(zip(np.asarray(new.meta_id).tolist(), np.asarray(new.source_hash).tolist()))
+    return {meta_id for meta_id, _ in old_pairs ^ new_pairs}
+
+
+def has_bundle(index_dir: str) -> bool:
+    return os.path.exists(os.path.join(index_dir, MANIFEST_FILE))
+
+
+def _save_npy(path: str, arr: np.ndarray) -> None:
+    tmp = f"{path}.tmp.npy"
+    np.save(tmp, arr)
+    os.replace(tmp, path)
+
+
+def save_index_bundle(
+    index_dir: str,
+    index,
+    ids: IdStore,
+    extra: Optional[Dict[str, Any]] = None,
+    side_files: Optional[Mapping[str, Callable[[], Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    index.faiss(faiss.write_index) + ID 컬럼 + (side_files) + manifest 저장.
+
+    side_files: 번들과 함께 갈아끼울 부가 파일명 → 그 파일을 쓰는(또는 지우는) 함수.
+    (vectors.npy / duplicates.json / index_params.json 등) manifest보다 먼저 실행되고,
+    실행 후 존재하는 파일은 인덱스/컬럼과 함께 manifest의 files(파일명 → 크기)에 기록된다.
+    기존 manifest를 가장 먼저 지우고 모든 파일을 쓴 뒤 마지막에 manifest를 쓰므로,
+    manifest가 있으면 files에 적힌 파일들이 한 빌드의 완성된 묶음이다.
+    """
+    if len(ids) != int(index.ntotal):
+        raise ValueError(f"ID 수({len(ids)})와 인덱스 ntotal({index.ntotal})이 다릅니다.")
+
+    os.makedirs(index_dir, exist_ok=True)
+    manifest_path = os.path.join(index_dir, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    index_path = os.path.join(index_dir, INDEX_FILE)
+    tmp = f"{index_path}.tmp"
+    faiss.write_index(index, tmp)
+    os.replace(tmp, index_path)
+
+    columns = dict(ID_COLUMNS)
+    columns.update({name: f for name, f in ATTR_COLUMNS.items() if getattr(ids, name) is not None})
+    columns.update({name: f for name, f in PARENT_COLUMNS.items() if getattr(ids, name) is not None})
+    for name, filename in columns.items():
+        _save_npy(os.path.join(index_dir, filename), getattr(ids, name))
+
+    for writer in (side_files or {}).values():
+        writer()
+
+    files = {}
+    for filename in [INDEX_FILE, *columns.values(), *(side_files or {})]:
+        path = os.path.join(index_dir, filename)
+        if os.path.exists(path):
+            files[filename] = {"size": os.path.getsize(path)}
+
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "ntotal": int(index.ntotal),
+        "d": int(index.d),
+        "columns": columns,
+        "files": files,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        **(extra or {}),
+    }
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    logger.info("[BUNDLE] 인덱스 번들 저장: %s (ntotal=%d)", index_dir, manifest["ntotal"])
+    return manifest
+
+
+def _read_index(index_dir: str, manifest: Dict[str, Any], mmap: bool):
+    if not mmap:
+        return faiss.read_index(os.path.join(index_dir, INDEX_FILE))
+
+    vectors_path = os.path.join(index_dir, VECTORS_FILE)
+    # files 목록이 있는 번들이면 거기 적힌 vectors.npy만 이 인덱스의 원본으로 본다
+    listed = VECTORS_FILE in manifest["files"] if "files" in manifest else True
+    if manifest.get("factory") == "Flat" and listed and os.path.exists(vectors_path):
+        return MmapFlatIndex(np.load(vectors_path, mmap_mode="r"))
+
+    # IVF 계열은 inverted list가 mmap된다. 지원하지 않는 타입/버전이면 일반 로드.
+    try:
+        return faiss.read_index(
+            os.path.join(index_dir, INDEX_FILE),
+            faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY,
+        )
+    except RuntimeError:
+        logger.warning("[BUNDLE] mmap 로드를 지원하지 않는 인덱스라 일반 로드합니다: %s", manifest.get("factory"))
+        return faiss.read_index(os.path.join(index_dir, INDEX_FILE))
+
+
+def _check_bundle_files(index_dir: str, manifest: Dict[str, Any]) -> None:
+    """manifest의 files(파일명 → 크기)와 디스크가 다르면 쓰는 도중이거나 깨진 번들이다. (구버전 번들은 목록 없음)"""
+    for filename, stat in (manifest.get("files") or {}).items():
+        path = os.path.join(index_dir, filename)
+        if not os.path.exists(path) or os.path.getsize(path) != stat.get("size"):
+            raise ValueError(f"번들 파일이 manifest와 맞지 않습니다 (불완전한 번들): {path}")
+
+
+def load_index_bundle(index_dir: str, mmap: bool = FAISS_MMAP) -> Tuple[Any, IdStore, Dict[str, Any]]:
+    """
+    번들 로드 → (faiss index, IdStore, manifest).
+    mmap=True면 인덱스/ID 컬럼을 read-only mmap으로 열어 startup이 거의 즉시 끝나고,
+    같은 번들을 여는 워커 프로세스들이 page cache를 공유한다.
+    """
+    manifest_path = os.path.join(index_dir, MANIFEST_FILE)
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != BUNDLE_FORMAT:
+        raise ValueError(f"지원하지 않는 번들 형식: {manifest.get('format')}")
+    _check_bundle_files(index_dir, manifest)
+
+    index = _read_index(index_dir, manifest, mmap)
+    columns = {
+        name: np.load(
+            os.path.join(index_dir, filename),
+            mmap_mode="r" if mmap else None,
+            allow_pickle=False,
+        )
+        for name, filename in manifest.get("columns", ID_COLUMNS).items()
+    }
+    ids = IdStore(**columns)
+    if len(ids) != int(index.ntotal):
+        raise ValueError(f"번들 ID 수({len(ids)})와 인덱스 ntotal({index.ntotal})이 다릅니다: {index_dir}")
+    manifest["mmap"] = mmap
+    return index, ids, manifest
+
+
+def process_memory() -> Dict[str, Any]:
+    """
+    현재 프로세스 메모리 (워커별 진단용).
+    Linux: VmRSS와 그 중 파일 매핑(RssFile, mmap된 인덱스 = 워커 간 공유)/익명(RssAnon) 분리.
+    """
+    out: Dict[str, Any] = {"pid": os.getpid()}
+    try:
+        with open("/proc/self/status", "r", encoding="ascii", errors="ignore") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in ("VmRSS", "RssAnon", "RssFile", "RssShmem", "VmHWM"):
+                    out[f"{name}_mb"] = round(int(value.split()[0]) / 1024.0, 1)
+    except OSError:
+        import resource
+
+        # /proc가 없으면 최대 RSS만 (Linux KB, macOS bytes 단위 차이는 무시)
+        out["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return out
@@ -0,0 +1,399 @@
+# rag_engine/index_factory.py
+# FAISS 인덱스 타입(Flat / IVF-Flat / IVF-PQ / HNSW) + 벡터 압축(fp16 / SQ8 / PQ) 생성,
+# 검색 파라미터 저장/적용, 압축 코드 검색 후 원본 벡터로 정확 재채점, recall-latency/메모리 리포트
+import json
+import logging
+import math
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+COMPRESSIONS = ("none", "fp16", "sq8", "pq")
+INDEX_PARAMS_FILE = "index_params.json"
+BUILD_REPORT_FILE = "build_report.json"
+# 정확 재채점용 원본 float32 벡터 (검색 시 mmap으로 후보 행만 읽음)
+RESCORE_VECTORS_FILE = "vectors.npy"
+# 재채점 기본값을 켜는 압축 (fp16/sq8은 거리 오차가 작아 float32 사본을 둘 이득이 없다)
+_RESCORE_BY_DEFAULT = ("pq",)
+_PAGE_SIZE = 4096
+
+# IVF 학습 시 centroid당 최소 학습 벡터 수 (FAISS 권장 39 이상)
+_MIN_POINTS_PER_CENTROID = 39
+
+
+def default_nlist(n: int) -> int:
+    """IVF 리스트 수: 약 4*sqrt(n), centroid당 학습 벡터가 충분하도록 상한."""
+    if n <= 0:
+        return 1
+    nlist = int(4 * math.sqrt(n))
+    return max(1, min(nlist, n // _MIN_POINTS_PER_CENTROID or 1))
+
+
+def _pq_subquantizers(d: int, pq_m: Optional[int]) -> int:
+    if pq_m and d % pq_m == 0:
+        return pq_m
+    # 차원의 약수 중 d/8 이하에서 가장 큰 값 (768 → 96)
+    for m in range(max(1, d // 8), 0, -1):
+        if d % m == 0:
+            return m
+    return 1
+
+
+def factory_string(
+    index_type: str,
+    d: int,
+    n: int,
+    *,
+    nlist: Optional[int] = None,
+    pq_m: Optional[int] = None,
+    hnsw_m: int = 32,
+    compression: str = "none",
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    (index_type, compression) → (faiss.index_factory 문자열, 빌드 정보)
+
+    compression: 벡터 저장 형식
+    - "none": float32 그대로 / "fp16": 절반 / "sq8": 1/4 / "pq": 서브양자화 코드 (d*4/m 배 축소)
+    ivf_pq는 그 자체로 PQ 압축이다.
+    """
+    index_type = (index_type or "flat").strip().lower()
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"지원하지 않는 index_type: {index_type} (가능: {', '.join(INDEX_TYPES)})")
+    compression = (compression or "none").strip().lower()
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"지원하지 않는 compression: {compression} (가능: {', '.join(COMPRESSIONS)})")
+    if index_type == "ivf_pq":
+        compression = "pq"
+
+    info: Dict[str, Any] = {"index_type": index_type, "d": d, "compression": compression}
+
+    if compression == "pq":
+        info["pq_m"] = _pq_subquantizers(d, pq_m)
+    codec = {
+        "none": "Flat",
+        "fp16": "SQfp16",
+        "sq8": "SQ8",
+        "pq": f"PQ{info.get('pq_m')}",
+    }[compression]
+
+    if index_type == "flat":
+        return codec, info
+
+    if index_type in ("ivf_flat", "ivf_pq"):
+        nlist = nlist or default_nlist(n)
+        info["nlist"] = nlist
+        return f"IVF{nlist},{codec}", info
+
+    info["hnsw_m"] = hnsw_m
+    if compression == "none":
+        return f"HNSW{hnsw_m},Flat", info
+    # HNSW 그래프 + 압축 저장소 (IndexHNSWSQ / IndexHNSWPQ 등)
+    return f"HNSW{hnsw_m}_{codec}", info
+
+
+def default_search_params(info: Dict[str, Any]) -> Dict[str, Any]:
+    params: Dict[str, Any] = {}
+    if "nlist" in info:
+        params["nprobe"] = min(info["nlist"], max(8, info["nlist"] // 16))
+    if info.get("index_type") == "hnsw":
+        params["efSearch"] = 64
+    return params
+
+
+def default_rescore(compression: str) -> bool:
+    """rescore 미지정(None) 시 기본값: PQ 계열만 원본 벡터 재채점."""
+    return (compression or "none").strip().lower() in _RESCORE_BY_DEFAULT
+
+
+def build_faiss_index(
+    vectors: np.ndarray,
+    index_type: str = "flat",
+    *,
+    nlist: Optional[int] = None,
+    pq_m: Optional[int] = None,
+    hnsw_m: int = 32,
+    compression: str = "none",
+    train_size: Optional[int] = None,
+    seed: int = 42,
+) -> Tuple[Any, Dict[str, Any]]:
+    """
+    vectors(float32, [n, d])로 FAISS 인덱스 생성 + (필요 시) 샘플 학습 + add.
+
+    LangChain FAISS(DistanceStrategy.COSINE)가 만드는 IndexFlatL2와 점수 의미를 맞추기 위해
+    모든 타입을 L2 metric으로 만든다. (정규화된 벡터이므로 L2 순위 == 코사인 순위)
+    """
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    n, d = vectors.shape
+    factory, info = factory_string(
+        index_type, d, n, nlist=nlist, pq_m=pq_m, hnsw_m=hnsw_m, compression=compression
+    )
+    info["factory"] = factory
+
+    index = faiss.index_factory(d, factory, faiss.METRIC_L2)
+
+    if info["index_type"] == "hnsw":
+        hnsw_index = faiss.downcast_index(index)
+        if hasattr(hnsw_index, "hnsw"):
+            hnsw_index.hnsw.efConstruction = 200
+
+    if not index.is_trained:
+        if train_size is None:
+            train_size = max(info.get("nlist", 1) * 64, 20000)
+        train_size = min(n, train_size)
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(n, size=train_size, replace=False)] if train_size < n else vectors
+        t0 = time.perf_counter()
+        index.train(sample)
+        info["train_size"] = int(train_size)
+        info["train_seconds"] = round(time.perf_counter() - t0, 3)
+        logger.info("[INDEX] %s 학습 완료 (%d vectors, %.2fs)", factory, train_size, info["train_seconds"])
+
+    index.add(vectors)
+    return index, info
+
+
+def apply_search_params(index, params: Optional[Dict[str, Any]]) -> None:
+    """저장된 nprobe / efSearch 등을 인덱스에 적용."""
+    if not params:
+        return
+    ps = faiss.ParameterSpace()
+    for name in ("nprobe", "efSearch"):
+        if params.get(name) is None:
+            continue
+        try:
+            ps.set_index_parameter(index, name, int(params[name]))
+        except Exception:
+            logger.debug("[INDEX] %s 파라미터를 적용할 수 없는 인덱스 타입입니다.", name)
+
+
+def save_index_params(index_dir: str, params: Dict[str, Any]) -> None:
+    with open(os.path.join(index_dir, INDEX_PARAMS_FILE), "w", encoding="utf-8") as f:
+        json.dump(params, f, ensure_ascii=False, indent=2)
+
+
+def load_index_params(index_dir: str) -> Dict[str, Any]:
+    path = os.path.join(index_dir, INDEX_PARAMS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_rescore_vectors(index_dir: str, vectors: np.ndarray) -> str:
+    """재채점용 float32 원본 벡터를 FAISS row 순서 그대로 .npy로 저장."""
+    path = os.path.join(index_dir, RESCORE_VECTORS_FILE)
+    tmp = f"{path}.tmp.npy"
+    np.save(tmp, np.ascontiguousarray(vectors, dtype="float32"))
+    os.replace(tmp, path)
+    return path
+
+
+def load_rescore_vectors(index_dir: str) -> Optional[np.ndarray]:
+    """
+    재채점용 벡터를 mmap(read-only)으로 연다.
+    RAM에 통째로 올리지 않고 후보 행을 읽을 때만 페이지가 올라온다. 파일이 없으면 None.
+    """
+    path = os.path.join(index_dir, RESCORE_VECTORS_FILE)
+    if not os.path.exists(path):
+        return None
+    return np.load(path, mmap_mode="r")
+
+
+def _timed_search(index, queries: np.ndarray, k: int) -> Tuple[np.ndarray, float]:
+    t0 = time.perf_counter()
+    _, ids = index.search(queries, k)
+    elapsed = time.perf_counter() - t0
+    return ids, elapsed * 1000.0 / max(len(queries), 1)
+
+
+def recall_latency_report(
+    index,
+    vectors: np.ndarray,
+    *,
+    k: int = 10,
+    n_queries: int = 200,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    코퍼스 벡터 일부를 질의로 사용해 Flat(정확) 대비 recall@k, 질의당 평균 지연(ms) 측정.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    n, d = vectors.shape
+    k = min(k, n)
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.choice(n, size=min(n_queries, n), replace=False)]
+
+    exact = faiss.IndexFlatL2(d)
+    exact.add(vectors)
+    gt, flat_ms = _timed_search(exact, queries, k)
+    got, ann_ms = _timed_search(index, queries, k)
+
+    hits = 0
+    for g, a in zip(gt, got):
+        hits += len(set(g.tolist()) & set(a.tolist()))
+    recall = hits / float(len(queries) * k) if len(queries) else 0.0
+
+    return {
+        "k": k,
+        "n_queries": int(len(queries)),
+        "recall_at_k": round(recall, 4),
+        "flat_ms_per_query": round(flat_ms, 4),
+        "index_ms_per_query": round(ann_ms, 4),
+    }
+
+
+def search_param_sweep(
+    index,
+    vectors: np.ndarray,
+    info: Dict[str, Any],
+    params: Dict[str, Any],
+    *,
+    k: int = 10,
+    n_queries: int = 200,
+) -> Dict[str, Any]:
+    """
+    설정된 검색 파라미터 + nprobe/efSearch 후보값별 recall-latency 표.
+    측정 후 인덱스에는 설정값(params)을 다시 적용해 둔다.
+    """
+    report: Dict[str, Any] = {
+        "index": dict(info),
+        "search_params": dict(params),
+        "configured": recall_latency_report(index, vectors, k=k, n_queries=n_queries),
+        "sweep": [],
+    }
+
+    name, candidates = None, []
+    if "nlist" in info:
+        name = "nprobe"
+        candidates = [v for v in (1, 4, 8, 16, 32, 64, 128) if v <= info["nlist"]]
+    elif info.get("index_type") == "hnsw":
+        name = "efSearch"
+        candidates = [16, 32, 64, 128, 256]
+
+    for value in candidates:
+        apply_search_params(index, {name: value})
+        row = recall_latency_report(index, vectors, k=k, n_queries=n_queries)
+        row[name] = value
+        report["sweep"].append(row)
+
+    apply_search_params(index, params)
+    return report
+
+
+def rescore_candidates(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    candidate_ids: np.ndarray,
+    k: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    압축 인덱스가 돌려준 후보(candidate_ids, [nq, k'])를 원본 float32 벡터로 정확한 L2^2 재계산 후 top-k.
+    vectors는 np.load(mmap_mode="r")여도 되며, 후보 행만 읽는다.
+    반환 형식은 index.search와 같다: (distances[nq, k], ids[nq, k]), 빈 자리는 -1.
+    """
+    queries = np.asarray(queries, dtype="float32")
+    nq = queries.shape[0]
+    out_d = np.full((nq, k), np.inf, dtype="float32")
+    out_i = np.full((nq, k), -1, dtype="int64")
+
+    for qi in range(nq):
+        ids = candidate_ids[qi]
+        ids = ids[ids >= 0]
+        if ids.size == 0:
+            continue
+        # mmap fancy indexing은 정렬된 인덱스가 빠름
+        order = np.argsort(ids)
+        cand = np.asarray(vectors[ids[order]], dtype="float32")
+        diff = cand - queries[qi]
+        dist = np.einsum("ij,ij->i", diff, diff)
+        top = np.argsort(dist)[:k]
+        out_d[qi, : top.size] = dist[top]
+        out_i[qi, : top.size] = ids[order][top]
+    return out_d, out_i
+
+
+def compression_report(
+    index,
+    vectors: np.ndarray,
+    info: Dict[str, Any],
+    *,
+    k: int = 10,
+    refine_factor: int = 4,
+    rescore: Optional[bool] = None,
+    n_queries: int = 200,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    압축 인덱스의 메모리 vs float32 Flat, 압축만 / 재채점 후 recall@k 측정.
+
+    상주 메모리(resident_bytes)는 인덱스뿐이다: 재채점용 vectors.npy는 mmap이라 질의가 읽은 후보 행의
+    페이지만 올라온다 → 질의당 실제로 건드린 바이트(rescore_touched_bytes_per_query)를 따로 잰다.
+    memory_reduction은 상주 메모리 기준, disk_reduction은 vectors.npy까지 포함한 디스크 기준이다.
+    """
+    if rescore is None:
+        rescore = default_rescore(info.get("compression", "none"))
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    n, d = vectors.shape
+    k = min(k, n)
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.choice(n, size=min(n_queries, n), replace=False)]
+
+    exact = faiss.IndexFlatL2(d)
+    exact.add(vectors)
+    _, gt = exact.search(queries, k)
+
+    def _recall(ids: np.ndarray) -> float:
+        hits = sum(len(set(g.tolist()) & set(a.tolist())) for g, a in zip(gt, ids))
+        return round(hits / float(len(queries) * k), 4) if len(queries) else 0.0
+
+    t0 = time.perf_counter()
+    _, raw_ids = index.search(queries, k)
+    raw_ms = (time.perf_counter() - t0) * 1000.0 / max(len(queries), 1)
+
+    t0 = time.perf_counter()
+    _, cand = index.search(queries, min(n, k * refine_factor))
+    _, rescored_ids = rescore_candidates(vectors, queries, cand, k)
+    rescored_ms = (time.perf_counter() - t0) * 1000.0 / max(len(queries), 1)
+
+    # 재채점이 질의당 읽는 vectors.npy 페이지 수 (후보 행이 걸친 4KB 페이지, 헤더 오프셋 무시)
+    row_bytes = d * 4
+    touched = 0
+    for row in cand:
+        row = row[row >= 0].astype("int64")
+        pages = np.union1d(row * row_bytes // _PAGE_SIZE, (row * row_bytes + row_bytes - 1) // _PAGE_SIZE)
+        touched += int(pages.size) * _PAGE_SIZE
+
+    index_bytes = int(faiss.serialize_index(index).nbytes)
+    flat_bytes = int(n * row_bytes)
+    rescore_bytes = flat_bytes if rescore else 0
+    disk_bytes = index_bytes + rescore_bytes
+    return {
+        "compression": info.get("compression"),
+        "factory": info.get("factory"),
+        "rescore": rescore,
+        "index_bytes": index_bytes,
+        "resident_bytes": index_bytes,
+        "rescore_vectors_disk_bytes": rescore_bytes,
+        "rescore_touched_bytes_per_query": (touched // max(len(queries), 1)) if rescore else 0,
+        "disk_bytes": disk_bytes,
+        "flat_float32_bytes": flat_bytes,
+        "memory_reduction": round(flat_bytes / index_bytes, 2) if index_bytes else None,
+        "disk_reduction": round(flat_bytes / disk_bytes, 2) if disk_bytes else None,
+        "k": k,
+        "refine_factor": refine_factor,
+        "recall_at_k_compressed": _recall(raw_ids),
+        "recall_at_k_rescored": _recall(rescored_ids),
+        "ms_per_query_compressed": round(raw_ms, 4),
+        "ms_per_query_rescored": round(rescored_ms, 4),
+    }
+
+
+def save_build_report(index_dir: str, report: Dict[str, Any]) -> None:
+    with open(os.path.join(index_dir, BUILD_REPORT_FILE), "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,358 @@
+# rag_engine/lexical_index.py
+# chunks.text 한글 문자 bigram BM25 역색인 (SQLite 파일)
+# 학수번호, 양식명(휴학원, 복학원), 학과명처럼 dense 검색이 놓치는 정확한 용어 매칭용 1단계 검색.
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .filters import document_attrs
+from .repository import load_chunk_source_hashes, load_chunks_for_metas
+
+logger = logging.getLogger(__name__)
+
+_AIDATA_DIR = Path(__file__).resolve().parents[1] / "aidata"
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", str(_AIDATA_DIR / "lexical_index.sqlite")).strip()
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# 문서의 이 비율보다 많이 나오는 bigram("학교", "니다" 등)은 posting을 읽지 않는다 (idf가 거의 0이라 순위 기여가 작음)
+LEXICAL_MAX_DF_RATIO = float(os.getenv("LEXICAL_MAX_DF_RATIO", "0.2"))
+# 질의당 읽을 posting 행 상한 (df 작은 term부터 채움, 가장 드문 term 하나는 항상 읽되 이 상한까지만)
+LEXICAL_MAX_POSTINGS = int(os.getenv("LEXICAL_MAX_POSTINGS", "50000"))
+
+_HANGUL_RUN = re.compile(r"[가-힣]+")
+_ALNUM_RUN = re.compile(r"[a-z0-9]+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    chunk_id INTEGER PRIMARY KEY,
+    meta_id TEXT NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    source_hash TEXT,
+    length INTEGER NOT NULL,
+    year INTEGER NOT NULL DEFAULT 0,
+    source_type TEXT NOT NULL DEFAULT '',
+    department TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS docs_meta ON docs(meta_id);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    chunk_id INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, chunk_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_chunk ON postings(chunk_id);
+CREATE TABLE IF NOT EXISTS terms (
+    term TEXT PRIMARY KEY,
+    df INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta_hashes (
+    meta_id TEXT PRIMARY KEY,
+    source_hash TEXT
+) WITHOUT ROWID;
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    한글 연속 구간은 문자 bigram(한 글자면 unigram), 영문/숫자 구간은 통째로 토큰.
+    예) "휴학원 CSE1010" → ["휴학", "학원", "cse1010"]
+    """
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    tokens: List[str] = []
+    for run in _HANGUL_RUN.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+    tokens.extend(_ALNUM_RUN.findall(text))
+    return tokens
+
+
+class LexicalIndex:
+    """
+    SQLite 기반 BM25 역색인.
+
+    - docs: 청크별 길이 + 필터 속성, postings: (term, chunk_id, tf), terms: df
+    - meta_id 단위 source_hash가 바뀐 문서만 다시 색인 (sync)
+    - 검색은 질의 term의 posting만 읽어 BM25 점수 계산 (흔한 term은 건너뛰고 질의당 읽는 행 수 상한)
+    """
+
+    def __init__(
+        self,
+        path: str = LEXICAL_INDEX_PATH,
+        max_df_ratio: float = LEXICAL_MAX_DF_RATIO,
+        max_postings: int = LEXICAL_MAX_POSTINGS,
+    ):
+        self.path = path
+        self.max_df_ratio = max_df_ratio
+        self.max_postings = max_postings
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self.queries = 0
+        self.postings_scanned = 0
+        self.terms_skipped = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    # ---- 색인 ----
+
+    def _remove_metas(self, conn: sqlite3.Connection, meta_ids: List[str]) -> None:
+        for meta_id in meta_ids:
+            chunk_ids = [r[0] for r in conn.execute("SELECT chunk_id FROM docs WHERE meta_id = ?", (meta_id,))]
+            if chunk_ids:
+                placeholders = ", ".join("?" * len(chunk_ids))
+                conn.execute(
+                    f"""
+                    UPDATE terms SET df = df - (
+                        SELECT COUNT(*) FROM postings
+                        WHERE postings.term = terms.term AND postings.chunk_id IN ({placeholders})
+                    )
+                    WHERE term IN (SELECT DISTINCT term FROM postings WHERE chunk_id IN ({placeholders}))
+                    """,
+                    chunk_ids + chunk_ids,
+                )
+                conn.execute(f"DELETE FROM postings WHERE chunk_id IN ({placeholders})", chunk_ids)
+                conn.execute(f"DELETE FROM docs WHERE chunk_id IN ({placeholders})", chunk_ids)
+            conn.execute("DELETE FROM meta_hashes WHERE meta_id = ?", (meta_id,))
+
+    def _add_rows(self, conn: sqlite3.Connection, rows: Iterable[Dict[str, Any]]) -> None:
+        df: Counter = Counter()
+        docs = []
+        postings = []
+        hashes: Dict[str, Optional[str]] = {}
+        for row in rows:
+            tf = Counter(tokenize(row.get("text") or ""))
+            attrs = document_attrs(row["meta_id"], row.get("title"), row.get("file_path"))
+            docs.append(
+                (
+                    row["chunk_id"],
+                    row["meta_id"],
+                    row["chunk_index"],
+                    row.get("source_hash"),
+                    sum(tf.values()),
+                    attrs["year"],
+                    attrs["source_type"],
+                    attrs["department"],
+                )
+            )
+            postings.extend((term, row["chunk_id"], n) for term, n in tf.items())
+            df.update(tf.keys())
+            hashes[row["meta_id"]] = row.get("source_hash")
+
+        conn.executemany("INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?, ?, ?, ?, ?)", docs)
+        conn.executemany("INSERT OR REPLACE INTO postings VALUES (?, ?, ?)", postings)
+        conn.executemany(
+            "INSERT INTO terms (term, df) VALUES (?, ?) ON CONFLICT(term) DO UPDATE SET df = df + excluded.df",
+            list(df.items()),
+        )
+        conn.executemany("INSERT OR REPLACE INTO meta_hashes VALUES (?, ?)", list(hashes.items()))
+
+    def sync(self, batch_metas: int = 200) -> Dict[str, int]:
+        """
+        chunks 테이블과 동기화: source_hash가 바뀐/새 meta_id는 재색인, 사라진 meta_id는 삭제.
+        rebuild_chunks()가 같은 해시로 건너뛴 문서는 여기서도 건너뛴다.
+        """
+        current = load_chunk_source_hashes()
+        with self._write_lock:
+            conn = self._conn()
+            indexed = dict(conn.execute("SELECT meta_id, source_hash FROM meta_hashes"))
+
+            removed = [m for m in indexed if m not in current]
+            changed = [m for m, h in current.items() if indexed.get(m, object()) != h]
+
+            with conn:
+                self._remove_metas(conn, removed + [m for m in changed if m in indexed])
+            for start in range(0, len(changed), batch_metas):
+                batch = changed[start : start + batch_metas]
+                rows = load_chunks_for_metas(batch)
+                with conn:
+                    self._add_rows(conn, rows)
+                logger.info("[LEXICAL] 색인 진행: %d/%d 문서", min(start + batch_metas, len(changed)), len(changed))
+            with conn:
+                conn.execute("DELETE FROM terms WHERE df <= 0")
+
+        stats = {"indexed": len(changed), "removed": len(removed), "unchanged": len(current) - len(changed)}
+        logger.info("[LEXICAL] 동기화 완료: %s", stats)
+        return stats
+
+    # ---- 검색 ----
+
+    def _collection_stats(self, conn: sqlite3.Connection) -> Tuple[int, float]:
+        n, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs").fetchone()
+        return int(n), (float(total) / n if n else 0.0)
+
+    def _select_terms(self, dfs: Dict[str, int], n_docs: int) -> List[str]:
+        """
+        posting을 읽을 term: df 오름차순으로, df/n_docs <= max_df_ratio이고 누적 df <= max_postings인 것까지.
+        가장 드문 term 하나는 조건과 무관하게 읽는다 (질의가 흔한 말뿐이어도 결과가 비지 않도록, 행 수는 search의 LIMIT).
+        """
+        ordered = sorted(dfs, key=lambda t: dfs[t])
+        selected = ordered[:1]
+        budget = dfs[ordered[0]]
+        for term in ordered[1:]:
+            if 0 < self.max_df_ratio < 1 and dfs[term] > self.max_df_ratio * n_docs:
+                break
+            if self.max_postings > 0 and budget + dfs[term] > self.max_postings:
+                break
+            selected.append(term)
+            budget += dfs[term]
+        self.terms_skipped += len(ordered) - len(selected)
+        return selected
+
+    def search(self, query: str, k: int = 20, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        BM25 top-k. hit: {chunk_id, meta_id, chunk_index, source_hash, bm25_score}
+        filters는 retrieval_engine과 같은 의미(연도/학과는 값이 없는 공통 문서 유지)이며,
+        통과하는 문서가 없으면 필터 없이 다시 검색한다.
+        """
+        query_tf = Counter(tokenize(query))
+        if not query_tf or k <= 0:
+            return []
+
+        conn = self._conn()
+        n_docs, avg_len = self._collection_stats(conn)
+        if n_docs == 0:
+            return []
+
+        terms = list(query_tf)
+        placeholders = ", ".join("?" * len(terms))
+        dfs = dict(conn.execute(f"SELECT term, df FROM terms WHERE term IN ({placeholders})", terms))
+        if not dfs:
+            return []
+        self.queries += 1
+        terms = self._select_terms(dfs, n_docs)
+        placeholders = ", ".join("?" * len(terms))
+        idf = {term: math.log(1.0 + (n_docs - dfs[term] + 0.5) / (dfs[term] + 0.5)) for term in terms}
+
+        where = [f"p.term IN ({placeholders})"]
+        params: List[Any] = list(terms)
+        filters = filters or {}
+        if filters.get("year"):
+            where.append("(d.year = ? OR d.year = 0)")
+            params.append(int(filters["year"]))
+        if filters.get("source_type"):
+            where.append("d.source_type = ?")
+            params.append(filters["source_type"])
+        if filters.get("department"):
+            where.append("(d.department = ? OR d.department = '')")
+            params.append(filters["department"])
+
+        sql = f"""
+        SELECT p.chunk_id, p.term, p.tf, d.length, d.meta_id, d.chunk_index, d.source_hash
+        FROM postings AS p
+        JOIN docs AS d ON d.chunk_id = p.chunk_id
+        WHERE {" AND ".join(where)}
+        """
+        if self.max_postings > 0:
+            # 가장 드문 term조차 상한보다 흔하면 그 posting도 상한까지만 읽는다
+            sql += " LIMIT ?"
+            params.append(self.max_postings)
+        scores: Dict[int, float] = {}
+        info: Dict[int, Tuple[str, int, Optional[str]]] = {}
+        scanned = 0
+        for chunk_id, term, tf, length, meta_id, chunk_index, source_hash in conn.execute(sql, params):
+            scanned += 1
+            norm = BM25_K1 * (1.0 - BM25_B + BM25_B * length / avg_len) if avg_len else BM25_K1
+            s = idf.get(term, 0.0) * tf * (BM25_K1 + 1.0) / (tf + norm) * query_tf[term]
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + s
+            info[chunk_id] = (meta_id, chunk_index, source_hash)
+        self.postings_scanned += scanned
+
+        if not scores and len(where) > 1:
+            return self.search(query, k=k, filters={})
+
+        top = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:k]
+        return [
+            {
+                "chunk_id": chunk_id,
+                "meta_id": info[chunk_id][0],
+                "chunk_index": info[chunk_id][1],
+                "source_hash": info[chunk_id][2],
+                "bm25_score": float(score),
+            }
+            for chunk_id, score in top
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        if not self.exists():
+            return {"path": self.path, "exists": False}
+        conn = self._conn()
+        n_docs, avg_len = self._collection_stats(conn)
+        n_terms = conn.execute("SELECT COUNT(*) FROM terms").fetchone()[0]
+        return {
+            "path": self.path,
+            "exists": True,
+            "docs": n_docs,
+            "terms": int(n_terms),
+            "avg_len": round(avg_len, 1),
+            "queries": self.queries,
+            "postings_scanned": self.postings_scanned,
+            "terms_skipped": self.terms_skipped,
+            "max_df_ratio": self.max_df_ratio,
+            "max_postings": self.max_postings,
+        }
+
+
+def reciprocal_rank_fusion(
+    rankings: List[List[Dict[str, Any]]],
+    k: int = 60,
+    top_n: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    여러 검색 결과(순위 리스트)를 chunk_id 기준 RRF로 합친다: score = Σ 1 / (k + rank)
+    같은 chunk가 여러 리스트에 있으면 앞 리스트의 hit dict에 나머지 필드를 합친다.
+    """
+    fused: Dict[Any, Dict[str, Any]] = {}
+    scores: Dict[Any, float] = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, start=1):
+            key = hit["chunk_id"]
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            if key in fused:
+                for name, value in hit.items():
+                    fused[key].setdefault(name, value)
+            else:
+                fused[key] = dict(hit)
+
+    order = sorted(scores, key=lambda c: scores[c], reverse=True)
+    if top_n is not None:
+        order = order[:top_n]
+    out = []
+    for key in order:
+        hit = fused[key]
+        hit["rrf_score"] = scores[key]
+        out.append(hit)
+    return out
+
+
+_index: Optional[LexicalIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_lexical_index() -> LexicalIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = LexicalIndex()
+    return _index
@@ -6,17 +6,18 @@ from .db import get_connection
 logger = logging.getLogger(__name__)
 
 
-def save_faiss_mapping(vectorstore, *, batch_size: int = 2000):
+def save_faiss_mapping(ids, *, batch_size: int = 2000):
     """
-    LangChain FAISS vectorstore에서 faiss_id -> (chunk_id, meta_id) 매핑을 추출해
-    DB의 faiss_mapping 테이블에 저장.
+    IdStore(FAISS row 순서 ID 컬럼)의 faiss_id -> (chunk_id, meta_id) 매핑을
+    DB의 faiss_mapping 테이블에 저장. docstore를 건별 조회하지 않고 컬럼을 통째로 넘긴다.
 
     중요:
     - faiss_id마다 커넥션/INSERT를 하면 매우 느리고, Windows에서 포트 고갈로
       WinError 10048이 날 수 있어, 단일 커넥션 + executemany 배치로 처리합니다.
     """
-    ntotal = int(vectorstore.index.ntotal)
+    ntotal = len(ids)
     logger.info("[INFO] FAISS ntotal = %d", ntotal)
+    rows = list(zip(range(ntotal), ids.chunk_id.tolist(), ids.meta_id.tolist()))
 
     conn = get_connection()
     try:
@@ -24,22 +25,8 @@ def save_faiss_mapping(vectorstore, *, batch_size: int = 2000):
             cur.execute("DELETE FROM faiss_mapping")
 
             sql = "INSERT INTO faiss_mapping (faiss_id, chunk_id, meta_id) VALUES (%s, %s, %s)"
-            batch = []
-
-            for faiss_id in range(ntotal):
-                doc_id = vectorstore.index_to_docstore_id[faiss_id]
-                doc = vectorstore.docstore.search(doc_id)
-
-                chunk_id = doc.metadata.get("chunk_id")
-                meta_id = doc.metadata.get("meta_id")
-                batch.append((faiss_id, chunk_id, meta_id))
-
-                if len(batch) >= batch_size:
-                    cur.executemany(sql, batch)
-                    batch.clear()
-
-            if batch:
-                cur.executemany(sql, batch)
+            for start in range(0, ntotal, batch_size):
+                cur.executemany(sql, rows[start : start + batch_size])
 
         conn.commit()
         logger.info("[INFO] faiss_mapping 저장 완료")
@@ -20,6 +20,62 @@ def chunk_text(text: str, chunk_size: int = 350, overlap: int = 60):
     )
     return splitter.split_text(text or "")
 
+def chunk_text_with_offsets(text: str, chunk_size: int = 350, overlap: int = 60):
+    """
+    chunk_text()와 동일하게 청킹하되, 원문에서의 [start, end) 문자 오프셋을 함께 반환
+    → [(chunk, start_offset, end_offset), ...]
+
+    청크는 원문 순서대로 나오고 시작 위치가 항상 앞 청크보다 뒤이므로,
+    앞 청크 시작 다음 위치부터 find 하면 원래 위치를 찾을 수 있다.
+    못 찾으면(splitter가 텍스트를 변형한 경우) 오프셋은 None.
+    """
+    text = text or ""
+    out = []
+    cursor = 0
+    for chunk in chunk_text(text, chunk_size=chunk_size, overlap=overlap):
+        start = text.find(chunk, cursor)
+        if start < 0:
+            out.append((chunk, None, None))
+            continue
+        out.append((chunk, start, start + len(chunk)))
+        cursor = start + 1
+    return out
+
+
+def group_parent_blocks(text: str, chunks, parent_size: int = 1200):
+    """
+    small-to-big: chunk_text_with_offsets() 결과를 원문 순서대로 묶어 부모 블록 생성
+    → [(parent_text, start_offset, end_offset, [자식 청크 위치...]), ...]
+
+    - 자식 청크는 부모 경계를 넘지 않는다 (부모 = 연속된 자식들의 원문 구간 [첫 start, 마지막 end))
+    - 부모 길이가 parent_size 토큰을 넘기 전까지 다음 자식을 붙인다
+    - 오프셋이 없는 자식은 자기 텍스트 하나로 부모가 된다
+    """
+    text = text or ""
+    parents = []
+    current = None  # [start, end, [child positions]]
+
+    def flush():
+        if current is not None:
+            start, end, members = current
+            parents.append((text[start:end], start, end, members))
+
+    for pos, (chunk, start, end) in enumerate(chunks):
+        if start is None or end is None:
+            flush()
+            current = None
+            parents.append((chunk, None, None, [pos]))
+            continue
+        if current is not None and token_len(text[current[0] : max(current[1], end)]) <= parent_size:
+            current[1] = max(current[1], end)
+            current[2].append(pos)
+            continue
+        flush()
+        current = [start, end, [pos]]
+    flush()
+    return parents
+
+
 # ✅ 반드시 필요
 def sha256_text(text: str) -> str:
     """
@@ -0,0 +1,205 @@
+# rag_engine/query_cache.py
+# 질의 임베딩 캐시: 같은(정규화 기준) 질문은 임베딩 모델을 다시 돌리지 않는다.
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from .embeddings import embed_queries, embedding_model_id
+
+logger = logging.getLogger(__name__)
+
+_AIDATA_DIR = Path(__file__).resolve().parents[1] / "aidata"
+
+QUERY_EMBED_CACHE_SIZE = int(os.getenv("QUERY_EMBED_CACHE_SIZE", "4096"))
+# 비어 있으면 디스크 저장 안 함
+QUERY_EMBED_CACHE_PATH = os.getenv("QUERY_EMBED_CACHE_PATH", "").strip()
+# 서버가 받은 질문 로그 (startup 시 상위 N개 질문 임베딩을 미리 채우는 데 사용). 비어 있으면 기록 안 함
+QUERY_LOG_PATH = os.getenv("QUERY_LOG_PATH", str(_AIDATA_DIR / "query_log.jsonl")).strip()
+QUERY_EMBED_WARM_TOP_N = int(os.getenv("QUERY_EMBED_WARM_TOP_N", "200"))
+
+_TRAILING_PUNCT = re.compile(r"[\s?？!！.。~]+$")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """
+    캐시 키용 질의 정규화.
+    NFKC → 공백 정리 → 소문자 → 끝의 물음표/마침표 등 제거
+    ("휴학 신청 기간?" == "휴학  신청 기간")
+    """
+    text = unicodedata.normalize("NFKC", text or "")
+    text = _SPACES.sub(" ", text).strip().lower()
+    return _TRAILING_PUNCT.sub("", text)
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    embed_query 결과를 (정규화 질의, 모델명, EMBEDDINGS_MODE) 키로 LRU 캐싱하는 래퍼.
+    embed_documents(인덱스 빌드용)는 캐싱하지 않고 그대로 위임한다.
+    """
+
+    def __init__(self, base: Any, max_size: int = QUERY_EMBED_CACHE_SIZE):
+        self._base = base
+        self.model_id = embedding_model_id(base)
+        self.max_size = max_size
+        self._data: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ---- Embeddings 인터페이스 ----
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_query(text)
+        vec = self._get(key)
+        if vec is not None:
+            return vec
+        vec = list(self._base.embed_query(text))
+        self._put(key, vec)
+        return vec
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """캐시에 없는 질의만 모아 한 번의 배치로 임베딩."""
+        keys = [normalize_query(t) for t in texts]
+        out: List[Optional[List[float]]] = [self._get(k) for k in keys]
+
+        todo: Dict[str, str] = {}
+        for key, text, vec in zip(keys, texts, out):
+            if vec is None and key not in todo:
+                todo[key] = text
+
+        if todo:
+            vecs = embed_queries(self._base, list(todo.values()))
+            fresh = {}
+            for key, vec in zip(todo.keys(), vecs):
+                fresh[key] = list(vec)
+                self._put(key, fresh[key])
+            out = [v if v is not None else fresh[k] for k, v in zip(keys, out)]
+        return out  # type: ignore[return-value]
+
+    def __getattr__(self, name: str):
+        return getattr(self._base, name)
+
+    # ---- LRU ----
+
+    def _get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vec = self._data.get(key)
+            if vec is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return vec
+
+    def _put(self, key: str, vec: List[float]) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = vec
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    # ---- 디스크 저장 / 워밍 ----
+
+    def save(self, path: str = QUERY_EMBED_CACHE_PATH) -> None:
+        if not path:
+            return
+        with self._lock:
+            entries = [{"q": k, "v": v} for k, v in self._data.items()]
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"model_id": self.model_id, "entries": entries}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        logger.info("[QCACHE] 질의 임베딩 %d개 저장: %s", len(entries), path)
+
+    def load(self, path: str = QUERY_EMBED_CACHE_PATH) -> int:
+        """저장된 캐시 로드. 모델/모드가 다르면(인덱스와 호환 X) 무시."""
+        if not path or not os.path.exists(path):
+            return 0
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except Exception:
+            logger.exception("[QCACHE] 캐시 파일 로드 실패: %s", path)
+            return 0
+        if payload.get("model_id") != self.model_id:
+            logger.info("[QCACHE] 모델이 달라 캐시 파일 무시: %s", payload.get("model_id"))
+            return 0
+        entries = payload.get("entries") or []
+        for e in entries:
+            self._put(e["q"], e["v"])
+        logger.info("[QCACHE] 질의 임베딩 %d개 로드: %s", len(entries), path)
+        return len(entries)
+
+    def warm_from_log(self, log_path: str = QUERY_LOG_PATH, top_n: int = QUERY_EMBED_WARM_TOP_N) -> int:
+        """질문 로그에서 가장 많이 나온 top_n개 질의를 미리 임베딩해 둔다."""
+        if top_n <= 0 or not log_path or not os.path.exists(log_path):
+            return 0
+
+        counts: Counter = Counter()
+        originals: Dict[str, str] = {}
+        with open(log_path, "r", encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    question = json.loads(line).get("question", "")
+                except Exception:
+                    question = line
+                key = normalize_query(question)
+                if key:
+                    counts[key] += 1
+                    originals.setdefault(key, question)
+
+        top = [originals[k] for k, _ in counts.most_common(top_n) if k not in self._data]
+        if top:
+            self.embed_queries(top)
+        logger.info("[QCACHE] 로그 기반 워밍: %d개", len(top))
+        return len(top)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "model_id": self.model_id,
+            "entries": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+_log_lock = threading.Lock()
+
+
+def log_query(question: str, log_path: str = QUERY_LOG_PATH) -> None:
+    """서버가 받은 질문을 JSONL로 기록 (warm_from_log 입력)."""
+    if not log_path or not question:
+        return
+    line = json.dumps(
+        {"ts": datetime.now().isoformat(timespec="seconds"), "question": question},
+        ensure_ascii=False,
+    )
+    try:
+        with _log_lock:
+            Path(log_path).parent.mkdir(parents=True, exist_ok=True)
+            with open(log_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+    except OSError:
+        logger.warning("[QCACHE] 질문 로그 기록 실패: %s", log_path)
@@ -1,5 +1,5 @@
 # rag_engine/repository.py
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from .db import get_connection
 
@@ -60,9 +60,159 @@ def get_metadata(meta_id: str, *, cur=None) -> Optional[Dict[str, Any]]:
         conn.close()
 
 
+def get_titles_urls(meta_ids: Iterable[str], *, cur=None) -> Dict[str, Dict[str, Any]]:
+    """
+    여러 meta_id의 title, url을 한 번에 조회.
+    반환: {meta_id: {"title": ..., "url": ...}}
+    """
+    ids = list(dict.fromkeys(m for m in meta_ids if m is not None))
+    if not ids:
+        return {}
+
+    placeholders = ", ".join(["%s"] * len(ids))
+    sql = f"""
+    SELECT meta_id, title, url
+    FROM metadata
+    WHERE meta_id IN ({placeholders})
+    """
+
+    if cur is not None:
+        rows = _fetchall(cur, sql, tuple(ids))
+        return {r["meta_id"]: {"title": r["title"], "url": r["url"]} for r in rows}
+
+    conn = get_connection()
+    try:
+        with conn.cursor() as _cur:
+            return get_titles_urls(ids, cur=_cur)
+    finally:
+        conn.close()
+
+
 # ========= chunks =========
 
 
+def window_bounds(center_index: int, window: int) -> Tuple[int, int]:
+    """
+    문맥 확장 시 가져올 chunk_index 범위 (양 끝 포함).
+    기존 expand_context와 동일하게 뒤쪽을 2*window까지 본다.
+    """
+    return center_index - window, center_index + 2 * window
+
+
+def load_context_windows(
+    windows: Iterable[Tuple[str, int, int]],
+    *,
+    cur=None,
+) -> Dict[Tuple[str, int, int], List[Dict[str, Any]]]:
+    """
+    (meta_id, chunk_index, window) 목록에 대해 주변 청크들을 한 번의 SELECT로 조회.
+    반환: {(meta_id, chunk_index, window): [ {chunk_index, text, start_offset, end_offset}, ... ]}
+    (각 리스트는 chunk_index 순)
+    """
+    keys = list(dict.fromkeys(w for w in windows if w[0] is not None and w[1] is not None))
+    if not keys:
+        return {}
+
+    conds = []
+    params: List[Any] = []
+    for meta_id, center_index, window in keys:
+        lo, hi = window_bounds(center_index, window)
+        conds.append("(meta_id = %s AND chunk_index BETWEEN %s AND %s)")
+        params.extend([meta_id, lo, hi])
+
+    sql = f"""
+    SELECT meta_id, chunk_index, text, start_offset, end_offset
+    FROM chunks
+    WHERE {" OR ".join(conds)}
+    ORDER BY meta_id, chunk_index
+    """
+
+    if cur is None:
+        conn = get_connection()
+        try:
+            with conn.cursor() as _cur:
+                return load_context_windows(keys, cur=_cur)
+        finally:
+            conn.close()
+
+    by_meta: Dict[str, List[Dict[str, Any]]] = {}
+    for row in _fetchall(cur, sql, tuple(params)):
+        by_meta.setdefault(row["meta_id"], []).append(row)
+
+    out: Dict[Tuple[str, int, int], List[Dict[str, Any]]] = {}
+    for key in keys:
+        meta_id, center_index, window = key
+        lo, hi = window_bounds(center_index, window)
+        out[key] = [r for r in by_meta.get(meta_id, []) if lo <= r["chunk_index"] <= hi]
+    return out
+
+
+def ensure_chunk_offset_columns(*, cur=None, commit: bool = True):
+    """
+    chunks 테이블에 원문 오프셋 컬럼(start_offset, end_offset)이 없으면 추가.
+    (MariaDB: ADD COLUMN IF NOT EXISTS)
+    """
+    sql = """
+    ALTER TABLE chunks
+        ADD COLUMN IF NOT EXISTS start_offset INT NULL,
+        ADD COLUMN IF NOT EXISTS end_offset INT NULL
+    """
+
+    if cur is not None:
+        cur.execute(sql)
+        if commit:
+            cur.connection.commit()
+        return
+
+    conn = get_connection()
+    try:
+        with conn.cursor() as _cur:
+            ensure_chunk_offset_columns(cur=_cur, commit=False)
+        if commit:
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def ensure_parent_tables(*, cur=None, commit: bool = True):
+    """
+    small-to-big 부모 블록 테이블(chunk_parents) + chunks.parent_index(자식 → 부모 포인터) 생성.
+    부모는 (meta_id, parent_index)로 식별한다.
+    """
+    sql_parents = """
+    CREATE TABLE IF NOT EXISTS chunk_parents (
+        parent_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        meta_id VARCHAR(255) NOT NULL,
+        parent_index INT NOT NULL,
+        text MEDIUMTEXT,
+        source_hash VARCHAR(64),
+        start_offset INT NULL,
+        end_offset INT NULL,
+        UNIQUE KEY uq_chunk_parents_meta (meta_id, parent_index)
+    )
+    """
+    sql_pointer = """
+    ALTER TABLE chunks
+        ADD COLUMN IF NOT EXISTS parent_index INT NULL
+    """
+
+    if cur is not None:
+        cur.execute(sql_parents)
+        cur.execute(sql_pointer)
+        if commit:
+            cur.connection.commit()
+        return
+
+    conn = get_connection()
+    try:
+        with conn.cursor() as _cur:
+            ensure_parent_tables(cur=_cur, commit=False)
+        if commit:
+            conn.commit()
+    finally:
+        conn.close()
+
+
 def get_existing_source_hash(meta_id: str, *, cur=None) -> Optional[str]:
     """
     chunks 테이블에서 meta_id 기준으로 기존 source_hash 조회.
@@ -101,10 +251,12 @@ def delete_chunks_for_meta(meta_id: str, *, cur=None, commit: bool = True):
     WHERE c.meta_id = %s
     """
     sql_delete_chunks = "DELETE FROM chunks WHERE meta_id = %s"
+    sql_delete_parents = "DELETE FROM chunk_parents WHERE meta_id = %s"
 
     if cur is not None:
         cur.execute(sql_delete_mapping, (meta_id,))
         cur.execute(sql_delete_chunks, (meta_id,))
+        cur.execute(sql_delete_parents, (meta_id,))
         if commit:
             cur.connection.commit()
         return
@@ -124,25 +276,33 @@ def insert_chunk(
     chunk_index: int,
     text: str,
     source_hash: str,
+    start_offset: Optional[int] = None,
+    end_offset: Optional[int] = None,
+    parent_index: Optional[int] = None,
     *,
     cur=None,
     commit: bool = True,
 ):
     """
     chunks 테이블에 단일 chunk INSERT.
+    start_offset/end_offset: 원문(clean_data 우선) 기준 [start, end) 문자 위치
+    parent_index: 같은 meta_id의 chunk_parents 부모 블록 번호 (없으면 NULL)
     """
     sql = """
     INSERT INTO chunks (
         meta_id,
         chunk_index,
         text,
-        source_hash
+        source_hash,
+        start_offset,
+        end_offset,
+        parent_index
     )
-    VALUES (%s, %s, %s, %s)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
     """
 
     if cur is not None:
-        cur.execute(sql, (meta_id, chunk_index, text, source_hash))
+        cur.execute(sql, (meta_id, chunk_index, text, source_hash, start_offset, end_offset, parent_index))
         if commit:
             cur.connection.commit()
         return
@@ -155,6 +315,60 @@ def insert_chunk(
                 chunk_index=chunk_index,
                 text=text,
                 source_hash=source_hash,
+                start_offset=start_offset,
+                end_offset=end_offset,
+                parent_index=parent_index,
+                cur=_cur,
+                commit=False,
+            )
+        if commit:
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def insert_parent(
+    meta_id: str,
+    parent_index: int,
+    text: str,
+    source_hash: str,
+    start_offset: Optional[int] = None,
+    end_offset: Optional[int] = None,
+    *,
+    cur=None,
+    commit: bool = True,
+):
+    """
+    chunk_parents 테이블에 부모 블록 INSERT (원문 [start, end) 구간을 미리 잘라 저장).
+    """
+    sql = """
+    INSERT INTO chunk_parents (
+        meta_id,
+        parent_index,
+        text,
+        source_hash,
+        start_offset,
+        end_offset
+    )
+    VALUES (%s, %s, %s, %s, %s, %s)
+    """
+
+    if cur is not None:
+        cur.execute(sql, (meta_id, parent_index, text, source_hash, start_offset, end_offset))
+        if commit:
+            cur.connection.commit()
+        return
+
+    conn = get_connection()
+    try:
+        with conn.cursor() as _cur:
+            insert_parent(
+                meta_id=meta_id,
+                parent_index=parent_index,
+                text=text,
+                source_hash=source_hash,
+                start_offset=start_offset,
+                end_offset=end_offset,
                 cur=_cur,
                 commit=False,
             )
@@ -167,15 +381,23 @@ def insert_chunk(
 def load_all_chunks(*, cur=None) -> List[Dict[str, Any]]:
     """
     chunks 테이블 전체 로드.
+    필터 속성(연도/source_type/학과) 계산을 위해 metadata의 title, file_path도 함께 가져온다.
+    (url은 샤드 세그먼트 구분용: artclView.do / subview.do)
     """
     sql = """
     SELECT
-        chunk_id,
-        meta_id,
-        chunk_index,
-        text
-    FROM chunks
-    ORDER BY chunk_id
+        C.chunk_id,
+        C.meta_id,
+        C.chunk_index,
+        C.text,
+        C.source_hash,
+        C.parent_index,
+        MD.title,
+        MD.url,
+        MD.file_path
+    FROM chunks AS C
+    LEFT JOIN metadata AS MD ON MD.meta_id = C.meta_id
+    ORDER BY C.chunk_id
     """
 
     if cur is not None:
@@ -189,6 +411,212 @@ def load_all_chunks(*, cur=None) -> List[Dict[str, Any]]:
         conn.close()
 
 
+def load_chunk_source_hashes(*, cur=None) -> Dict[str, Optional[str]]:
+    """
+    meta_id별 현재 source_hash (한 meta_id의 청크는 모두 같은 해시).
+    반환: {meta_id: source_hash}
+    """
+    sql = """
+    SELECT meta_id, MAX(source_hash) AS source_hash
+    FROM chunks
+    GROUP BY meta_id
+    """
+
+    if cur is not None:
+        return {r["meta_id"]: r["source_hash"] for r in _fetchall(cur, sql)}
+
+    conn = get_connection()
+    try:
+        with conn.cursor() as _cur:
+            return load_chunk_source_hashes(cur=_cur)
+    finally:
+        conn.close()
+
+
+def load_chunks_for_metas(meta_ids: Iterable[str], *, cur=None) -> List[Dict[str, Any]]:
+    """
+    지정한 meta_id들의 청크 (load_all_chunks와 같은 컬럼).
+    """
+    ids = list(dict.fromkeys(m for m in meta_ids if m is not None))
+    if not ids:
+        return []
+
+    placeholders = ", ".join(["%s"] * len(ids))
+    sql = f"""
+    SELECT
+        C.chunk_id,
+        C.meta_id,
+        C.chunk_index,
+        C.text,
+        C.source_hash,
+        MD.title,
+        MD.file_path
+    FROM chunks AS C
+    LEFT JOIN metadata AS MD ON MD.meta_id = C.meta_id
+    WHERE C.meta_id IN ({placeholders})
+    ORDER BY C.chunk_id
+    """
+
+    if cur is not None:
+        return _fetchall(cur, sql, tuple(ids))
+
+    conn = get_connection()
+    try:
+        with conn.cursor() as _cur:
+            return load_chunks_for_metas(ids, cur=_cur)
+    finally:
+        conn.close()
+
+
+def window_span(rows: List[Dict[str, Any]]) -> Optional[Tuple[int, int]]:
+    """
+    문맥 확장 창에 포함된 청크들의 원문 범위 [start, end).
+    오프셋이 없는(구버전) 청크가 섞여 있으면 None.
+    """
+    if not rows:
+        return None
+    starts = [r.get("start_offset") for r in rows]
+    ends = [r.get("end_offset") for r in rows]
+    if any(v is None for v in starts) or any(v is None for v in ends):
+        return None
+    return min(starts), max(ends)
+
+
+def span_matches_chunks(span_text: str, span_start: int, rows: List[Dict[str, Any]]) -> bool:
+    """
+    원문에서 잘라 온 span이 청크 저장 시점의 원문과 같은지 확인.
+    청크 본문은 저장 당시 원문[start:end]와 정확히 같으므로, 창 안의 모든 청크가
+    span의 같은 위치에 그대로 있어야 한다. 원문이 수정됐는데 아직 rebuild_chunks 전이면 False.
+    """
+    for r in rows:
+        lo = r["start_offset"] - span_start
+        hi = r["end_offset"] - span_start
+        if span_text[lo:hi] != (r.get("text") or ""):
+            return False
+    return True
+
+
+def load_text_spans(
+    spans: Dict[Any, Tuple[str, int, int]],
+    *,
+    cur=None,
+) -> Dict[Any, str]:
+    """
+    {key: (meta_id, start, end)} → {key: 원문[start:end]}
+    TestMain 원문(clean_data 우선, chunker와 동일)에서 SUBSTRING으로 잘라 한 번에 조회.
+    """
+    items = list(spans.items())
+    if not items:
+        return {}
+
+    parts = []
+    params: List[Any] = []
+    for pos, (_, (meta_id, start, end)) in enumerate(items):
+        parts.append(
+            "SELECT %s AS pos, SUBSTRING(COALESCE(clean_data, raw_data), %s, %s) AS text "
+            "FROM TestMain WHERE meta_id = %s"
+        )
+        # SQL SUBSTRING은 1-based
+        params.extend([pos, start + 1, max(end - start, 0), meta_id])
+
+    sql = " UNION ALL ".join(parts)
+
+    if cur is None:
+        conn = get_connection()
+        try:
+            with conn.cursor() as _cur:
+                return load_text_spans(spans, cur=_cur)
+        finally:
+            conn.close()
+
+    out: Dict[Any, str] = {}
+    for row in _fetchall(cur, sql, tuple(params)):
+        key = items[int(row["pos"])][0]
+        out.setdefault(key, row["text"] or "")
+    return out
+
+
+def fetch_hit_contexts(
+    windows: Iterable[Tuple[str, int, int]],
+    *,
+    cur=None,
+) -> Tuple[
+    Dict[str, Dict[str, Any]],
+    Dict[Tuple[str, int, int], List[Dict[str, Any]]],
+    Dict[Tuple[str, int, int], str],
+]:
+    """
+    검색 hit 전체에 대한 metadata(title, url) + 문맥 확장용 주변 청크를 일괄 조회.
+    hit 수와 관계없이 SELECT 최대 3번 (metadata, chunks, 원문 span).
+
+    반환: (titles, windows, spans)
+    - spans: 오프셋이 기록된 창은 원문 [min(start), max(end)) 구간을 그대로 잘라 준다.
+      (겹침 제거가 필요 없음) 오프셋이 없는 창은 spans에 없고 windows로 병합해야 한다.
+    - 원문이 청킹 이후 수정되어 오프셋이 어긋난 창(span_matches_chunks 실패)도 spans에서 빠진다.
+    """
+    keys = list(windows)
+
+    if cur is not None:
+        titles = get_titles_urls((m for m, _, _ in keys), cur=cur)
+        rows = load_context_windows(keys, cur=cur)
+
+        span_req: Dict[Tuple[str, int, int], Tuple[str, int, int]] = {}
+        for key, key_rows in rows.items():
+            span = window_span(key_rows)
+            if span is not None:
+                span_req[key] = (key[0], span[0], span[1])
+        spans = load_text_spans(span_req, cur=cur)
+        for key in list(spans):
+            if not span_matches_chunks(spans[key], span_req[key][1], rows[key]):
+                # 원문이 수정됐는데 아직 재청킹 전 → chunks.text 병합으로 대체
+                del spans[key]
+        return titles, rows, spans
+
+    conn = get_connection()
+    try:
+        with conn.cursor() as _cur:
+            return fetch_hit_contexts(keys, cur=_cur)
+    finally:
+        conn.close()
+
+
+def fetch_parent_contexts(chunk_ids: Iterable[int], *, cur=None) -> Dict[int, Dict[str, Any]]:
+    """
+    검색 hit(chunk_id)들의 부모 블록 + 자식 본문 + title/url을 SELECT 한 번으로 조회.
+    반환: {chunk_id: {"meta_id", "parent_index", "parent_text", "chunk_text", "title", "url"}}
+    부모가 없는(구버전/재청킹된) 청크는 결과에 없다 → 호출 측이 창 확장으로 처리.
+    """
+    ids = list(dict.fromkeys(int(c) for c in chunk_ids))
+    if not ids:
+        return {}
+
+    placeholders = ", ".join(["%s"] * len(ids))
+    sql = f"""
+    SELECT
+        C.chunk_id,
+        C.meta_id,
+        C.parent_index,
+        C.text AS chunk_text,
+        P.text AS parent_text,
+        MD.title,
+        MD.url
+    FROM chunks AS C
+    JOIN chunk_parents AS P ON P.meta_id = C.meta_id AND P.parent_index = C.parent_index
+    LEFT JOIN metadata AS MD ON MD.meta_id = C.meta_id
+    WHERE C.chunk_id IN ({placeholders})
+    """
+
+    if cur is not None:
+        return {int(r["chunk_id"]): r for r in _fetchall(cur, sql, tuple(ids))}
+
+    conn = get_connection()
+    try:
+        with conn.cursor() as _cur:
+            return fetch_parent_contexts(ids, cur=_cur)
+    finally:
+        conn.close()
+
+
 # ========= faiss_mapping =========
 
 
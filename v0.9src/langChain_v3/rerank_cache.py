@@ -0,0 +1,240 @@
+# rag_engine/rerank_cache.py
+# Cross-Encoder 점수 캐시: (정규화 질의 해시, chunk_id, 리랭커 모델·백엔드·양자화, 청크 텍스트 해시) → 점수
+# 반복/비슷한 표현의 질문이 같은 청크를 다시 리랭크하지 않도록 한다.
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .query_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+RERANK_CACHE_ENABLED = os.getenv("RERANK_CACHE_ENABLED", "1").strip().lower() not in {
+    "0",
+    "false",
+    "no",
+    "off",
+}
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "50000"))
+# 비어 있으면 메모리만 사용. 지정하면 LRU에서 밀려난 점수를 sqlite에 내려 두고 miss 시 다시 읽는다
+RERANK_CACHE_PATH = os.getenv("RERANK_CACHE_PATH", "").strip()
+
+# (query_hash, chunk_id, model_id, text_hash)
+# model_id = "<model_name>|<backend>|<quantization>": torch와 ONNX int8은 model_name이 같아도 점수가 달라 따로 저장
+# (sqlite 컬럼명은 model_name 그대로. 예전 model_name만 든 행은 새 키와 겹치지 않아 그냥 miss)
+CacheKey = Tuple[str, str, str, str]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rerank_scores (
+    query_hash TEXT NOT NULL,
+    chunk_id TEXT NOT NULL,
+    model_name TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    meta_id TEXT,
+    score REAL NOT NULL,
+    PRIMARY KEY (query_hash, chunk_id, model_name, text_hash)
+);
+CREATE INDEX IF NOT EXISTS idx_rerank_scores_meta ON rerank_scores (meta_id);
+"""
+
+
+def _short_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:20]
+
+
+def reranker_model_id(model_name: str, backend: str = "torch", quantization: str = "fp32") -> str:
+    return f"{model_name}|{backend}|{quantization}"
+
+
+def rerank_cache_key(
+    query: str,
+    chunk_id,
+    model_name: str,
+    text: str,
+    backend: str = "torch",
+    quantization: str = "fp32",
+) -> CacheKey:
+    return (
+        _short_hash(normalize_query(query)),
+        str(chunk_id),
+        reranker_model_id(model_name, backend, quantization),
+        _short_hash(text or ""),
+    )
+
+
+class RerankScoreCache:
+    """
+    개수 상한 LRU + 선택적 sqlite spill.
+
+    - 텍스트 해시가 키에 들어 있어 청크 내용이 바뀌면 자연히 miss
+    - rebuild_chunks()가 meta_id를 재청킹하면 invalidate_meta()로 메모리/디스크 모두에서 제거
+    - 다른 프로세스에서 재청킹/재빌드된 문서는 워커가 새 인덱스를 로드할 때
+      RetrievalEngine.reload()가 바뀐 meta_id만 invalidate_metas()로 제거한다
+    """
+
+    def __init__(self, max_size: int = RERANK_CACHE_SIZE, path: str = RERANK_CACHE_PATH):
+        self.max_size = max(1, max_size)
+        self.path = path
+        self._data: "OrderedDict[CacheKey, Tuple[Optional[str], float]]" = OrderedDict()
+        self._by_meta: Dict[str, Set[CacheKey]] = {}
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.spilled = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _conn(self) -> Optional[sqlite3.Connection]:
+        """_lock 안에서만 호출."""
+        if not self.path:
+            return None
+        if self._db is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SCHEMA)
+        return self._db
+
+    def get_many(self, keys: Iterable[CacheKey]) -> Dict[CacheKey, float]:
+        found: Dict[CacheKey, float] = {}
+        with self._lock:
+            missing: List[CacheKey] = []
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is None:
+                    missing.append(key)
+                    continue
+                self._data.move_to_end(key)
+                found[key] = entry[1]
+                self.hits += 1
+
+            conn = self._conn() if missing else None
+            if conn is not None:
+                for key in missing:
+                    row = conn.execute(
+                        "SELECT meta_id, score FROM rerank_scores"
+                        " WHERE query_hash = ? AND chunk_id = ? AND model_name = ? AND text_hash = ?",
+                        key,
+                    ).fetchone()
+                    if row is None:
+                        continue
+                    found[key] = float(row[1])
+                    self._insert(key, row[0], float(row[1]))
+                    self.disk_hits += 1
+            self.misses += sum(1 for key in missing if key not in found)
+        return found
+
+    def put_many(self, entries: Iterable[Tuple[CacheKey, Optional[str], float]]) -> None:
+        with self._lock:
+            for key, meta_id, score in entries:
+                self._insert(key, meta_id, float(score))
+
+    def _insert(self, key: CacheKey, meta_id: Optional[str], score: float) -> None:
+        if key in self._data:
+            self._data.move_to_end(key)
+        self._data[key] = (meta_id, score)
+        if meta_id is not None:
+            self._by_meta.setdefault(meta_id, set()).add(key)
+
+        evicted: List[Tuple[CacheKey, Optional[str], float]] = []
+        while len(self._data) > self.max_size:
+            old_key, (old_meta, old_score) = self._data.popitem(last=False)
+            self._unlink_meta(old_key, old_meta)
+            evicted.append((old_key, old_meta, old_score))
+        self.evictions += len(evicted)
+
+        conn = self._conn() if evicted else None
+        if conn is not None:
+            conn.executemany(
+                "INSERT OR REPLACE INTO rerank_scores"
+                " (query_hash, chunk_id, model_name, text_hash, meta_id, score) VALUES (?, ?, ?, ?, ?, ?)",
+                [(*k, m, s) for k, m, s in evicted],
+            )
+            conn.commit()
+            self.spilled += len(evicted)
+
+    def _unlink_meta(self, key: CacheKey, meta_id: Optional[str]) -> None:
+        keys = self._by_meta.get(meta_id) if meta_id is not None else None
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                self._by_meta.pop(meta_id, None)
+
+    def invalidate_meta(self, meta_id: str) -> None:
+        self.invalidate_metas([meta_id])
+
+    def invalidate_metas(self, meta_ids: Iterable[str]) -> None:
+        meta_ids = list(meta_ids)
+        if not meta_ids:
+            return
+        with self._lock:
+            for meta_id in meta_ids:
+                for key in self._by_meta.pop(meta_id, set()):
+                    self._data.pop(key, None)
+            conn = self._conn()
+            if conn is not None:
+                conn.executemany("DELETE FROM rerank_scores WHERE meta_id = ?", [(m,) for m in meta_ids])
+                conn.commit()
+            self.invalidations += len(meta_ids)
+
+    def flush(self) -> int:
+        """메모리의 점수를 모두 sqlite에 기록 (서버 종료 시). 경로가 없으면 0."""
+        with self._lock:
+            conn = self._conn()
+            if conn is None:
+                return 0
+            rows = [(*k, m, s) for k, (m, s) in self._data.items()]
+            conn.executemany(
+                "INSERT OR REPLACE INTO rerank_scores"
+                " (query_hash, chunk_id, model_name, text_hash, meta_id, score) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.commit()
+            return len(rows)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._by_meta.clear()
+            conn = self._conn()
+            if conn is not None:
+                conn.execute("DELETE FROM rerank_scores")
+                conn.commit()
+
+    def stats(self) -> Dict[str, object]:
+        total = self.hits + self.disk_hits + self.misses
+        return {
+            "enabled": RERANK_CACHE_ENABLED,
+            "entries": len(self._data),
+            "max_size": self.max_size,
+            "path": self.path or None,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.disk_hits) / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "spilled": self.spilled,
+            "invalidations": self.invalidations,
+        }
+
+
+_cache: Optional[RerankScoreCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_rerank_cache() -> RerankScoreCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = RerankScoreCache()
+    return _cache
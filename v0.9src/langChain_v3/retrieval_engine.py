@@ -0,0 +1,453 @@
+# rag_engine/retrieval_engine.py
+# 프로세스당 한 번만 FAISS 인덱스 + 임베딩 모델을 로드해 두고 모든 요청이 공유하는 검색 엔진
+import hashlib
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .batching import MicroBatcher
+from .context_cache import get_context_cache
+from .dedup import DUPLICATES_FILE, DuplicateAliases, load_duplicate_map
+from .embeddings import embed_queries, load_embedding_model
+from .filters import filter_mask, filtered_search
+from .index_bundle import BUNDLE_FILES, IdStore, MmapFlatIndex, changed_metas
+from .index_factory import load_index_params, load_rescore_vectors, rescore_candidates
+from .query_cache import QUERY_EMBED_CACHE_SIZE, CachedQueryEmbeddings
+from .rerank_cache import get_rerank_cache
+from .vectorstore import DEFAULT_INDEX_DIR, load_index
+
+logger = logging.getLogger(__name__)
+
+# 인덱스 파일 변경 여부를 확인하는 최소 간격(초). 0이면 매 검색마다 확인.
+RELOAD_CHECK_INTERVAL_SEC = float(os.getenv("FAISS_RELOAD_CHECK_SEC", "30"))
+
+# 동시 요청의 질의를 모아 임베딩 1회 배치 forward + FAISS search 1회로 처리
+RETRIEVAL_MICROBATCH_ENABLED = os.getenv("RETRIEVAL_MICROBATCH_ENABLED", "1").strip().lower() not in {
+    "0",
+    "false",
+    "no",
+    "off",
+}
+RETRIEVAL_MAX_BATCH = int(os.getenv("RETRIEVAL_MAX_BATCH", "32"))
+RETRIEVAL_MAX_WAIT_MS = float(os.getenv("RETRIEVAL_MAX_WAIT_MS", "2"))
+
+_INDEX_FILES = tuple(
+    dict.fromkeys(BUNDLE_FILES + ("index.pkl", "index_params.json", "vectors.npy", DUPLICATES_FILE))
+)
+
+
+def _index_signature(index_dir: str) -> Tuple[Tuple[str, int, int], ...]:
+    """
+    인덱스 파일들의 (이름, mtime_ns, size) 묶음.
+    build_vectorstore()가 인덱스를 다시 저장하면 값이 바뀐다.
+    """
+    sig = []
+    for name in _INDEX_FILES:
+        path = os.path.join(index_dir, name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        sig.append((name, st.st_mtime_ns, st.st_size))
+    return tuple(sig)
+
+
+def _signature_version(signature: Tuple[Tuple[str, int, int], ...]) -> str:
+    raw = "|".join(f"{n}:{m}:{s}" for n, m, s in signature)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+class _LoadedIndex:
+    """
+    한 시점에 로드된 인덱스 스냅샷.
+    교체는 RetrievalEngine._state 참조 하나만 바꾸는 방식이라,
+    검색 중인 요청은 자기가 잡은 스냅샷을 끝까지 사용한다.
+    """
+
+    def __init__(
+        self,
+        index,
+        ids: IdStore,
+        signature,
+        loaded_at: float,
+        load_seconds: float,
+        rescore_vectors: Optional[np.ndarray] = None,
+        refine_factor: int = 1,
+        mmap: bool = False,
+        calibration: Optional[Dict[str, Any]] = None,
+        duplicates: Optional[Dict[int, Dict[str, Any]]] = None,
+    ):
+        self.index = index
+        self.ids = ids
+        self.signature = signature
+        # 압축 인덱스일 때만: 원본 float32 벡터(mmap) + 후보 배수
+        self.rescore_vectors = rescore_vectors
+        self.refine_factor = refine_factor
+        self.mmap = mmap
+        # 샤드 인덱스일 때만: 샤드 간 점수 보정용 L2 거리 분포 (mean / std)
+        self.calibration = calibration
+        # 대표 chunk_id → 빌드 시 제거된 근사 중복 청크 (dedup.py)
+        self.duplicates = duplicates or {}
+        # 중복 청크의 필터 속성 → 대표 row (필터가 중복 청크의 연도/학과/형식으로도 대표를 통과시키도록)
+        self.aliases = DuplicateAliases.from_map(self.duplicates, ids.chunk_id) if self.duplicates else None
+        self.version = _signature_version(signature)
+        self.loaded_at = loaded_at
+        self.load_seconds = load_seconds
+
+
+class RetrievalEngine:
+    """
+    FAISS 인덱스 + 임베딩 모델 상주 엔진.
+
+    - 임베딩 모델은 엔진 생성 후 최초 1회만 로드
+    - 인덱스 디렉터리 파일이 바뀌면 새 인덱스를 따로 로드한 뒤 참조만 교체(atomic swap)
+    - info()로 로드 시각/버전 확인 가능
+    """
+
+    def __init__(self, index_dir: str = DEFAULT_INDEX_DIR, embeddings: Optional[Any] = None):
+        self.index_dir = index_dir
+        self._embeddings = embeddings
+        self._state: Optional[_LoadedIndex] = None
+        self._lock = threading.RLock()
+        self._last_check = 0.0
+        self._reload_count = 0
+        self.filtered_searches = 0
+        self.filter_fallbacks = 0
+        self._batcher: Optional[MicroBatcher] = None
+        if RETRIEVAL_MICROBATCH_ENABLED:
+            self._batcher = MicroBatcher(
+                f"retrieval:{os.path.basename(os.path.normpath(index_dir))}",
+                self._search_items,
+                max_batch=RETRIEVAL_MAX_BATCH,
+                max_wait_ms=RETRIEVAL_MAX_WAIT_MS,
+            )
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            with self._lock:
+                if self._embeddings is None:
+                    logger.info("[ENGINE] 임베딩 모델 로드")
+                    embeddings = load_embedding_model()
+                    if QUERY_EMBED_CACHE_SIZE > 0:
+                        # 반복 질문은 임베딩 모델을 다시 돌리지 않도록 질의 캐시로 감싼다.
+                        embeddings = CachedQueryEmbeddings(embeddings)
+                    self._embeddings = embeddings
+        return self._embeddings
+
+    @property
+    def query_cache(self) -> Optional[CachedQueryEmbeddings]:
+        emb = self._embeddings
+        return emb if isinstance(emb, CachedQueryEmbeddings) else None
+
+    def _load(self) -> _LoadedIndex:
+        signature = _index_signature(self.index_dir)
+        t0 = time.perf_counter()
+        index, ids, mmap = load_index(index_dir=self.index_dir, embeddings=self.embeddings)
+        params = load_index_params(self.index_dir)
+        rescore_vectors = load_rescore_vectors(self.index_dir) if params.get("rescore") else None
+        if rescore_vectors is not None and rescore_vectors.shape[0] != index.ntotal:
+            logger.warning("[ENGINE] vectors.npy 행 수가 인덱스와 달라 재채점 비활성화: %s", self.index_dir)
+            rescore_vectors = None
+        elapsed = time.perf_counter() - t0
+
+        if _index_signature(self.index_dir) != signature:
+            # 로드 도중 인덱스가 다시 저장됨 → 반쯤 쓰인 파일일 수 있으니 다음 확인 때 재시도
+            raise RuntimeError(f"FAISS 인덱스가 로드 중에 변경되었습니다: {self.index_dir}")
+
+        state = _LoadedIndex(
+            index,
+            ids,
+            signature,
+            time.time(),
+            elapsed,
+            rescore_vectors=rescore_vectors,
+            refine_factor=int(params.get("refine_factor") or 1),
+            mmap=mmap,
+            calibration=params.get("calibration"),
+            duplicates=load_duplicate_map(self.index_dir),
+        )
+        logger.info(
+            "[ENGINE] 인덱스 로드 완료 version=%s ntotal=%d (%.2fs)",
+            state.version,
+            int(index.ntotal),
+            elapsed,
+        )
+        return state
+
+    def load(self) -> "RetrievalEngine":
+        """최초 로드(서버 startup에서 호출). 이미 로드되어 있으면 아무것도 하지 않음."""
+        if self._state is None:
+            with self._lock:
+                if self._state is None:
+                    self._state = self._load()
+                    self._last_check = time.monotonic()
+        return self
+
+    def reload(self) -> bool:
+        """
+        인덱스를 강제로 다시 로드해 교체.
+        실패하면 기존 인덱스를 그대로 유지하고 False 반환.
+        """
+        with self._lock:
+            try:
+                new_state = self._load()
+            except Exception:
+                logger.exception("[ENGINE] 인덱스 재로드 실패, 기존 인덱스 유지: %s", self.index_dir)
+                return False
+            old_state = self._state
+            self._state = new_state
+            self._reload_count += 1
+        self._invalidate_caches(old_state, new_state)
+        return True
+
+    @staticmethod
+    def _invalidate_caches(old_state: Optional[_LoadedIndex], new_state: _LoadedIndex) -> None:
+        """
+        재청킹(rebuild_chunks)은 보통 별도 오프라인 프로세스에서 돌아 이 워커의 캐시를 직접 비우지 못한다.
+        새 인덱스를 로드할 때 이전 스냅샷과 source_hash가 달라진 meta_id의 문맥/리랭크 캐시를 제거한다.
+        """
+        if old_state is None:
+            get_context_cache().clear()
+            return
+        changed = changed_metas(old_state.ids, new_state.ids)
+        if changed:
+            logger.info("[ENGINE] 재청킹된 문서 %d개의 문맥/리랭크 캐시 제거", len(changed))
+            get_context_cache().invalidate_metas(changed)
+            get_rerank_cache().invalidate_metas(changed)
+
+    def reload_if_changed(self) -> bool:
+        """인덱스 파일 시그니처가 바뀐 경우에만 재로드."""
+        state = self._state
+        if state is None:
+            self.load()
+            return True
+        signature = _index_signature(self.index_dir)
+        if not signature or signature == state.signature:
+            return False
+        logger.info("[ENGINE] 인덱스 변경 감지 → 재로드: %s", self.index_dir)
+        return self.reload()
+
+    def _current(self) -> _LoadedIndex:
+        self.load()
+        now = time.monotonic()
+        if now - self._last_check >= RELOAD_CHECK_INTERVAL_SEC:
+            self._last_check = now
+            self.reload_if_changed()
+        state = self._state
+        assert state is not None
+        return state
+
+    def search(self, query: str, k: int = 5, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        query → top-k 청크 hit 리스트.
+        hit: {chunk_id, meta_id, chunk_index, source_hash, score, chunk_text}
+        chunk_text는 번들에 본문이 없으므로 None이며, build_search_results가 DB/문맥 캐시에서 채운다.
+
+        filters: {"year": 2025, "source_type": "file", "department": "컴퓨터공학과"} 중 일부.
+        FAISS 검색 안에서(ID selector) 적용되며, 통과하는 벡터가 없으면 필터 없이 검색한다.
+
+        RETRIEVAL_MICROBATCH_ENABLED면 동시에 들어온 다른 요청의 질의와 묶여 search_batch로 처리된다.
+        """
+        if self._batcher is not None:
+            return self._batcher.submit([(query, k, filters)])[0]
+        state = self._current()
+        query_vec = np.asarray([self.embeddings.embed_query(query)], dtype="float32")
+        return self._search_vectors(state, query_vec, k, filters=filters)[0]
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """질의 리스트 → [nq, d] float32 (엔진의 임베딩 모델 + 질의 캐시, 가능하면 배치 forward 1회)."""
+        return np.asarray(embed_queries(self.embeddings, list(queries)), dtype="float32")
+
+    def search_vectors(
+        self,
+        query_vecs: np.ndarray,
+        k: int = 5,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[List[Dict[str, Any]]], Optional[Dict[str, Any]]]:
+        """
+        이미 임베딩한 질의 벡터 [nq, d]로 검색 (샤드 라우터가 질의를 한 번만 임베딩하고 샤드마다 호출).
+        반환: (질의별 hit 리스트, 검색에 쓴 스냅샷의 calibration)
+        """
+        state = self._current()
+        hits = self._search_vectors(state, np.asarray(query_vecs, dtype="float32"), k, filters=filters)
+        return hits, state.calibration
+
+    def _search_items(self, items: List[Tuple[str, int, Optional[Dict[str, Any]]]]) -> List[Any]:
+        """
+        마이크로 배처 처리 함수: (query, k, filters) 묶음 → 질의별 hit 리스트 (또는 그 질의의 예외).
+        임베딩은 묶음 전체 1회, FAISS 검색은 (필터, k)가 같은 질의끼리 → 결과가 같이 묶인 요청에 좌우되지 않는다.
+        묶음 처리가 실패하면 질의별로 다시 검색해, 실패한 질의만 예외를 돌려받는다.
+        """
+        queries = [q for q, _, _ in items]
+        ks = [k for _, k, _ in items]
+        filters = [f for _, _, f in items]
+        try:
+            state = self._current()
+            return self._search_grouped(state, self.embed_queries(queries), ks, filters)
+        except Exception:
+            if len(items) == 1:
+                raise
+            logger.exception("[ENGINE] 배치 검색 실패 → 질의별 재시도 (%d건)", len(items))
+
+        out: List[Any] = []
+        for item in items:
+            try:
+                out.extend(self._search_items([item]))
+            except Exception as e:
+                out.append(e)
+        return out
+
+    def _search_grouped(
+        self,
+        state: _LoadedIndex,
+        vectors: np.ndarray,
+        ks: List[int],
+        filters: List[Optional[Dict[str, Any]]],
+    ) -> List[List[Dict[str, Any]]]:
+        """임베딩된 질의들을 (필터, k)가 같은 것끼리 묶어 한 번씩 검색. 반환: 질의 순서대로 hit 리스트"""
+        groups: Dict[Tuple[str, int], List[int]] = {}
+        for i, (f, k) in enumerate(zip(filters, ks)):
+            groups.setdefault((repr(sorted((f or {}).items())), k), []).append(i)
+
+        out: List[List[Dict[str, Any]]] = [[] for _ in ks]
+        for (_, k), positions in groups.items():
+            group_hits = self._search_vectors(state, vectors[positions], k, filters=filters[positions[0]])
+            for pos, hits in zip(positions, group_hits):
+                out[pos] = hits
+        return out
+
+    def search_batch(
+        self,
+        queries: List[str],
+        k: int = 5,
+        filters: Optional[List[Optional[Dict[str, Any]]]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        여러 질의를 한 번에 검색: 임베딩 1회 배치 forward + 질의 행렬 하나로 FAISS search.
+        filters는 질의별 필터 리스트(없으면 전부 필터 없음). 같은 필터끼리 묶어 한 번씩 검색한다.
+        반환: 질의 순서대로 hit 리스트
+        """
+        if not queries:
+            return []
+        state = self._current()
+        vectors = self.embed_queries(queries)
+        filters = list(filters) if filters is not None else [None] * len(queries)
+        return self._search_grouped(state, vectors, [k] * len(queries), filters)
+
+    def _filter(self, state: _LoadedIndex, filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        mask = filter_mask(state.ids, filters, aliases=state.aliases)
+        if mask is None:
+            return None
+        allowed = int(mask.sum())
+        if allowed == len(mask):
+            return None
+        if allowed == 0:
+            self.filter_fallbacks += 1
+            logger.info("[ENGINE] 필터 %s를 만족하는 벡터가 없어 필터 없이 검색", filters)
+            return None
+        self.filtered_searches += 1
+        return mask
+
+    @staticmethod
+    def _index_search(index, queries: np.ndarray, k: int, mask: Optional[np.ndarray]):
+        if mask is None:
+            return index.search(queries, k)
+        if isinstance(index, MmapFlatIndex):
+            return index.search_subset(queries, k, np.flatnonzero(mask))
+        return filtered_search(index, queries, k, mask)
+
+    def _search_vectors(
+        self,
+        state: _LoadedIndex,
+        queries: np.ndarray,
+        k: int,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        질의 벡터 [nq, d] → 질의별 hit 리스트.
+        압축 인덱스면 k * refine_factor개 후보를 뽑은 뒤 원본 벡터로 정확한 L2 거리 재계산.
+        """
+        index = state.index
+        mask = self._filter(state, filters)
+        ntotal = int(index.ntotal) if mask is None else int(mask.sum())
+        k = min(k, ntotal)
+        if k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        if state.rescore_vectors is not None:
+            fetch = min(ntotal, k * state.refine_factor)
+            _, candidates = self._index_search(index, queries, fetch, mask)
+            distances, ids = rescore_candidates(state.rescore_vectors, queries, candidates, k)
+        else:
+            distances, ids = self._index_search(index, queries, k, mask)
+
+        return [
+            [self._hit(state, int(i), float(d)) for d, i in zip(drow, irow) if i >= 0]
+            for drow, irow in zip(distances, ids)
+        ]
+
+    @staticmethod
+    def _hit(state: _LoadedIndex, faiss_id: int, score: float) -> Dict[str, Any]:
+        hit = state.ids.row(faiss_id)
+        hit["score"] = score
+        hit["chunk_text"] = None
+        dup = state.duplicates.get(hit["chunk_id"])
+        if dup:
+            # 같은 내용이 실린 다른 문서 (인용용)
+            hit["also_in"] = dup["also_in"]
+        return hit
+
+    @property
+    def version(self) -> Optional[str]:
+        state = self._state
+        return state.version if state is not None else None
+
+    def info(self) -> Dict[str, Any]:
+        state = self._state
+        if state is None:
+            return {"index_dir": self.index_dir, "loaded": False}
+        return {
+            "index_dir": self.index_dir,
+            "loaded": True,
+            "version": state.version,
+            "loaded_at": datetime.fromtimestamp(state.loaded_at).isoformat(timespec="seconds"),
+            "load_seconds": round(state.load_seconds, 3),
+            "ntotal": int(state.index.ntotal),
+            "mmap": state.mmap,
+            "rescore": state.rescore_vectors is not None,
+            "refine_factor": state.refine_factor,
+            "calibration": state.calibration,
+            "deduplicated_chunks": sum(len(d["duplicates"]) for d in state.duplicates.values()),
+            "reload_count": self._reload_count,
+            "filtered_searches": self.filtered_searches,
+            "filter_fallbacks": self.filter_fallbacks,
+            "batching": self._batcher.stats() if self._batcher else None,
+            "query_cache": self.query_cache.stats() if self.query_cache else None,
+        }
+
+
+_engines: Dict[str, RetrievalEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_retrieval_engine(index_dir: str = DEFAULT_INDEX_DIR, embeddings: Optional[Any] = None) -> RetrievalEngine:
+    """
+    index_dir별 프로세스 전역 엔진 반환 (없으면 생성).
+    같은 프로세스의 모든 요청이 하나의 엔진/임베딩 모델을 공유한다.
+    embeddings는 엔진을 처음 만들 때만 쓰인다 (샤드 엔진들이 임베딩 모델 하나를 공유하도록).
+    """
+    key = os.path.abspath(index_dir)
+    engine = _engines.get(key)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(key)
+            if engine is None:
+                engine = RetrievalEngine(index_dir=index_dir, embeddings=embeddings)
+                _engines[key] = engine
+    return engine
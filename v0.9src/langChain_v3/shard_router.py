@@ -0,0 +1,162 @@
+# rag_engine/shard_router.py
+# 세그먼트별 샤드 인덱스를 병렬로 검색하고, 샤드별 거리 분포로 보정한 점수(z-score)로 top-k 병합
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .fanout import FanOutExecutor
+from .index_bundle import has_bundle
+from .retrieval_engine import RetrievalEngine, get_retrieval_engine
+from .shards import DEFAULT_SHARD_DIR, SHARD_NAMES, merge_shard_hits, shards_for_filters
+from .vectorstore import DEFAULT_INDEX_DIR
+
+logger = logging.getLogger(__name__)
+
+# semantic_search / fused_search의 dense 검색을 단일 인덱스 대신 샤드 라우터로 할지
+SHARDED_RETRIEVAL_ENABLED = os.getenv("SHARDED_RETRIEVAL_ENABLED", "0").strip().lower() in {
+    "1",
+    "true",
+    "yes",
+    "on",
+}
+# 샤드 하나의 검색 마감(ms). 넘기면 그 샤드 없이 병합
+SHARD_SEARCH_DEADLINE_MS = float(os.getenv("SHARD_SEARCH_DEADLINE_MS", "1000"))
+# 샤드 검색 전용 풀 크기. hybrid_search_rerank가 공용 fan-out 풀에서 라우터를 부르므로 같은 풀을 쓰지 않는다
+SHARD_FANOUT_WORKERS = int(os.getenv("SHARD_FANOUT_WORKERS", str(len(SHARD_NAMES) * 2)))
+
+
+
+
+class ShardRouter:
+    """
+    DEFAULT_SHARD_DIR/<segment>/ 인덱스들 앞단의 라우터.
+
+    - 질의는 한 번만 임베딩하고(단일 인덱스 엔진의 임베딩 모델/질의 캐시 공유) 벡터를 샤드마다 넘긴다.
+    - 필터(source_type)로 검색할 샤드를 좁히고, 나머지 샤드는 라우터 전용 fan-out 풀에서 동시에 검색
+      (공용 풀 작업 안에서 불려도 같은 풀을 기다리지 않으므로 워커 고갈이 없다)
+    - 샤드별 hit를 calibrated_score로 바꿔 하나의 순위로 병합 (score에는 원래 L2 거리가 남는다)
+    - 샤드마다 엔진이 따로 있어 재빌드된 샤드만 다시 로드된다
+    """
+
+    def __init__(self, root_dir: str = DEFAULT_SHARD_DIR, base_index_dir: str = DEFAULT_INDEX_DIR):
+        self.root_dir = root_dir
+        self.base_index_dir = base_index_dir
+        self.searches = 0
+        self.partial_searches = 0
+        self._fanout = FanOutExecutor(SHARD_FANOUT_WORKERS, name="shard-fanout")
+
+    def available(self) -> List[str]:
+        return [name for name in SHARD_NAMES if has_bundle(os.path.join(self.root_dir, name))]
+
+    def load(self) -> "ShardRouter":
+        """서버 startup에서 호출: 첫 질의가 샤드 로드 때문에 마감을 넘기지 않도록 미리 로드."""
+        for name in self.available():
+            self._engine(name).load()
+        return self
+
+    def _engine(self, name: str) -> RetrievalEngine:
+        embeddings = get_retrieval_engine(self.base_index_dir).embeddings
+        return get_retrieval_engine(os.path.join(self.root_dir, name), embeddings=embeddings)
+
+    def search(
+        self,
+        query: str,
+        k: int = 5,
+        filters: Optional[Dict[str, Any]] = None,
+        report: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        query → 샤드 병합 top-k hit 리스트 (RetrievalEngine.search와 같은 형식 + shard / calibrated_score).
+        report(dict)를 넘기면 검색한 샤드와 마감을 넘긴 샤드(timed_out_sources)를 채운다.
+        """
+        query_vec = get_retrieval_engine(self.base_index_dir).embed_queries([query])
+        return self._search_vectors(query_vec, k, filters, report)[0]
+
+    def search_batch(
+        self,
+        queries: List[str],
+        k: int = 5,
+        filters: Optional[List[Optional[Dict[str, Any]]]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        RetrievalEngine.search_batch의 샤드 버전: 질의 임베딩 1회 배치 forward 후
+        같은 필터끼리 묶어 그룹마다 샤드 fan-out 한 번. 반환: 질의 순서대로 hit 리스트
+        """
+        if not queries:
+            return []
+        vectors = get_retrieval_engine(self.base_index_dir).embed_queries(list(queries))
+
+        filters = list(filters) if filters is not None else [None] * len(queries)
+        groups: Dict[str, List[int]] = {}
+        for i, f in enumerate(filters):
+            groups.setdefault(repr(sorted((f or {}).items())), []).append(i)
+
+        out: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        for positions in groups.values():
+            group_hits = self._search_vectors(vectors[positions], k, filters[positions[0]], None)
+            for pos, hits in zip(positions, group_hits):
+                out[pos] = hits
+        return out
+
+    def _search_vectors(
+        self,
+        query_vecs: np.ndarray,
+        k: int,
+        filters: Optional[Dict[str, Any]],
+        report: Optional[Dict[str, Any]],
+    ) -> List[List[Dict[str, Any]]]:
+        """같은 필터의 질의 벡터 [nq, d] → 샤드 fan-out 검색 후 질의별 병합 top-k."""
+        names = self.available()
+        allowed = shards_for_filters(filters)
+        if allowed is not None:
+            names = [name for name in names if name in allowed] or names
+        if not names:
+            raise FileNotFoundError(f"샤드 인덱스가 없습니다: {self.root_dir} (build_sharded_vectorstore 실행 필요)")
+
+        def task(name: str):
+            return lambda: self._engine(name).search_vectors(query_vecs, k, filters=filters)
+
+        fanout = self._fanout.run(
+            {name: task(name) for name in names},
+            deadlines_ms={name: SHARD_SEARCH_DEADLINE_MS for name in names},
+        )
+        merged = merge_shard_hits(fanout.results, names, len(query_vecs), k)
+
+        self.searches += len(query_vecs)
+        if fanout.timed_out or fanout.failed:
+            self.partial_searches += len(query_vecs)
+        if report is not None:
+            report.update(fanout.report())
+            report["shards"] = names
+        return merged
+
+    @property
+    def version(self) -> str:
+        """샤드 엔진 버전 묶음 (답변 캐시 키용: 어느 샤드든 다시 빌드되면 바뀐다)."""
+        return ",".join(f"{name}={self._engine(name).version}" for name in self.available())
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "root_dir": self.root_dir,
+            "enabled": SHARDED_RETRIEVAL_ENABLED,
+            "searches": self.searches,
+            "partial_searches": self.partial_searches,
+            "fanout": self._fanout.stats(),
+            "shards": {name: self._engine(name).info() for name in self.available()},
+        }
+
+
+_router: Optional[ShardRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_shard_router() -> ShardRouter:
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ShardRouter()
+    return _router
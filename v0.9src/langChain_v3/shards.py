@@ -0,0 +1,115 @@
+# rag_engine/shards.py
+# 코퍼스 세그먼트(공지 게시판 / 정적 서브페이지 / 첨부파일 / 학사 요람)별 샤드 인덱스 정의
+# + 샤드 간 점수 보정(calibration) 통계
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+_AIDATA_DIR = Path(__file__).resolve().parents[1] / "aidata"
+# 샤드 인덱스 루트: <root>/<segment>/ 마다 독립된 인덱스 번들 + shards.json
+DEFAULT_SHARD_DIR = os.getenv("FAISS_SHARD_DIR", str(_AIDATA_DIR / "faiss_shards")).strip()
+SHARD_MANIFEST_FILE = "shards.json"
+
+# board: 공지 게시글(artclView.do) / subview: 정적 서브페이지(subview.do)
+# file: 첨부파일(metadata.file_path) / manual: 학사 요람(manual_yo_*) / etc: 그 외 html
+SHARD_NAMES = ("board", "subview", "file", "manual", "etc")
+
+
+def segment_of(meta_id: Optional[str], url: Optional[str], file_path: Optional[str]) -> str:
+    """문서(meta_id) → 샤드 세그먼트 이름."""
+    if (meta_id or "").startswith("manual_yo_"):
+        return "manual"
+    if file_path:
+        return "file"
+    url = url or ""
+    if "artclView.do" in url:
+        return "board"
+    if "subview.do" in url:
+        return "subview"
+    return "etc"
+
+
+def shards_for_filters(filters: Optional[Dict[str, Any]]) -> Optional[tuple]:
+    """
+    필터로 검색할 샤드를 좁힌다 (None이면 전체).
+    source_type=file이면 첨부파일 샤드 + 요람 샤드(manual_yo_ PDF는 file_path가 있어도 manual로 감),
+    html이면 첨부파일 샤드 제외.
+    """
+    source_type = (filters or {}).get("source_type")
+    if source_type == "file":
+        return ("file", "manual")
+    if source_type == "html":
+        return tuple(name for name in SHARD_NAMES if name != "file")
+    return None
+
+
+def calibrate_shard(index, vectors: np.ndarray, k: int = 10, sample: int = 256, seed: int = 0) -> Dict[str, Any]:
+    """
+    샤드별 L2 거리 분포 (평균/표준편차).
+    샤드 안의 벡터 sample개로 자기 자신을 뺀 top-k 이웃 거리를 모아 계산한다.
+    조밀한 샤드(비슷한 청크가 많은 요람 등)는 거리가 전반적으로 작으므로,
+    검색 시 z = (mean - d) / std로 바꿔 샤드 간 점수를 비교 가능하게 만든다.
+    """
+    n = int(vectors.shape[0])
+    if n < 2:
+        return {"k": k, "mean": 1.0, "std": 1.0, "sample": n}
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(n, size=min(sample, n), replace=False)
+    kk = min(k + 1, n)
+    distances, ids = index.search(np.ascontiguousarray(vectors[rows]), kk)
+    neighbours = distances[ids != rows[:, None]]
+    neighbours = neighbours[np.isfinite(neighbours)]
+    if neighbours.size == 0:
+        return {"k": k, "mean": 1.0, "std": 1.0, "sample": int(len(rows))}
+    return {
+        "k": k,
+        "mean": float(neighbours.mean()),
+        "std": float(max(neighbours.std(), 1e-6)),
+        "sample": int(len(rows)),
+    }
+
+
+def calibrated_score(distance: float, calibration: Optional[Dict[str, Any]]) -> float:
+    """L2 거리 → 샤드 보정 점수 (높을수록 좋음). calibration이 없으면 -거리."""
+    if not calibration:
+        return -distance
+    return (float(calibration["mean"]) - distance) / float(calibration["std"])
+
+
+def merge_shard_hits(
+    results: Mapping[str, Tuple[List[List[Dict[str, Any]]], Optional[Dict[str, Any]]]],
+    names: Sequence[str],
+    num_queries: int,
+    k: int,
+) -> List[List[Dict[str, Any]]]:
+    """
+    샤드별 (질의별 hit 리스트, calibration) → 질의별 병합 top-k.
+    hit마다 shard / calibrated_score를 붙이고 calibrated_score 내림차순으로 자른다.
+    results에 없는 샤드(마감 초과/실패)는 건너뛴다. 동점이면 names 순서를 유지한다.
+    같은 chunk_id(여러 세그먼트의 중복을 대표해 여러 샤드에 들어간 청크)는 점수가 가장 높은 것 하나만 남긴다.
+    """
+    merged: List[List[Dict[str, Any]]] = [[] for _ in range(num_queries)]
+    for name in names:
+        result = results.get(name)
+        if result is None:
+            continue
+        hits_per_query, calibration = result
+        for qi, hits in enumerate(hits_per_query):
+            for hit in hits:
+                hit["shard"] = name
+                hit["calibrated_score"] = calibrated_score(hit["score"], calibration)
+                merged[qi].append(hit)
+    out: List[List[Dict[str, Any]]] = []
+    for hits in merged:
+        hits.sort(key=lambda h: h["calibrated_score"], reverse=True)
+        seen = set()
+        unique = []
+        for hit in hits:
+            if hit["chunk_id"] in seen:
+                continue
+            seen.add(hit["chunk_id"])
+            unique.append(hit)
+        out.append(unique[:k])
+    return out
@@ -0,0 +1,72 @@
+# 의미 기반 답변 캐시: 유사도 임계값 / 정확 일치 조건(버전·필터·숫자)
+import pytest
+
+np = pytest.importorskip("numpy")
+answer_cache = pytest.importorskip("langChain_v3.RAGLLM.answer_cache")
+
+
+def _unit(v):
+    v = np.asarray(v, dtype="float32")
+    return v / np.linalg.norm(v)
+
+
+def _near(base, cos, seed=0):
+    """base와 코사인 유사도가 정확히 cos인 단위 벡터."""
+    rng = np.random.default_rng(seed)
+    noise = rng.normal(size=base.shape).astype("float32")
+    noise -= noise.dot(base) * base
+    noise = _unit(noise)
+    return _unit(cos * base + np.sqrt(1 - cos**2) * noise)
+
+
+@pytest.fixture
+def cache():
+    return answer_cache.SemanticAnswerCache(threshold=0.95, ttl_sec=3600, max_size=100)
+
+
+def test_hit_above_threshold_same_version(cache):
+    base = _unit(np.random.default_rng(1).normal(size=64))
+    cache.store(base, "휴학 신청 기간", {"answer": "A"}, "v1", latency=1.0)
+    hit = cache.lookup(_near(base, 0.97), "v1")
+    assert hit is not None and hit["answer"] == "A"
+    assert hit["answer_cache"]["cached_question"] == "휴학 신청 기간"
+
+
+def test_miss_below_threshold(cache):
+    base = _unit(np.random.default_rng(2).normal(size=64))
+    cache.store(base, "휴학 신청 기간", {"answer": "A"}, "v1", latency=1.0)
+    assert cache.lookup(_near(base, 0.9), "v1") is None
+
+
+def test_miss_on_different_version_even_if_identical(cache):
+    base = _unit(np.random.default_rng(3).normal(size=64))
+    cache.store(base, "2023 장학금", {"answer": "A"}, "v1", latency=1.0)
+    assert cache.lookup(base, "v2") is None
+
+
+def test_version_separates_years_and_numbers():
+    version = answer_cache.answer_cache_version
+    assert version("idx", "2023 장학금", {"year": 2023}, k=5) != version("idx", "2024 장학금", {"year": 2024}, k=5)
+    # 필터로 잡히지 않는 숫자(학기)도 정확 일치 조건
+    assert version("idx", "1학기 등록 기간", {}, k=5) != version("idx", "2학기 등록 기간", {}, k=5)
+    assert version("idx", "휴학 신청 기간?", {}, k=5) == version("idx", "휴학 신청 기간", {}, k=5)
+    assert version("idx", "q", {}, k=5) != version("idx", "q", {}, k=10)
+
+
+def test_hit_not_hidden_by_many_closer_other_version_entries(cache):
+    base = _unit(np.random.default_rng(3).normal(size=64))
+    for i in range(20):
+        cache.store(_near(base, 0.999, seed=i), f"다른 버전 {i}", {"answer": "old"}, "v0", latency=1.0)
+    cache.store(_near(base, 0.96, seed=99), "휴학 신청 기간", {"answer": "A"}, "v1", latency=1.0)
+    hit = cache.lookup(base, "v1")
+    assert hit is not None and hit["answer"] == "A"
+
+
+def test_expired_entries_pruned_on_store(cache):
+    base = _unit(np.random.default_rng(4).normal(size=64))
+    cache.store(base, "오래된 질문", {"answer": "old"}, "v1", latency=1.0)
+    for entry in cache._entries.values():
+        entry.created_at -= cache.ttl_sec + 1
+    cache.store(_near(base, 0.5), "새 질문", {"answer": "new"}, "v1", latency=1.0)
+    assert cache.stats()["entries"] == 1
+    assert cache.lookup(base, "v1") is None
@@ -0,0 +1,113 @@
+# 마이크로 배처: 요청 묶기 / 요청별 마감(BatchTimeout) / 오류 전달
+import threading
+
+import pytest
+
+batching = pytest.importorskip("langChain_v3.batching")
+
+
+def _submit_all(batcher, requests, timeout_ms=None):
+    results = [None] * len(requests)
+
+    def run(i, items):
+        try:
+            results[i] = batcher.submit(items, timeout_ms=timeout_ms)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i, items)) for i, items in enumerate(requests)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    return results
+
+
+def test_concurrent_requests_share_one_batch():
+    calls = []
+
+    def process(items):
+        calls.append(list(items))
+        return [x * 10 for x in items]
+
+    batcher = batching.MicroBatcher("t", process, max_batch=64, max_wait_ms=200)
+    results = _submit_all(batcher, [[1, 2], [3], [4, 5, 6]])
+
+    assert results == [[10, 20], [30], [40, 50, 60]]
+    assert len(calls) == 1
+    assert sorted(calls[0]) == [1, 2, 3, 4, 5, 6]
+    assert batcher.stats()["batches"] == 1
+
+
+def test_oversized_request_runs_alone_and_unsplit():
+    calls = []
+
+    def process(items):
+        calls.append(len(items))
+        return items
+
+    batcher = batching.MicroBatcher("t", process, max_batch=2, max_wait_ms=1)
+    assert batcher.submit(list(range(5))) == list(range(5))
+    assert calls == [5]
+
+
+def test_timeout_while_worker_is_busy_raises_and_is_not_processed():
+    release = threading.Event()
+    started = threading.Event()
+    seen = []
+
+    def process(items):
+        seen.extend(items)
+        started.set()
+        release.wait(5)
+        return items
+
+    batcher = batching.MicroBatcher("t", process, max_batch=1, max_wait_ms=0)
+    first = threading.Thread(target=batcher.submit, args=(["slow"],))
+    first.start()
+    assert started.wait(5)
+
+    # 워커가 앞 배치에 묶여 있는 동안 마감이 지남 → 배치에 들어가기 전에 포기
+    with pytest.raises(batching.BatchTimeout):
+        batcher.submit(["late"], timeout_ms=50)
+
+    release.set()
+    first.join(5)
+    # 다음 배치에서 꺼낼 때 취소된 요청은 건너뛴다
+    assert batcher.submit(["next"], timeout_ms=2000) == ["next"]
+    assert "late" not in seen
+    assert batcher.stats()["timeouts"] == 1
+
+
+def test_process_error_and_result_count_mismatch_reach_every_caller():
+    def fail(items):
+        raise ValueError("boom")
+
+    batcher = batching.MicroBatcher("t", fail, max_wait_ms=50)
+    results = _submit_all(batcher, [["a"], ["b"]])
+    assert all(isinstance(r, ValueError) for r in results)
+
+    short = batching.MicroBatcher("t", lambda items: items[:-1], max_wait_ms=1)
+    with pytest.raises(RuntimeError):
+        short.submit(["a", "b"])
+    assert short.stats()["errors"] == 1
+
+
+def test_empty_submit_returns_without_worker():
+    batcher = batching.MicroBatcher("t", lambda items: items)
+    assert batcher.submit([]) == []
+    assert batcher.stats()["requests"] == 0
+
+
+def test_item_level_error_fails_only_its_request():
+    def process(items):
+        return [ValueError(x) if x == "bad" else x.upper() for x in items]
+
+    batcher = batching.MicroBatcher("t", process, max_batch=64, max_wait_ms=200)
+    results = _submit_all(batcher, [["a"], ["bad"], ["b", "c"]])
+
+    assert results[0] == ["A"]
+    assert isinstance(results[1], ValueError)
+    assert results[2] == ["B", "C"]
+    assert batcher.stats()["batches"] == 1
+    assert batcher.stats()["errors"] == 1
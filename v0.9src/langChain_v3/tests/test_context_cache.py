@@ -0,0 +1,54 @@
+# 문맥 캐시(ContextWindowCache) + 인덱스 재로드 시 무효화 대상 계산
+import pytest
+
+context_cache = pytest.importorskip("langChain_v3.context_cache")
+
+
+def _entry(text, source_hash="h1"):
+    return {"title": "t", "url": "u", "context_text": text, "source_hash": source_hash}
+
+
+def test_get_put_and_hash_mismatch_drops_meta():
+    cache = context_cache.ContextWindowCache(max_bytes=1 << 20)
+    cache.put(("m1", 0, 1), _entry("a"))
+    cache.put(("m1", 1, 1), _entry("b"))
+    assert cache.get(("m1", 0, 1), source_hash="h1")["context_text"] == "a"
+
+    # 재청킹된 문서의 hit(다른 source_hash) → meta_id 전체 제거
+    assert cache.get(("m1", 0, 1), source_hash="h2") is None
+    assert cache.get(("m1", 1, 1)) is None
+
+
+def test_invalidate_metas_only_drops_given_documents():
+    cache = context_cache.ContextWindowCache(max_bytes=1 << 20)
+    cache.put(("m1", 0, 1), _entry("a"))
+    cache.put(("m2", 0, 1), _entry("b"))
+    cache.invalidate_metas(["m1", "missing"])
+    assert cache.get(("m1", 0, 1)) is None
+    assert cache.get(("m2", 0, 1))["context_text"] == "b"
+
+
+def test_byte_budget_evicts_oldest():
+    cache = context_cache.ContextWindowCache(max_bytes=300)
+    for i in range(5):
+        cache.put(("m", i, 1), _entry("x" * 100))
+    assert cache.stats()["bytes"] <= 300
+    assert cache.get(("m", 0, 1)) is None
+    assert cache.get(("m", 4, 1)) is not None
+
+
+def test_changed_metas_between_snapshots():
+    np = pytest.importorskip("numpy")
+    index_bundle = pytest.importorskip("langChain_v3.index_bundle")
+
+    def ids(rows):
+        return index_bundle.IdStore(
+            chunk_id=np.arange(len(rows), dtype="int64"),
+            meta_id=np.asarray([m for m, _ in rows], dtype=str),
+            chunk_index=np.zeros(len(rows), dtype="int32"),
+            source_hash=np.asarray([h for _, h in rows], dtype=str),
+        )
+
+    old = ids([("a", "1"), ("a", "1"), ("b", "1"), ("c", "1")])
+    new = ids([("a", "1"), ("b", "2"), ("d", "1")])
+    assert index_bundle.changed_metas(old, new) == {"b", "c", "d"}
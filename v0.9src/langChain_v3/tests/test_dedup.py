@@ -0,0 +1,129 @@
+# 근사 중복 청크 제거: MinHash/LSH 판정, 전체/그룹 범위, 빠진 청크 속성 합집합, also_in / duplicates 기록
+from types import SimpleNamespace
+
+import pytest
+
+dedup = pytest.importorskip("langChain_v3.dedup")
+
+_NOTICE = "2025학년도 1학기 휴학 신청은 학사포털에서 3월 2일부터 3월 15일까지 가능하며 기간 이후에는 학과 사무실로 문의 바랍니다."
+_OTHER = "도서관 열람실은 시험 기간 동안 24시간 개방되며 좌석 예약은 모바일 앱에서만 할 수 있습니다. 외부인은 출입할 수 없습니다."
+
+
+def _meta(chunk_id, meta_id, year=2025, segment="board", source_type="html", department=""):
+    return {
+        "chunk_id": chunk_id,
+        "meta_id": meta_id,
+        "year": year,
+        "segment": segment,
+        "source_type": source_type,
+        "department": department,
+    }
+
+
+def _doc(text, **meta):
+    return SimpleNamespace(page_content=text, metadata=_meta(**meta))
+
+
+def test_find_near_duplicates_maps_copies_to_highest_priority():
+    texts = [_NOTICE, _NOTICE + " ", _OTHER, _NOTICE.replace("  ", " ")]
+    metas = [_meta(3, "a", year=2024), _meta(1, "b", year=2025), _meta(2, "c"), _meta(4, "d", year=2025)]
+    canonical = dedup.find_near_duplicates(texts, metas)
+
+    # 최신 연도, 같으면 chunk_id가 작은 청크가 대표
+    assert canonical == [1, 1, 2, 1]
+
+
+def test_find_near_duplicates_respects_groups():
+    texts = [_NOTICE, _NOTICE]
+    metas = [_meta(1, "a"), _meta(2, "b")]
+    assert dedup.find_near_duplicates(texts, metas, groups=["x", "y"]) == [0, 1]
+    assert dedup.find_near_duplicates(texts, metas, groups=["x", "x"]) == [0, 0]
+
+
+def test_dedupe_documents_records_duplicates_and_also_in():
+    docs = [
+        _doc(_NOTICE, chunk_id=1, meta_id="a"),
+        _doc(_NOTICE, chunk_id=2, meta_id="b"),
+        _doc(_NOTICE, chunk_id=3, meta_id="a"),
+        _doc(_OTHER, chunk_id=4, meta_id="c"),
+    ]
+    kept = dedup.dedupe_documents(docs)
+
+    assert [d.metadata["chunk_id"] for d in kept] == [1, 4]
+    rep = kept[0].metadata
+    assert [(d["chunk_id"], d["meta_id"]) for d in rep["duplicates"]] == [(2, "b"), (3, "a")]
+    # 같은 문서(meta_id)의 중복은 also_in에 넣지 않는다
+    assert rep["also_in"] == ["b"]
+    assert "duplicates" not in kept[1].metadata
+
+
+def _mixed_attr_copies():
+    return [
+        _doc(_NOTICE, chunk_id=1, meta_id="a", year=2025),
+        _doc(_NOTICE, chunk_id=2, meta_id="b", year=2024),
+        _doc(_NOTICE, chunk_id=3, meta_id="c", segment="file", source_type="file"),
+        _doc(_NOTICE, chunk_id=4, meta_id="d", department="컴퓨터공학과"),
+    ]
+
+
+def test_global_dedup_keeps_union_of_dropped_attributes():
+    kept = dedup.dedupe_documents(_mixed_attr_copies(), scope="global")
+    assert [d.metadata["chunk_id"] for d in kept] == [1]
+
+    rep = kept[0].metadata
+    assert {d["year"] for d in rep["duplicates"]} == {2024, 2025}
+    assert {d["source_type"] for d in rep["duplicates"]} == {"html", "file"}
+    assert {d["department"] for d in rep["duplicates"]} == {"", "컴퓨터공학과"}
+    # 대표는 빠진 청크의 세그먼트 샤드에도 들어간다
+    assert rep["segments"] == ["board", "file"]
+
+
+def test_group_scope_keeps_copies_with_different_filter_attributes():
+    kept = dedup.dedupe_documents(_mixed_attr_copies(), scope="group")
+    # 연도/세그먼트/학과가 다르면 각각 남아 필터와 샤드 라우팅에서 찾을 수 있다
+    assert [d.metadata["chunk_id"] for d in kept] == [1, 2, 3, 4]
+    assert all("also_in" not in d.metadata for d in kept)
+    with pytest.raises(ValueError):
+        dedup.dedupe_documents(_mixed_attr_copies(), scope="segment")
+
+
+def test_aliases_let_filters_reach_the_representative():
+    np = pytest.importorskip("numpy")
+    filters = pytest.importorskip("langChain_v3.filters")
+    kept = dedup.dedupe_documents(_mixed_attr_copies() + [_doc(_OTHER, chunk_id=5, meta_id="e", year=2023)])
+    duplicates = {d.metadata["chunk_id"]: {"duplicates": d.metadata["duplicates"]} for d in kept if "duplicates" in d.metadata}
+    chunk_ids = np.asarray([d.metadata["chunk_id"] for d in kept])
+    aliases = dedup.DuplicateAliases.from_map(duplicates, chunk_ids)
+
+    class _Ids:
+        year = np.asarray([d.metadata["year"] for d in kept], dtype="int16")
+        source_type = np.asarray([d.metadata["source_type"] for d in kept], dtype=str)
+        department = np.asarray([d.metadata["department"] for d in kept], dtype=str)
+
+    # 대표(2025/html/학과 없음)만으로는 빠지는 필터도, 빠진 중복 청크의 속성으로 통과한다
+    assert filters.filter_mask(_Ids, {"year": 2024}).tolist() == [False, False]
+    assert filters.filter_mask(_Ids, {"year": 2024}, aliases=aliases).tolist() == [True, False]
+    assert filters.filter_mask(_Ids, {"source_type": "file"}, aliases=aliases).tolist() == [True, False]
+    assert filters.filter_mask(_Ids, {"year": 2023}, aliases=aliases).tolist() == [False, True]
+    # 속성이 없는 구버전 duplicates.json이면 별칭 없음
+    assert dedup.DuplicateAliases.from_map({1: {"duplicates": [{"chunk_id": 2, "meta_id": "b"}]}}, chunk_ids) is None
+
+
+def test_duplicate_map_round_trip(tmp_path):
+    docs = dedup.dedupe_documents(
+        [_doc(_NOTICE, chunk_id=1, meta_id="a"), _doc(_NOTICE, chunk_id=2, meta_id="b")]
+    )
+    assert dedup.save_duplicate_map(str(tmp_path), docs) == 1
+    loaded = dedup.load_duplicate_map(str(tmp_path))
+    assert loaded == {
+        1: {
+            "also_in": ["b"],
+            "duplicates": [
+                {"chunk_id": 2, "meta_id": "b", "year": 2025, "source_type": "html", "department": "", "segment": "board"}
+            ],
+        }
+    }
+
+    # 중복이 없어지면 파일도 지운다
+    assert dedup.save_duplicate_map(str(tmp_path), [_doc(_OTHER, chunk_id=5, meta_id="c")]) == 0
+    assert dedup.load_duplicate_map(str(tmp_path)) == {}
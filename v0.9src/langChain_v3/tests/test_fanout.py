@@ -0,0 +1,82 @@
+# 검색 소스 fan-out: 소스별 마감 / 전체 예산 / 실패 소스 보고
+import threading
+import time
+
+import pytest
+
+fanout = pytest.importorskip("langChain_v3.fanout")
+
+
+def _sleep(seconds, value):
+    def fn():
+        time.sleep(seconds)
+        return value
+
+    return fn
+
+
+def test_late_source_is_dropped_at_its_deadline():
+    executor = fanout.FanOutExecutor(max_workers=4)
+    started = time.monotonic()
+    out = executor.run(
+        {"fast": _sleep(0.0, "f"), "slow": _sleep(1.0, "s")},
+        deadlines_ms={"slow": 100},
+        budget_ms=5000,
+    )
+    elapsed = time.monotonic() - started
+
+    assert out.results == {"fast": "f"}
+    assert out.timed_out == ["slow"]
+    # 가장 느린 소스가 아니라 그 소스의 마감에서 반환
+    assert elapsed < 0.8
+    assert out.report()["timed_out_sources"] == ["slow"]
+    assert executor.stats()["timeouts"] == {"slow": 1}
+
+
+def test_budget_caps_per_source_deadline():
+    executor = fanout.FanOutExecutor(max_workers=2)
+    out = executor.run({"slow": _sleep(1.0, "s")}, deadlines_ms={"slow": 5000}, budget_ms=100)
+    assert out.timed_out == ["slow"]
+    assert out.elapsed_ms < 800
+
+
+def test_failed_source_is_reported_and_others_kept():
+    def boom():
+        raise RuntimeError("down")
+
+    executor = fanout.FanOutExecutor(max_workers=2)
+    out = executor.run({"ok": lambda: 1, "web": boom})
+    assert out.get("ok") == 1
+    assert out.get("web") is None
+    assert "RuntimeError" in out.failed["web"]
+    assert executor.stats()["failures"] == {"web": 1}
+
+
+def test_queued_task_past_deadline_is_cancelled_not_run():
+    release = threading.Event()
+    ran = []
+    executor = fanout.FanOutExecutor(max_workers=2)
+
+    def blocker():
+        release.wait(5)
+
+    def queued():
+        ran.append(True)
+
+    # 워커 2개를 막아 두면 세 번째 작업은 큐에서 대기하다 마감 시 취소된다
+    out = executor.run(
+        {"a": blocker, "b": blocker, "c": queued},
+        deadlines_ms={"a": 100, "b": 100, "c": 100},
+    )
+    release.set()
+    assert sorted(out.timed_out) == ["a", "b", "c"]
+    assert executor.stats()["abandoned"] == 2
+    time.sleep(0.05)
+    assert ran == []
+
+
+def test_named_executor_uses_its_own_threads():
+    executor = fanout.FanOutExecutor(max_workers=2, name="shard-fanout")
+    out = executor.run({"t": lambda: threading.current_thread().name})
+    assert out.get("t").startswith("shard-fanout")
+    assert executor.stats()["name"] == "shard-fanout"
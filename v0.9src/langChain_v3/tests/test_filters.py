@@ -0,0 +1,81 @@
+# 필터 추출 / 마스크 / 인덱스 타입별 필터 검색 (selector 또는 사후 필터)
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("faiss")
+filters = pytest.importorskip("langChain_v3.filters")
+index_factory = pytest.importorskip("langChain_v3.index_factory")
+
+
+class _Ids:
+    def __init__(self, year, source_type, department):
+        self.year = np.asarray(year, dtype="int16")
+        self.source_type = np.asarray(source_type, dtype=str)
+        self.department = np.asarray(department, dtype=str)
+
+
+def test_extract_query_filters():
+    assert filters.extract_query_filters("2025 교육과정") == {"year": 2025}
+    assert filters.extract_query_filters("휴학원 양식 어디서 받나요")["source_type"] == "file"
+    assert filters.extract_query_filters("24학년도 컴퓨터공학과 졸업요건") == {"year": 2024, "department": "컴퓨터공학과"}
+    # 전공 제도 용어는 학과명이 아님
+    assert "department" not in filters.extract_query_filters("복수전공 신청")
+
+
+def test_filter_mask_keeps_common_documents():
+    ids = _Ids([2024, 2025, 0, 2025], ["html", "file", "html", "html"], ["", "경영학과", "", "컴퓨터공학과"])
+    assert filters.filter_mask(ids, {}) is None
+    assert filters.filter_mask(ids, {"year": 2025}).tolist() == [False, True, True, True]
+    assert filters.filter_mask(ids, {"source_type": "file"}).tolist() == [False, True, False, False]
+    assert filters.filter_mask(ids, {"year": 2025, "department": "컴퓨터공학과"}).tolist() == [False, False, True, True]
+
+
+def _vectors(n=600, d=16, seed=0):
+    v = np.random.default_rng(seed).normal(size=(n, d)).astype("float32")
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+
+_BUILT = {}
+
+
+def _index(index_type, compression):
+    """같은 factory 문자열(ivf_pq는 compression 무시)은 한 번만 학습 (PQ 학습이 느림)."""
+    factory, _ = index_factory.factory_string(index_type, 16, 600, nlist=8, compression=compression)
+    if factory not in _BUILT:
+        index, _ = index_factory.build_faiss_index(_vectors(), index_type, compression=compression, nlist=8)
+        index_factory.apply_search_params(index, {"nprobe": 8, "efSearch": 64})
+        _BUILT[factory] = index
+    return _BUILT[factory]
+
+
+@pytest.mark.parametrize("index_type", index_factory.INDEX_TYPES)
+@pytest.mark.parametrize("compression", index_factory.COMPRESSIONS)
+def test_filtered_search_every_index_type(index_type, compression):
+    vectors = _vectors()
+    index = _index(index_type, compression)
+    mask = np.zeros(len(vectors), dtype=bool)
+    mask[::5] = True
+
+    D, I = filters.filtered_search(index, vectors[:4], 10, mask)
+    assert I.shape == (4, 10)
+    found = I[I >= 0]
+    assert found.size > 0
+    assert mask[found].all()
+
+
+def test_post_filter_grows_until_enough_candidates():
+    vectors = _vectors(n=500)
+    index, _ = index_factory.build_faiss_index(vectors, "flat")
+    mask = np.zeros(len(vectors), dtype=bool)
+    mask[[7, 123, 499]] = True  # 아주 좁은 필터: overfetch 배수로는 부족
+
+    D, I = filters.search_post_filtered(index, vectors[:2], 5, mask, overfetch=1)
+    for row in I:
+        assert sorted(row[row >= 0].tolist()) == [7, 123, 499]
+        assert (row[3:] == -1).all()
+
+
+def test_index_pq_uses_post_filter():
+    assert not filters.supports_selector(_index("flat", "pq"))
+    assert filters.supports_selector(_index("flat", "none"))
+    assert filters.supports_selector(_index("ivf_pq", "pq"))
@@ -0,0 +1,142 @@
+# mmap Flat 검색 (필터 부분집합 블록 검색) / IdStore 컬럼
+import pytest
+
+np = pytest.importorskip("numpy")
+faiss = pytest.importorskip("faiss")
+index_bundle = pytest.importorskip("langChain_v3.index_bundle")
+
+
+@pytest.fixture
+def mmap_vectors(tmp_path):
+    v = np.random.default_rng(0).normal(size=(1000, 16)).astype("float32")
+    path = tmp_path / "vectors.npy"
+    np.save(path, v)
+    return np.load(path, mmap_mode="r")
+
+
+def _exact_subset(vectors, queries, k, ids):
+    d = faiss.pairwise_distances(queries, np.asarray(vectors)[ids])
+    order = np.argsort(d, axis=1)[:, :k]
+    return ids[order]
+
+
+@pytest.mark.parametrize("density", [0.05, 0.6, 1.0])
+def test_search_subset_matches_exact(mmap_vectors, density):
+    index = index_bundle.MmapFlatIndex(mmap_vectors)
+    index.SUBSET_BLOCK_ROWS = 128  # 여러 블록 + 희소/밀집 블록 경로를 모두 타도록
+    rng = np.random.default_rng(1)
+    ids = np.flatnonzero(rng.random(1000) < density)
+    queries = rng.normal(size=(4, 16)).astype("float32")
+
+    D, I = index.search_subset(queries, 10, ids)
+    assert I.shape == (4, 10)
+    assert np.isin(I, ids).all()
+    assert (I == _exact_subset(mmap_vectors, queries, 10, ids)).all()
+    assert np.all(np.diff(D, axis=1) >= 0)
+
+
+def test_search_subset_pads_when_fewer_rows_than_k(mmap_vectors):
+    index = index_bundle.MmapFlatIndex(mmap_vectors)
+    ids = np.asarray([3, 500, 999])
+    D, I = index.search_subset(np.asarray(mmap_vectors[:1]), 5, ids)
+    assert sorted(I[0, :3].tolist()) == [3, 500, 999]
+    assert (I[0, 3:] == -1).all()
+
+
+
+def test_idstore_parent_index_column():
+    rows = [
+        {"chunk_id": 1, "meta_id": "a", "chunk_index": 0, "source_hash": "h", "parent_index": 0},
+        {"chunk_id": 2, "meta_id": "a", "chunk_index": 1, "source_hash": "h", "parent_index": None},
+    ]
+    ids = index_bundle.IdStore.from_rows(rows)
+    assert ids.row(0)["parent_index"] == 0
+    assert ids.row(1)["parent_index"] is None
+
+
+def _rows(n):
+    return [
+        {
+            "chunk_id": 100 + i,
+            "meta_id": f"m{i // 2}",
+            "chunk_index": i % 2,
+            "source_hash": f"h{i}",
+            "year": 2020 + i % 3,
+            "source_type": "board" if i % 2 else "file",
+            "department": "컴퓨터학부",
+            "parent_index": i // 2 if i % 3 else None,
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_bundle_round_trip_keeps_idstore_rows(tmp_path, mmap):
+    vectors = np.random.default_rng(2).normal(size=(6, 8)).astype("float32")
+    index = faiss.IndexFlatL2(8)
+    index.add(vectors)
+    ids = index_bundle.IdStore.from_rows(_rows(6))
+    np.save(tmp_path / "vectors.npy", vectors)
+    index_bundle.save_index_bundle(str(tmp_path), index, ids, extra={"factory": "Flat"})
+
+    loaded, loaded_ids, manifest = index_bundle.load_index_bundle(str(tmp_path), mmap=mmap)
+    assert loaded.ntotal == 6 and manifest["mmap"] is mmap
+    assert [loaded_ids.row(i) for i in range(6)] == [ids.row(i) for i in range(6)]
+    assert set(manifest["columns"]) >= {"chunk_id", "year", "source_type", "department", "parent_index"}
+
+
+def test_side_files_written_before_manifest_and_listed(tmp_path):
+    index = faiss.IndexFlatL2(4)
+    index.add(np.zeros((2, 4), dtype="float32"))
+    ids = index_bundle.IdStore.from_rows(_rows(2))
+    manifest_path = tmp_path / index_bundle.MANIFEST_FILE
+    manifest_path.write_text("{}")
+    seen = []
+
+    def write_params():
+        seen.append(manifest_path.exists())
+        (tmp_path / "index_params.json").write_text('{"nprobe": 1}')
+
+    manifest = index_bundle.save_index_bundle(
+        str(tmp_path),
+        index,
+        ids,
+        side_files={"index_params.json": write_params, "duplicates.json": lambda: None},
+    )
+    # 부가 파일을 쓰는 동안 manifest는 없다 (이전 빌드의 manifest도 먼저 지워짐)
+    assert seen == [False]
+    assert manifest["files"]["index_params.json"]["size"] == len('{"nprobe": 1}')
+    assert "duplicates.json" not in manifest["files"]
+    assert index_bundle.INDEX_FILE in manifest["files"] and "chunk_id.npy" in manifest["files"]
+
+
+def test_build_lists_side_files_and_loader_rejects_torn_bundle(tmp_path):
+    vectorstore = pytest.importorskip("langChain_v3.vectorstore")
+    from types import SimpleNamespace
+
+    vectors = np.random.default_rng(3).normal(size=(6, 8)).astype("float32")
+    documents = [SimpleNamespace(metadata=row) for row in _rows(6)]
+    documents[0].metadata["duplicates"] = [{"chunk_id": 999, "meta_id": "dup"}]
+    vectorstore._save_index_dir(
+        str(tmp_path),
+        documents,
+        vectors,
+        index_type="flat",
+        nlist=None,
+        nprobe=None,
+        ef_search=None,
+        compression="none",
+        rescore=None,
+        refine_factor=1,
+        report=False,
+    )
+    _, _, manifest = index_bundle.load_index_bundle(str(tmp_path), mmap=True)
+    assert {"vectors.npy", "duplicates.json", "index_params.json"} <= set(manifest["files"])
+
+    # manifest 이후에 부가 파일이 바뀌면(다음 빌드가 쓰는 중) 불완전한 번들로 거부
+    (tmp_path / "index_params.json").write_text("{}")
+    with pytest.raises(ValueError):
+        index_bundle.load_index_bundle(str(tmp_path), mmap=True)
+    (tmp_path / "vectors.npy").unlink()
+    with pytest.raises(ValueError):
+        index_bundle.load_index_bundle(str(tmp_path), mmap=False)
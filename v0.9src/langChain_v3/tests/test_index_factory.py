@@ -0,0 +1,88 @@
+# 인덱스 생성 / 압축 재채점 / 압축 메모리 리포트
+import pytest
+
+np = pytest.importorskip("numpy")
+faiss = pytest.importorskip("faiss")
+index_factory = pytest.importorskip("langChain_v3.index_factory")
+
+
+def _vectors(n=600, d=32, seed=0):
+    v = np.random.default_rng(seed).normal(size=(n, d)).astype("float32")
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+
+def test_rescore_candidates_matches_exact_order():
+    vectors = _vectors()
+    queries = vectors[:5]
+    candidates = np.tile(np.arange(50), (5, 1))
+    candidates[:, -1] = -1
+    d, i = index_factory.rescore_candidates(vectors, queries, candidates, k=3)
+    assert i.shape == (5, 3)
+    # 자기 자신(거리 0)이 후보에 있으면 1등
+    assert (i[:, 0] == np.arange(5)).all()
+    assert np.all(np.diff(d, axis=1) >= 0)
+
+
+def test_compression_report_counts_resident_not_mmapped_vectors():
+    vectors = _vectors()
+    index, info = index_factory.build_faiss_index(vectors, "flat", compression="sq8")
+    with_rescore = index_factory.compression_report(index, vectors, info, rescore=True, n_queries=20)
+    without = index_factory.compression_report(index, vectors, info, rescore=False, n_queries=20)
+
+    flat = vectors.shape[0] * vectors.shape[1] * 4
+    # vectors.npy는 디스크에만 있고 (mmap) 상주 메모리는 인덱스뿐
+    assert with_rescore["resident_bytes"] == with_rescore["index_bytes"]
+    assert with_rescore["rescore_vectors_disk_bytes"] == flat
+    assert with_rescore["disk_bytes"] == with_rescore["index_bytes"] + flat
+    assert with_rescore["memory_reduction"] > 1.0 > with_rescore["disk_reduction"]
+    # 질의당 읽는 페이지는 후보 k*refine_factor 행 분량 이내
+    assert 0 < with_rescore["rescore_touched_bytes_per_query"] <= 10 * 4 * 2 * 4096
+    assert without["rescore_touched_bytes_per_query"] == 0
+    assert without["memory_reduction"] == without["disk_reduction"] > 1.0
+
+
+def test_rescore_defaults_on_only_for_pq():
+    assert index_factory.default_rescore("pq")
+    assert not index_factory.default_rescore("sq8")
+    assert not index_factory.default_rescore("fp16")
+    assert not index_factory.default_rescore("none")
+    vectors = _vectors()
+    index, info = index_factory.build_faiss_index(vectors, "flat", compression="fp16")
+    assert not index_factory.compression_report(index, vectors, info, n_queries=5)["rescore"]
+
+
+def test_default_search_params_by_type():
+    assert index_factory.default_search_params({"index_type": "flat"}) == {}
+    assert index_factory.default_search_params({"index_type": "ivf_flat", "nlist": 256}) == {"nprobe": 16}
+    assert index_factory.default_search_params({"index_type": "ivf_pq", "nlist": 4}) == {"nprobe": 4}
+    assert index_factory.default_search_params({"index_type": "hnsw"}) == {"efSearch": 64}
+
+
+def test_apply_search_params_sets_nprobe_and_ef_search():
+    vectors = _vectors()
+    ivf, _ = index_factory.build_faiss_index(vectors, "ivf_flat", nlist=8)
+    index_factory.apply_search_params(ivf, {"nprobe": 5})
+    assert faiss.extract_index_ivf(ivf).nprobe == 5
+
+    hnsw, _ = index_factory.build_faiss_index(vectors, "hnsw", hnsw_m=8)
+    index_factory.apply_search_params(hnsw, {"efSearch": 77})
+    assert faiss.downcast_index(hnsw).hnsw.efSearch == 77
+
+    # 해당 없는 파라미터는 조용히 무시
+    flat, _ = index_factory.build_faiss_index(vectors, "flat")
+    index_factory.apply_search_params(flat, {"nprobe": 5, "efSearch": 77})
+
+
+def test_load_index_applies_saved_search_params(tmp_path):
+    vectorstore = pytest.importorskip("langChain_v3.vectorstore")
+    index_bundle = pytest.importorskip("langChain_v3.index_bundle")
+    vectors = _vectors()
+    index, info = index_factory.build_faiss_index(vectors, "ivf_flat", nlist=8)
+    ids = index_bundle.IdStore.from_rows(
+        [{"chunk_id": i, "meta_id": f"m{i}", "chunk_index": 0, "source_hash": "h"} for i in range(len(vectors))]
+    )
+    index_bundle.save_index_bundle(str(tmp_path), index, ids, extra={"factory": info["factory"]})
+    index_factory.save_index_params(str(tmp_path), {**info, "nprobe": 6})
+
+    loaded, _, _ = vectorstore.load_index(index_dir=str(tmp_path), mmap=False)
+    assert faiss.extract_index_ivf(loaded).nprobe == 6
@@ -0,0 +1,105 @@
+# BM25 토크나이저 / 역색인 검색 / RRF 융합
+import pytest
+
+lexical_index = pytest.importorskip("langChain_v3.lexical_index")
+
+
+def _hit(chunk_id, **extra):
+    return {"chunk_id": chunk_id, **extra}
+
+
+def test_tokenize_hangul_bigrams_and_alnum_runs():
+    assert lexical_index.tokenize("휴학원 CSE1010") == ["휴학", "학원", "cse1010"]
+    assert lexical_index.tokenize("학 과") == ["학", "과"]
+    assert lexical_index.tokenize("") == []
+
+
+def test_rrf_sums_reciprocal_ranks_across_lists():
+    dense = [_hit(1), _hit(2), _hit(3)]
+    lexical = [_hit(3), _hit(4)]
+    fused = lexical_index.reciprocal_rank_fusion([dense, lexical], k=60)
+
+    scores = {h["chunk_id"]: h["rrf_score"] for h in fused}
+    assert scores[3] == pytest.approx(1 / 63 + 1 / 61)
+    assert scores[1] == pytest.approx(1 / 61)
+    assert scores[4] == pytest.approx(1 / 62)
+    # 두 리스트에 모두 나온 3번이 1위, 동점이 아닌 나머지는 순위 점수 순
+    assert [h["chunk_id"] for h in fused] == [3, 1, 2, 4]
+
+
+def test_rrf_merges_fields_and_keeps_first_list_values():
+    dense = [_hit(1, score=0.9, source="dense")]
+    lexical = [_hit(1, bm25_score=3.5, source="lexical")]
+    fused = lexical_index.reciprocal_rank_fusion([dense, lexical])
+    assert len(fused) == 1
+    assert fused[0]["score"] == 0.9
+    assert fused[0]["bm25_score"] == 3.5
+    assert fused[0]["source"] == "dense"
+    # 입력 hit dict는 건드리지 않는다
+    assert "rrf_score" not in dense[0]
+
+
+def test_rrf_top_n_and_empty_rankings():
+    fused = lexical_index.reciprocal_rank_fusion([[_hit(i) for i in range(10)]], top_n=3)
+    assert [h["chunk_id"] for h in fused] == [0, 1, 2]
+    assert lexical_index.reciprocal_rank_fusion([[], []]) == []
+
+
+def _row(chunk_id, meta_id, text, chunk_index=0):
+    return {
+        "chunk_id": chunk_id,
+        "meta_id": meta_id,
+        "chunk_index": chunk_index,
+        "source_hash": f"h-{meta_id}",
+        "text": text,
+        "title": "",
+        "file_path": "",
+    }
+
+
+def test_bm25_search_ranks_exact_term_matches(tmp_path):
+    index = lexical_index.LexicalIndex(str(tmp_path / "lex.sqlite"))
+    conn = index._conn()
+    with conn:
+        index._add_rows(
+            conn,
+            [
+                _row(1, "m1", "휴학원 제출 방법 안내"),
+                _row(2, "m2", "복학원 제출 기간"),
+                _row(3, "m3", "CSE1010 프로그래밍 기초 강의계획서"),
+            ],
+        )
+
+    hits = index.search("휴학원", k=3)
+    assert hits[0]["chunk_id"] == 1
+    assert hits[0]["meta_id"] == "m1"
+    assert index.search("cse1010", k=3)[0]["chunk_id"] == 3
+    assert index.search("존재하지않는말", k=3) == []
+
+    # 문서 제거 시 df도 같이 줄어 term이 정리된다
+    with conn:
+        index._remove_metas(conn, ["m1"])
+        conn.execute("DELETE FROM terms WHERE df <= 0")
+    assert all(h["chunk_id"] != 1 for h in index.search("휴학원", k=3))
+    assert index.stats()["docs"] == 2
+
+
+def test_common_terms_skipped_and_postings_bounded(tmp_path):
+    index = lexical_index.LexicalIndex(str(tmp_path / "lex.sqlite"), max_df_ratio=0.2, max_postings=30)
+    conn = index._conn()
+    # "안내"는 모든 문서에, "학사"는 절반에, "휴학원"은 한 문서에만
+    rows = [_row(i, f"m{i}", "학사 안내" if i % 2 else "안내 사항") for i in range(100)]
+    rows.append(_row(100, "m100", "휴학원 안내"))
+    with conn:
+        index._add_rows(conn, rows)
+
+    hits = index.search("휴학원 학사 안내", k=5)
+    assert hits[0]["chunk_id"] == 100
+    # 흔한 "안내"(101건), "학사"(50건)의 posting은 읽지 않는다
+    assert index.stats()["postings_scanned"] <= 30
+    assert index.stats()["terms_skipped"] == 2
+
+    # 흔한 말뿐인 질의도 가장 드문 term 하나로 결과를 내되, 그 posting도 상한까지만 읽는다
+    before = index.postings_scanned
+    assert index.search("학사 안내", k=5)
+    assert index.postings_scanned - before == 30
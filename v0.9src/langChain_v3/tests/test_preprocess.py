@@ -0,0 +1,51 @@
+# 청킹 오프셋 / 부모 블록(small-to-big) 구간 계산
+import pytest
+
+preprocess = pytest.importorskip("langChain_v3.preprocess")
+
+_TEXT = "\n\n".join(
+    f"제{i}조 휴학은 학기 개시일 전까지 신청한다. 군 입대 휴학은 입영일 전까지 증빙 서류와 함께 제출한다." for i in range(1, 41)
+)
+
+
+def test_chunk_offsets_point_at_chunk_text():
+    chunks = preprocess.chunk_text_with_offsets(_TEXT, chunk_size=60, overlap=10)
+    assert len(chunks) > 3
+    starts = [start for _, start, _ in chunks]
+    assert starts == sorted(starts)
+    for chunk, start, end in chunks:
+        assert _TEXT[start:end] == chunk
+
+
+def test_parent_blocks_cover_children_in_order():
+    chunks = preprocess.chunk_text_with_offsets(_TEXT, chunk_size=60, overlap=10)
+    parents = preprocess.group_parent_blocks(_TEXT, chunks, parent_size=200)
+
+    assert len(parents) > 1
+    members = [pos for _, _, _, children in parents for pos in children]
+    # 모든 자식이 정확히 한 부모에 원문 순서대로 들어간다
+    assert members == list(range(len(chunks)))
+
+    for parent_text, start, end, children in parents:
+        assert parent_text == _TEXT[start:end]
+        assert start == chunks[children[0]][1]
+        assert end == max(chunks[pos][2] for pos in children)
+        # 자식은 부모 경계를 넘지 않는다
+        for pos in children:
+            _, c_start, c_end = chunks[pos]
+            assert start <= c_start and c_end <= end
+        # 자식이 둘 이상이면 부모 길이는 parent_size 토큰 이하
+        if len(children) > 1:
+            assert preprocess.token_len(parent_text) <= 200
+
+
+def test_child_without_offsets_becomes_its_own_parent():
+    chunks = [("가나다", 0, 3), ("변형된 청크", None, None), ("라마", 3, 5)]
+    parents = preprocess.group_parent_blocks("가나다라마", chunks, parent_size=1200)
+    assert parents == [("가나다", 0, 3, [0]), ("변형된 청크", None, None, [1]), ("라마", 3, 5, [2])]
+
+
+def test_single_oversized_child_still_gets_a_parent():
+    chunks = [("가나다라마", 0, 5), ("바사", 5, 7)]
+    parents = preprocess.group_parent_blocks("가나다라마바사", chunks, parent_size=1)
+    assert [p[3] for p in parents] == [[0], [1]]
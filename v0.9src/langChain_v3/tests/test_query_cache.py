@@ -0,0 +1,58 @@
+# 질의 임베딩 캐시: 정규화 키 / 배치 임베딩 시 miss만 계산 / 모델 ID가 다른 저장본 무시
+import pytest
+
+query_cache = pytest.importorskip("langChain_v3.query_cache")
+
+
+class FakeModel:
+    def __init__(self, model_name="ko-sbert"):
+        self.model_name = model_name
+        self.embedded = []
+
+    def embed_query(self, text):
+        self.embedded.append(text)
+        return [float(len(text)), 1.0]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+
+def test_normalize_query():
+    assert query_cache.normalize_query("휴학  신청 기간?") == query_cache.normalize_query("휴학 신청 기간")
+    assert query_cache.normalize_query("ＣＳＥ１０１０ 강의!!") == "cse1010 강의"
+
+
+def test_equivalent_questions_hit_the_cache():
+    base = FakeModel()
+    cache = query_cache.CachedQueryEmbeddings(base, max_size=10)
+    first = cache.embed_query("휴학 신청 기간?")
+    assert cache.embed_query("휴학  신청 기간") == first
+    assert len(base.embedded) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_embed_queries_only_embeds_misses_once():
+    base = FakeModel()
+    cache = query_cache.CachedQueryEmbeddings(base, max_size=10)
+    cache.embed_query("복학")
+    out = cache.embed_queries(["복학", "졸업 요건", "졸업 요건?"])
+    assert base.embedded == ["복학", "졸업 요건"]
+    assert out[1] == out[2]
+
+
+def test_saved_cache_is_keyed_by_model_id(tmp_path, monkeypatch):
+    monkeypatch.setenv("EMBEDDINGS_MODE", "ko")
+    path = str(tmp_path / "qcache.json")
+    cache = query_cache.CachedQueryEmbeddings(FakeModel("ko-sbert"), max_size=10)
+    cache.embed_query("휴학")
+    cache.save(path)
+
+    same = query_cache.CachedQueryEmbeddings(FakeModel("ko-sbert"), max_size=10)
+    assert same.load(path) == 1
+    other = query_cache.CachedQueryEmbeddings(FakeModel("e5-large"), max_size=10)
+    assert other.model_id != cache.model_id
+    assert other.load(path) == 0
+
+    monkeypatch.setenv("EMBEDDINGS_MODE", "e5")
+    other_mode = query_cache.CachedQueryEmbeddings(FakeModel("ko-sbert"), max_size=10)
+    assert other_mode.load(path) == 0
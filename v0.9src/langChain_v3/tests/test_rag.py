@@ -0,0 +1,67 @@
+# 검색 결과 후처리: 같은 부모 블록의 자식 hit 합치기 / 1단계 overfetch / 부모 문맥 캐싱
+import pytest
+
+rag = pytest.importorskip("langChain_v3.RAGLLM.rag")
+
+
+def _hit(chunk_id, meta_id, parent_index, **extra):
+    return {"chunk_id": chunk_id, "meta_id": meta_id, "chunk_index": chunk_id, "parent_index": parent_index, **extra}
+
+
+def test_collapse_keeps_best_ranked_child_per_parent(monkeypatch):
+    monkeypatch.setattr(rag, "PARENT_CONTEXT_ENABLED", True)
+    hits = [
+        _hit(1, "a", 0),
+        _hit(2, "a", 0),  # 1과 같은 부모 → 제거
+        _hit(3, "a", 1),
+        _hit(4, "b", 0),  # 다른 문서의 같은 번호 부모는 별개
+        _hit(5, "a", None),  # 부모 없음(창 확장) → 그대로
+        _hit(6, "a", None),
+    ]
+    assert [h["chunk_id"] for h in rag.collapse_siblings(hits)] == [1, 3, 4, 5, 6]
+
+
+def test_collapse_applies_to_results_resolved_after_fusion(monkeypatch):
+    # BM25 hit는 parent_index를 모른 채 들어오고, build_search_results가 부모를 붙인 결과에서 합쳐진다
+    monkeypatch.setattr(rag, "PARENT_CONTEXT_ENABLED", True)
+    results = [
+        _hit(10, "a", 2, context_type="parent", rrf_score=0.03),
+        _hit(11, "a", 2, context_type="parent", rrf_score=0.02),
+        _hit(12, "b", None, context_type="window", rrf_score=0.01),
+    ]
+    assert [r["chunk_id"] for r in rag.collapse_siblings(results)] == [10, 12]
+
+
+def test_overfetch_only_when_collapsing(monkeypatch):
+    monkeypatch.setattr(rag, "PARENT_CONTEXT_ENABLED", True)
+    assert rag._fetch_k(5) == 10
+    assert rag._fetch_k(5, collapse=False) == 5
+    monkeypatch.setattr(rag, "PARENT_CONTEXT_ENABLED", False)
+    assert rag._fetch_k(5) == 5
+    hits = [_hit(1, "a", 0), _hit(2, "a", 0)]
+    assert rag.collapse_siblings(hits) == hits
+
+
+def test_missing_parent_is_cached_as_negative_entry(monkeypatch):
+    context_cache = pytest.importorskip("langChain_v3.context_cache")
+    monkeypatch.setattr(rag, "PARENT_CONTEXT_ENABLED", True)
+    calls = []
+
+    def fake_fetch(missing):
+        calls.append(sorted(missing))
+        row = {"title": "t", "url": "u", "parent_text": "부모 본문", "chunk_text": "본문", "parent_index": 0}
+        return {chunk_id: row for chunk_id in missing if chunk_id == 1}
+
+    monkeypatch.setattr(rag, "fetch_parent_contexts", fake_fetch)
+    cache = context_cache.ContextWindowCache(1 << 20)
+    hits = [_hit(1, "a", 0, source_hash="h"), {"chunk_id": 2, "meta_id": "b", "chunk_index": 2, "source_hash": "h"}]
+
+    first = rag._parent_contexts(hits, cache)
+    second = rag._parent_contexts(hits, cache)
+    # 부모가 없던 chunk 2도 캐시에서 판정 → 두 번째 요청은 DB 조회 없음
+    assert calls == [[1, 2]]
+    assert set(first) == set(second) == {1}
+
+    # 문서가 재청킹되면(source_hash 변경) 음성 항목도 버리고 다시 조회한다
+    rag._parent_contexts([{"chunk_id": 2, "meta_id": "b", "chunk_index": 2, "source_hash": "h2"}], cache)
+    assert calls[-1] == [2]
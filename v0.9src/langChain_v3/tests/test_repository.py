@@ -0,0 +1,108 @@
+# repository의 DB 없이 검증 가능한 부분 (원문 span 계산 / 원문 수정 감지)
+import pytest
+
+repository = pytest.importorskip("langChain_v3.repository")
+
+
+def _rows(text, spans):
+    return [
+        {"chunk_index": i, "text": text[s:e], "start_offset": s, "end_offset": e}
+        for i, (s, e) in enumerate(spans)
+    ]
+
+
+def test_window_span_covers_all_chunks():
+    rows = _rows("0123456789abcdef", [(0, 6), (4, 10), (8, 14)])
+    assert repository.window_span(rows) == (0, 14)
+
+
+def test_window_span_none_for_legacy_chunks():
+    rows = _rows("0123456789", [(0, 5)])
+    rows.append({"chunk_index": 1, "text": "56789", "start_offset": None, "end_offset": None})
+    assert repository.window_span(rows) is None
+
+
+def test_span_matches_unchanged_source():
+    text = "휴학 신청은 학기 개시 전까지 가능합니다. 복학은 별도 신청."
+    rows = _rows(text, [(0, 12), (8, 24), (20, len(text))])
+    start, end = repository.window_span(rows)
+    assert repository.span_matches_chunks(text[start:end], start, rows)
+
+
+def test_span_detects_edited_source():
+    text = "휴학 신청은 학기 개시 전까지 가능합니다. 복학은 별도 신청."
+    rows = _rows(text, [(0, 12), (8, 24), (20, len(text))])
+    edited = "[공지] " + text
+    start, end = repository.window_span(rows)
+    assert not repository.span_matches_chunks(edited[start:end], start, rows)
+
+
+class FakeCursor:
+    """SQL 종류별로 메모리 테이블에서 응답하는 가짜 DB 커서 (실행한 SQL 수를 센다)."""
+
+    def __init__(self, texts, chunk_spans):
+        self.texts = texts
+        self.chunks = {
+            meta_id: [
+                {"meta_id": meta_id, "chunk_index": i, "text": texts[meta_id][s:e], "start_offset": s, "end_offset": e}
+                for i, (s, e) in enumerate(spans)
+            ]
+            for meta_id, spans in chunk_spans.items()
+        }
+        self.queries = []
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        self.queries.append(sql)
+        if "FROM metadata" in sql:
+            self._rows = [{"meta_id": m, "title": f"title-{m}", "url": f"url-{m}"} for m in params if m in self.texts]
+        elif "FROM chunks" in sql:
+            conds = list(zip(params[0::3], params[1::3], params[2::3]))
+            self._rows = [
+                row
+                for meta_id in sorted(self.chunks)
+                for row in self.chunks[meta_id]
+                if any(m == meta_id and lo <= row["chunk_index"] <= hi for m, lo, hi in conds)
+            ]
+        elif "FROM TestMain" in sql:
+            self._rows = [
+                {"pos": pos, "text": self.texts[meta_id][start - 1 : start - 1 + length]}
+                for pos, start, length, meta_id in zip(params[0::4], params[1::4], params[2::4], params[3::4])
+            ]
+        else:
+            raise AssertionError(sql)
+
+    def fetchall(self):
+        return self._rows
+
+
+def _corpus(n_docs):
+    text = "가" * 10 + "나" * 10 + "다" * 10 + "라" * 10
+    texts = {f"m{i}": text for i in range(n_docs)}
+    spans = {m: [(0, 12), (10, 22), (20, 32), (30, 40)] for m in texts}
+    return texts, spans
+
+
+@pytest.mark.parametrize("n_docs", [1, 5, 40])
+def test_fetch_hit_contexts_uses_constant_queries(n_docs):
+    texts, spans = _corpus(n_docs)
+    cur = FakeCursor(texts, spans)
+    keys = [(m, 1, 1) for m in texts] + [(m, 2, 1) for m in texts]
+    titles, windows, contexts = repository.fetch_hit_contexts(keys, cur=cur)
+
+    # hit 수와 무관하게 metadata / chunks / 원문 span 각 1회
+    assert len(cur.queries) == 3
+    assert titles["m0"] == {"title": "title-m0", "url": "url-m0"}
+    assert [r["chunk_index"] for r in windows[("m0", 1, 1)]] == [0, 1, 2, 3]
+    assert contexts[("m0", 1, 1)] == texts["m0"][0:40]
+
+
+def test_get_titles_urls_dedups_and_skips_empty():
+    texts, spans = _corpus(2)
+    cur = FakeCursor(texts, spans)
+    assert repository.get_titles_urls([], cur=cur) == {}
+    assert cur.queries == []
+
+    out = repository.get_titles_urls(["m0", "m1", "m0", None], cur=cur)
+    assert set(out) == {"m0", "m1"}
+    assert len(cur.queries) == 1
@@ -0,0 +1,32 @@
+# 리랭크 점수 캐시: 키(백엔드/양자화 구분) / sqlite spill / 문서 단위 무효화
+import pytest
+
+rerank_cache = pytest.importorskip("langChain_v3.rerank_cache")
+
+
+def test_key_separates_backend_and_quantization():
+    torch_key = rerank_cache.rerank_cache_key("휴학 신청", 1, "m", "본문")
+    onnx_key = rerank_cache.rerank_cache_key("휴학 신청", 1, "m", "본문", backend="onnx", quantization="int8")
+    onnx_fp32 = rerank_cache.rerank_cache_key("휴학 신청", 1, "m", "본문", backend="onnx", quantization="fp32")
+    assert len({torch_key, onnx_key, onnx_fp32}) == 3
+    assert torch_key[2] == rerank_cache.reranker_model_id("m")
+
+    cache = rerank_cache.RerankScoreCache(max_size=10)
+    cache.put_many([(torch_key, "meta", 0.9)])
+    assert cache.get_many([onnx_key]) == {}
+    assert cache.get_many([torch_key]) == {torch_key: 0.9}
+
+
+def test_spilled_scores_come_back_and_invalidate_by_meta(tmp_path):
+    cache = rerank_cache.RerankScoreCache(max_size=1, path=str(tmp_path / "rerank.sqlite"))
+    k1 = rerank_cache.rerank_cache_key("q", 1, "m", "a")
+    k2 = rerank_cache.rerank_cache_key("q", 2, "m", "b")
+    cache.put_many([(k1, "m1", 0.1), (k2, "m2", 0.2)])
+
+    # k1은 LRU에서 밀려 sqlite에 있다가 다시 올라온다
+    assert cache.get_many([k1]) == {k1: 0.1}
+    assert cache.stats()["disk_hits"] == 1
+
+    cache.flush()
+    cache.invalidate_metas(["m1", "m2"])
+    assert cache.get_many([k1, k2]) == {}
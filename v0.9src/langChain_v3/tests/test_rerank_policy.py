@@ -0,0 +1,54 @@
+# 적응형 리랭크 깊이: 생략 판단 / 깊이 확장·정지 / 카운터
+import pytest
+
+rerank_policy = pytest.importorskip("langChain_v3.RAGLLM.rerank_policy")
+
+
+@pytest.fixture
+def policy():
+    return rerank_policy.AdaptiveRerankPolicy(min_depth=8, growth=2, skip_gap=0.2, skip_max_dist=0.6)
+
+
+def test_skip_only_when_top1_is_close_and_clearly_ahead(policy):
+    assert policy.should_skip([0.3, 0.6, 0.7])
+    # 간격이 작으면 애매 → 리랭크
+    assert not policy.should_skip([0.3, 0.4, 0.7])
+    # 간격은 커도 top1 자체가 멀면 리랭크
+    assert not policy.should_skip([0.8, 1.2])
+    assert policy.should_skip([0.5])
+    assert not policy.should_skip([])
+
+
+def test_initial_depth_bounded_by_available(policy):
+    assert policy.initial_depth(top_n=3, available=20) == 8
+    assert policy.initial_depth(top_n=6, available=20) == 12
+    assert policy.initial_depth(top_n=3, available=5) == 5
+
+
+def test_stops_when_tail_never_reaches_top_n(policy):
+    # FAISS 순서대로 점수가 내려가면 꼬리 후보가 top_n에 못 들어옴 → 그대로 멈춤
+    scores = [9.0, 8.0, 7.0, 1.0, 0.5, 0.4, 0.3, 0.2]
+    assert policy.next_depth(scores, scored_from=0, top_n=3, available=20) == 8
+
+
+def test_grows_when_tail_enters_top_n(policy):
+    # 꼬리(뒤쪽) 후보가 top_n 안에 들어옴 → 더 아래에도 좋은 후보가 있을 수 있다
+    scores = [9.0, 8.0, 7.0, 1.0, 0.5, 0.4, 0.3, 8.5]
+    assert policy.next_depth(scores, scored_from=0, top_n=3, available=20) == 16
+    assert policy.next_depth(scores, scored_from=0, top_n=3, available=10) == 10
+    # 두 번째 단계는 방금 매긴 구간만 꼬리로 본다
+    grown = scores + [0.1] * 8
+    assert policy.next_depth(grown, scored_from=8, top_n=3, available=20) == 16
+
+
+def test_no_growth_once_every_candidate_is_scored(policy):
+    assert policy.next_depth([1.0, 9.0, 8.0], scored_from=0, top_n=1, available=3) == 3
+
+
+def test_record_counts_skip_growth_and_pairs(policy):
+    policy.record(20, 0, skipped=True)
+    policy.record(20, 16, grown=True)
+    policy.record(8, 8)
+    stats = policy.stats()
+    assert (stats["queries"], stats["skipped"], stats["grown"], stats["full_depth"]) == (3, 1, 1, 1)
+    assert stats["avg_pairs_scored"] == 8.0
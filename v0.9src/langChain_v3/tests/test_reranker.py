@@ -0,0 +1,69 @@
+# 프로세스 공용 리랭커: (모델, 디바이스, 백엔드)별 1회 로드 후 요청 간 공유
+import threading
+
+import pytest
+
+reranker = pytest.importorskip("langChain_v3.RAGLLM.reranker")
+
+
+class FakeCrossEncoder:
+    """WarmReranker 자리에 넣는 가짜 모델: 생성 횟수와 predict 입력만 기록."""
+
+    backend = "torch"
+    quantization = "fp32"
+    created = 0
+
+    def __init__(self, model_name, device):
+        type(self).created += 1
+        self.model_name = model_name
+        self.device = device
+
+    def predict(self, pairs):
+        return [float(len(t)) for _, t in pairs]
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    FakeCrossEncoder.created = 0
+    monkeypatch.setattr(reranker, "WarmReranker", FakeCrossEncoder)
+    monkeypatch.setattr(reranker, "_rerankers", {})
+    return FakeCrossEncoder
+
+
+@pytest.mark.parametrize("batched", [False, True])
+def test_same_model_is_loaded_once_and_shared(fake_models, monkeypatch, batched):
+    monkeypatch.setattr(reranker, "RERANK_MICROBATCH_ENABLED", batched)
+    got = []
+    threads = [
+        threading.Thread(target=lambda: got.append(reranker.get_reranker("m", device="cpu", backend="torch")))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+
+    assert fake_models.created == 1
+    assert all(r is got[0] for r in got)
+    assert isinstance(got[0], reranker.BatchedReranker) == batched
+    assert got[0].predict([("q", "abc"), ("q", "a")]) == [3.0, 1.0]
+
+
+def test_different_model_or_device_gets_its_own_instance(fake_models, monkeypatch):
+    monkeypatch.setattr(reranker, "RERANK_MICROBATCH_ENABLED", False)
+    a = reranker.get_reranker("m", device="cpu", backend="torch")
+    b = reranker.get_reranker("m", device="cuda", backend="torch")
+    c = reranker.get_reranker("other", device="cpu", backend="torch")
+    assert len({id(a), id(b), id(c)}) == 3
+    assert fake_models.created == 3
+
+
+def test_preload_then_report_loaded(fake_models, monkeypatch):
+    monkeypatch.setattr(reranker, "RERANK_MICROBATCH_ENABLED", True)
+    reranker.preload_rerankers(["m1", "", "m2"], device="cpu", backend="torch")
+    reranker.get_reranker("m1", device="cpu", backend="torch")
+
+    assert fake_models.created == 2
+    loaded = reranker.loaded_rerankers()
+    assert sorted(r["model_name"] for r in loaded) == ["m1", "m2"]
+    assert all(r["backend"] == "torch" and r["batching"] is not None for r in loaded)
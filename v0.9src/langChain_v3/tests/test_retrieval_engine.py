@@ -0,0 +1,158 @@
+# 프로세스 상주 검색 엔진: 엔진/임베딩 모델 재사용, 인덱스 변경 시에만 재로드
+import zlib
+
+import pytest
+
+np = pytest.importorskip("numpy")
+faiss = pytest.importorskip("faiss")
+retrieval_engine = pytest.importorskip("langChain_v3.retrieval_engine")
+index_bundle = pytest.importorskip("langChain_v3.index_bundle")
+
+DIM = 8
+
+
+class FakeEmbeddings:
+    """텍스트 해시로 고정 벡터를 만드는 임베딩 (모델 로드 없이 엔진 동작만 확인)."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+        return rng.normal(size=DIM).astype("float32").tolist()
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+
+def _write_bundle(index_dir, texts, offset=0):
+    emb = FakeEmbeddings()
+    vectors = np.asarray(emb.embed_documents(texts), dtype="float32")
+    index = faiss.IndexFlatL2(DIM)
+    index.add(vectors)
+    rows = [
+        {"chunk_id": offset + i, "meta_id": f"m{offset + i}", "chunk_index": 0, "source_hash": "h"}
+        for i in range(len(texts))
+    ]
+    index_bundle.save_index_bundle(str(index_dir), index, index_bundle.IdStore.from_rows(rows))
+
+
+@pytest.fixture
+def engine_dir(tmp_path):
+    _write_bundle(tmp_path, ["휴학 신청", "복학 신청", "장학금 안내", "수강 정정"])
+    return tmp_path
+
+
+def test_engine_is_shared_per_index_dir(engine_dir):
+    a = retrieval_engine.get_retrieval_engine(str(engine_dir), embeddings=FakeEmbeddings())
+    b = retrieval_engine.get_retrieval_engine(str(engine_dir) + "/")
+    assert a is b
+
+
+def test_embedding_model_loaded_once(engine_dir, monkeypatch):
+    loads = []
+
+    def fake_load():
+        loads.append(1)
+        return FakeEmbeddings()
+
+    monkeypatch.setattr(retrieval_engine, "load_embedding_model", fake_load)
+    engine = retrieval_engine.RetrievalEngine(str(engine_dir))
+    first = engine.search("휴학 신청", k=1)
+    engine.search("복학 신청", k=1)
+    engine.search("휴학 신청", k=2)
+
+    assert len(loads) == 1
+    assert first[0]["chunk_id"] == 0
+    assert first[0]["meta_id"] == "m0"
+
+
+def test_reload_only_when_index_files_change(engine_dir):
+    engine = retrieval_engine.RetrievalEngine(str(engine_dir), embeddings=FakeEmbeddings()).load()
+    version = engine.version
+    assert engine.reload_if_changed() is False
+    assert engine.version == version
+
+    _write_bundle(engine_dir, ["학위 수여", "졸업 요건"], offset=100)
+    assert engine.reload_if_changed() is True
+    assert engine.version != version
+    assert engine.info()["ntotal"] == 2
+    assert engine.search("학위 수여", k=1)[0]["chunk_id"] == 100
+
+
+def _batched_engine(engine_dir, embeddings):
+    engine = retrieval_engine.RetrievalEngine(str(engine_dir), embeddings=embeddings)
+    if engine._batcher is None:
+        pytest.skip("RETRIEVAL_MICROBATCH_ENABLED=0")
+    engine._batcher.max_wait = 0.3  # 동시 요청이 한 배치로 묶이도록
+    return engine.load()
+
+
+def _search_concurrently(engine, requests):
+    import threading
+
+    results = [None] * len(requests)
+
+    def run(i, query, k):
+        try:
+            results[i] = engine.search(query, k=k)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i, q, k)) for i, (q, k) in enumerate(requests)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    return results
+
+
+def test_batched_results_match_single_searches(engine_dir):
+    engine = _batched_engine(engine_dir, FakeEmbeddings())
+    requests = [("휴학 신청", 1), ("장학금 안내", 3), ("수강 정정", 2), ("복학 신청", 4)]
+    batched = _search_concurrently(engine, requests)
+    assert engine._batcher.stats()["batches"] == 1
+
+    engine._batcher = None
+    singles = [engine.search(q, k=k) for q, k in requests]
+    assert batched == singles
+    assert [len(hits) for hits in batched] == [1, 3, 2, 4]
+
+
+class FailingEmbeddings(FakeEmbeddings):
+    def embed_query(self, text):
+        if text == "bad":
+            raise ValueError("embedding failed")
+        return super().embed_query(text)
+
+
+def test_failing_query_does_not_fail_its_batchmates(engine_dir):
+    engine = _batched_engine(engine_dir, FailingEmbeddings())
+    results = _search_concurrently(engine, [("휴학 신청", 1), ("bad", 1), ("복학 신청", 1)])
+
+    assert isinstance(results[1], ValueError)
+    assert results[0][0]["chunk_id"] == 0
+    assert results[2][0]["chunk_id"] == 1
+    assert engine._batcher.stats()["batches"] == 1
+
+
+def test_filter_matches_attributes_of_deduplicated_copies(tmp_path):
+    import json
+
+    emb = FakeEmbeddings()
+    texts = ["휴학 신청 안내", "장학금 안내"]
+    index = faiss.IndexFlatL2(DIM)
+    index.add(np.asarray(emb.embed_documents(texts), dtype="float32"))
+    attrs = {"year": 2025, "source_type": "html", "department": ""}
+    rows = [{"chunk_id": i, "meta_id": f"m{i}", "chunk_index": 0, "source_hash": "h", **attrs} for i in range(2)]
+    index_bundle.save_index_bundle(str(tmp_path), index, index_bundle.IdStore.from_rows(rows))
+    # chunk 0은 2023년 첨부파일 문서의 같은 문구(chunk 9)를 대표한다
+    dup = {"chunk_id": 9, "meta_id": "m9", "year": 2023, "source_type": "file", "department": "", "segment": "file"}
+    (tmp_path / "duplicates.json").write_text(json.dumps({"0": {"also_in": ["m9"], "duplicates": [dup]}}))
+
+    engine = retrieval_engine.RetrievalEngine(str(tmp_path), embeddings=emb)
+    engine._batcher = None
+    hits = engine.search("장학금 안내", k=2, filters={"year": 2023, "source_type": "file"})
+    assert [h["chunk_id"] for h in hits] == [0]
+    assert hits[0]["also_in"] == ["m9"]
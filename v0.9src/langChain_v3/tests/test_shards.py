@@ -0,0 +1,92 @@
+# 샤드 정의: 세그먼트 분류 / 필터 → 샤드 / 거리 보정 / 샤드 결과 병합
+import pytest
+
+np = pytest.importorskip("numpy")
+shards = pytest.importorskip("langChain_v3.shards")
+
+
+def test_segment_of_and_shards_for_filters():
+    assert shards.segment_of("manual_yo_2024", None, None) == "manual"
+    assert shards.segment_of("m1", "https://x/subview.do", "a.pdf") == "file"
+    assert shards.segment_of("m1", "https://x/artclView.do", None) == "board"
+    assert shards.segment_of("m1", "https://x/subview.do", None) == "subview"
+    assert shards.segment_of("m1", "https://x/page.html", None) == "etc"
+
+    assert shards.shards_for_filters({"source_type": "file"}) == ("file", "manual")
+    assert "file" not in shards.shards_for_filters({"source_type": "html"})
+    assert shards.shards_for_filters({"year": 2025}) is None
+    assert shards.shards_for_filters(None) is None
+
+
+@pytest.mark.parametrize(
+    "meta_id, url, file_path",
+    [
+        ("manual_yo_2024", None, "요람_2024.pdf"),
+        ("manual_yo_2024_html", "https://x/subview.do", None),
+        ("m1", "https://x/subview.do", "a.pdf"),
+        ("m2", "https://x/artclView.do", None),
+        ("m3", "https://x/page.html", None),
+    ],
+)
+def test_source_type_filter_routes_to_document_shard(meta_id, url, file_path):
+    filters = pytest.importorskip("langChain_v3.filters")
+    source_type = filters.document_attrs(meta_id, None, file_path)["source_type"]
+    routed = shards.shards_for_filters({"source_type": source_type})
+    # 요람 PDF(manual_yo_ + file_path)도 source_type=file 검색에서 빠지지 않는다
+    assert routed is None or shards.segment_of(meta_id, url, file_path) in routed
+
+
+def test_calibrated_score_is_z_score_of_distance():
+    assert shards.calibrated_score(0.5, None) == -0.5
+    assert shards.calibrated_score(0.5, {"mean": 1.0, "std": 0.25}) == pytest.approx(2.0)
+
+
+def _hit(chunk_id, score):
+    return {"chunk_id": chunk_id, "score": score}
+
+
+def test_merge_uses_calibrated_scores_across_shards():
+    # 조밀한 manual 샤드는 거리 0.4도 평범한 편, board의 0.6은 그 샤드에서 아주 가까운 편
+    results = {
+        "manual": ([[_hit(1, 0.4), _hit(2, 0.45)]], {"mean": 0.5, "std": 0.1}),
+        "board": ([[_hit(3, 0.6)]], {"mean": 1.2, "std": 0.2}),
+    }
+    merged = shards.merge_shard_hits(results, ["board", "manual"], num_queries=1, k=2)
+
+    assert [h["chunk_id"] for h in merged[0]] == [3, 1]
+    assert merged[0][0]["shard"] == "board"
+    assert merged[0][0]["calibrated_score"] == pytest.approx(3.0)
+    # 원래 L2 거리는 score에 그대로 남는다
+    assert merged[0][1]["score"] == 0.4
+
+
+def test_merge_skips_missing_shards_and_keeps_queries_apart():
+    results = {
+        "file": ([[_hit(1, 0.1)], [_hit(2, 0.2), _hit(3, 0.3)]], None),
+    }
+    merged = shards.merge_shard_hits(results, ["file", "board"], num_queries=2, k=5)
+    assert [[h["chunk_id"] for h in hits] for hits in merged] == [[1], [2, 3]]
+    assert shards.merge_shard_hits({}, ["board"], num_queries=1, k=5) == [[]]
+
+
+def test_calibrate_shard_excludes_self_matches():
+    faiss = pytest.importorskip("faiss")
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(50, 8)).astype("float32")
+    index = faiss.IndexFlatL2(8)
+    index.add(vectors)
+    calibration = shards.calibrate_shard(index, vectors, k=5, sample=20)
+    assert calibration["sample"] == 20
+    assert calibration["mean"] > 0
+    assert calibration["std"] > 0
+
+
+def test_merge_keeps_one_copy_of_chunk_placed_in_several_shards():
+    results = {
+        "board": ([[_hit(1, 0.5), _hit(2, 0.9)]], {"mean": 1.0, "std": 0.5}),
+        "file": ([[_hit(1, 0.3), _hit(3, 0.8)]], {"mean": 1.0, "std": 0.5}),
+    }
+    merged = shards.merge_shard_hits(results, ["board", "file"], num_queries=1, k=3)[0]
+    assert [h["chunk_id"] for h in merged] == [1, 3, 2]
+    # 더 가까웠던 샤드의 hit가 남는다
+    assert merged[0]["shard"] == "file"
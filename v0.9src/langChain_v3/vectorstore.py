@@ -1,9 +1,14 @@
 # rag_engine/vectorstore.py
 import os
+import json
 import logging
+import uuid
+from datetime import datetime
 from pathlib import Path
-from typing import Tuple, Optional, Any
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
 from langchain_community.vectorstores.utils import DistanceStrategy
 
@@ -11,26 +16,171 @@ from .embeddings import load_embedding_model
 from .chunker import rebuild_chunks
 from .documents import build_documents_from_chunks
 from .mapping import save_faiss_mapping
+from .lexical_index import get_lexical_index
+from .index_bundle import FAISS_MMAP, IdStore, has_bundle, load_index_bundle, save_index_bundle
+from .dedup import DUPLICATES_FILE, save_duplicate_map
+from .shards import DEFAULT_SHARD_DIR, SHARD_MANIFEST_FILE, SHARD_NAMES, calibrate_shard
+from .index_factory import (
+    INDEX_PARAMS_FILE,
+    RESCORE_VECTORS_FILE,
+    apply_search_params,
+    build_faiss_index,
+    compression_report,
+    default_rescore,
+    default_search_params,
+    load_index_params,
+    save_build_report,
+    save_index_params,
+    save_rescore_vectors,
+    search_param_sweep,
+)
 
 # Aidata 루트는 v0.9src/aidata 정션을 따라 실제 공용 데이터 디렉터리로 연결된다.
 AIDATA_DIR = Path(__file__).resolve().parents[1] / "aidata"
 DEFAULT_INDEX_DIR = str(AIDATA_DIR / "faiss_index")
+DEFAULT_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat").strip().lower()
+DEFAULT_COMPRESSION = os.getenv("FAISS_COMPRESSION", "none").strip().lower()
+# 압축 인덱스에서 k * REFINE_FACTOR개 후보를 뽑아 원본 벡터로 재채점
+DEFAULT_REFINE_FACTOR = int(os.getenv("FAISS_REFINE_FACTOR", "4"))
 
 logger = logging.getLogger(__name__)
 
 
+def _embed_documents(documents: List[Any], embeddings: Any, batch_size: int) -> np.ndarray:
+    """Document 리스트 → [N, d] float32 (배치 단위 + 진행률 로그)."""
+    if batch_size <= 0:
+        raise ValueError("batch_size는 1 이상이어야 합니다.")
+    total_docs = len(documents)
+    parts = []
+    for start in range(0, total_docs, batch_size):
+        end = min(start + batch_size, total_docs)
+        logger.info("Embedding progress: %d/%d", end, total_docs)
+        batch_texts = [d.page_content for d in documents[start:end]]
+        parts.append(np.asarray(embeddings.embed_documents(batch_texts), dtype="float32"))
+    return np.vstack(parts)
+
+
+def _save_index_dir(
+    index_dir: str,
+    documents: List[Any],
+    vectors: np.ndarray,
+    *,
+    index_type: str,
+    nlist: Optional[int],
+    nprobe: Optional[int],
+    ef_search: Optional[int],
+    compression: str,
+    rescore: Optional[bool],
+    refine_factor: int,
+    report: bool,
+    calibrate: bool = False,
+) -> Tuple[Any, IdStore, Dict[str, Any]]:
+    """
+    임베딩된 Document → FAISS 인덱스 생성 후 index_dir에 번들/검색 파라미터/리포트 저장.
+    build_vectorstore(단일 인덱스)와 build_sharded_vectorstore(세그먼트별 인덱스)가 공유한다.
+    calibrate면 샤드 간 점수 보정용 거리 분포를 index_params.json의 calibration에 남긴다.
+    반환: (index, IdStore, 저장한 검색 파라미터)
+    """
+    logger.info("[STEP] FAISS 인덱스 생성 (type=%s)", index_type)
+    index, info = build_faiss_index(vectors, index_type, nlist=nlist, compression=compression)
+
+    params = default_search_params(info)
+    # 압축 코드로 인한 거리 오차는 원본 벡터 재채점으로 보정 (Flat float32면 불필요)
+    # None이면 PQ만 재채점: fp16/sq8에 float32 사본을 남기면 압축으로 줄인 디스크/캐시를 다시 쓴다
+    if rescore is None:
+        rescore = default_rescore(info["compression"])
+    rescore = rescore and info["compression"] != "none"
+    if rescore:
+        params["refine_factor"] = max(1, int(refine_factor))
+    if nprobe is not None:
+        params["nprobe"] = nprobe
+    if ef_search is not None:
+        params["efSearch"] = ef_search
+    apply_search_params(index, params)
+    if calibrate:
+        params["calibration"] = calibrate_shard(index, vectors)
+
+    logger.info("[STEP] 인덱스 번들 저장: %s", index_dir)
+    os.makedirs(index_dir, exist_ok=True)
+    ids = IdStore.from_rows(d.metadata for d in documents)
+
+    def write_vectors() -> None:
+        # vectors.npy: 압축 인덱스의 재채점용이자, Flat 인덱스를 mmap으로 검색할 때의 원본
+        if rescore or info.get("factory") == "Flat":
+            save_rescore_vectors(index_dir, vectors)
+            return
+        stale = os.path.join(index_dir, RESCORE_VECTORS_FILE)
+        if os.path.exists(stale):
+            os.remove(stale)
+
+    # 부가 파일은 manifest(bundle.json)보다 먼저 쓴다 → manifest가 보이면 한 빌드의 파일 묶음이 완성된 상태
+    save_index_bundle(
+        index_dir,
+        index,
+        ids,
+        extra={"factory": info.get("factory")},
+        side_files={
+            RESCORE_VECTORS_FILE: write_vectors,
+            # 근사 중복으로 빠진 청크 → 대표 청크 매핑 (검색 결과의 also_in 인용용)
+            DUPLICATES_FILE: lambda: save_duplicate_map(index_dir, documents),
+            INDEX_PARAMS_FILE: lambda: save_index_params(index_dir, {**info, **params, "rescore": rescore}),
+        },
+    )
+
+    if report:
+        logger.info("[STEP] recall-latency 리포트 생성 (vs Flat)")
+        build_report = search_param_sweep(index, vectors, info, params)
+        if info["compression"] != "none":
+            build_report["compression"] = compression_report(
+                index,
+                vectors,
+                info,
+                refine_factor=params.get("refine_factor", DEFAULT_REFINE_FACTOR),
+                rescore=rescore,
+            )
+            logger.info(
+                "[INFO] 압축=%s 상주 메모리 %.2fx 축소 (디스크 %.2fx, 재채점 질의당 %d bytes), "
+                "recall 압축만=%.4f / 재채점=%.4f",
+                info["compression"],
+                build_report["compression"]["memory_reduction"] or 0.0,
+                build_report["compression"]["disk_reduction"] or 0.0,
+                build_report["compression"]["rescore_touched_bytes_per_query"],
+                build_report["compression"]["recall_at_k_compressed"],
+                build_report["compression"]["recall_at_k_rescored"],
+            )
+        save_build_report(index_dir, build_report)
+        logger.info("[INFO] recall@%d = %.4f", build_report["configured"]["k"], build_report["configured"]["recall_at_k"])
+
+    return index, ids, params
+
+
 def build_vectorstore(
     index_dir: str = DEFAULT_INDEX_DIR,
     chunk_size: int = 500,
     overlap: int = 100,
     limit: Optional[int] = None,      # 10개 테스트 같은 제한 옵션
     batch_size: int = 128,            # 임베딩 진행률 로그를 위해 배치 단위로 처리
+    index_type: str = DEFAULT_INDEX_TYPE,  # "flat" | "ivf_flat" | "ivf_pq" | "hnsw"
+    nlist: Optional[int] = None,      # IVF 리스트 수 (None이면 ~4*sqrt(N))
+    nprobe: Optional[int] = None,     # IVF 검색 시 탐색 리스트 수 (index_params.json에 저장)
+    ef_search: Optional[int] = None,  # HNSW 검색 폭 (index_params.json에 저장)
+    compression: str = DEFAULT_COMPRESSION,  # "none" | "fp16" | "sq8" | "pq"
+    rescore: Optional[bool] = None,   # 압축 시 원본 벡터(vectors.npy)를 남겨 검색 후 정확 재채점 (None: PQ만)
+    refine_factor: int = DEFAULT_REFINE_FACTOR,
+    report: bool = True,              # Flat 대비 recall-latency 리포트(build_report.json) 생성
+    lexical: bool = True,             # BM25 역색인(lexical_index.sqlite)도 source_hash 기준으로 증분 갱신
+    legacy_pickle: bool = False,      # 구버전 호환용 LangChain index.pkl(docstore 피클)도 저장
 ) -> Tuple[FAISS, Any]:
     """
     1) TestMain(clean_data 우선) → chunks 재구성 (DB에 저장)
+       (+ 바뀐 문서만 BM25 역색인 갱신)
     2) chunks → LangChain Document 리스트 생성
-    3) Document 임베딩 → FAISS 인덱스 생성 (배치 처리 + 진행률 로그)
-    4) 인덱스 로컬 저장 + faiss_mapping 테이블 업데이트
+    3) Document 임베딩 (배치 처리 + 진행률 로그)
+    4) index_type/compression에 맞는 FAISS 인덱스 생성 (IVF/SQ/PQ 계열은 샘플로 학습)
+    5) 인덱스 번들 저장(index.faiss + ID 컬럼 .npy, 피클 없음) + 검색 파라미터/리포트 저장
+       + faiss_mapping 테이블 업데이트
+
+    반환하는 FAISS 객체는 빌드 직후 메모리 상의 것이며, 서버는 번들(load_index)로 로드한다.
     """
 
     logger.info("[STEP] TestMain → chunks 재구성")
@@ -40,6 +190,10 @@ def build_vectorstore(
         limit=limit,
     )
 
+    if lexical:
+        logger.info("[STEP] BM25 역색인 동기화")
+        get_lexical_index().sync()
+
     logger.info("[STEP] chunks → Document 리스트 생성")
     documents = build_documents_from_chunks()
     total_docs = len(documents)
@@ -48,49 +202,155 @@ def build_vectorstore(
     logger.info("[STEP] 임베딩 모델 로드")
     embeddings = load_embedding_model()
 
-    logger.info("[STEP] FAISS 인덱스 생성 (batched)")
     if total_docs == 0:
         raise ValueError("Document가 0개입니다. chunks 생성/조회 로직을 확인해주세요.")
 
-    if batch_size <= 0:
-        raise ValueError("batch_size는 1 이상이어야 합니다.")
+    logger.info("[STEP] Document 임베딩 (batched)")
+    vectors = _embed_documents(documents, embeddings, batch_size)
 
-    vectorstore: Optional[FAISS] = None
+    index, ids, _ = _save_index_dir(
+        index_dir,
+        documents,
+        vectors,
+        index_type=index_type,
+        nlist=nlist,
+        nprobe=nprobe,
+        ef_search=ef_search,
+        compression=compression,
+        rescore=rescore,
+        refine_factor=refine_factor,
+        report=report,
+    )
 
-    for start in range(0, total_docs, batch_size):
-        end = min(start + batch_size, total_docs)
-        logger.info("Embedding progress: %d/%d", end, total_docs)
+    docstore_ids = [str(uuid.uuid4()) for _ in documents]
+    vectorstore = FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore(dict(zip(docstore_ids, documents))),
+        index_to_docstore_id=dict(enumerate(docstore_ids)),
+        distance_strategy=DistanceStrategy.COSINE,
+    )
+    legacy_path = os.path.join(index_dir, "index.pkl")
+    if legacy_pickle:
+        vectorstore.save_local(index_dir)
+    elif os.path.exists(legacy_path):
+        os.remove(legacy_path)
+
+    logger.info("[STEP] faiss_mapping 테이블 저장")
+    save_faiss_mapping(ids)
 
-        batch_docs = documents[start:end]
+    logger.info("[DONE] FAISS 인덱스 빌드 완료")
+    return vectorstore, embeddings
 
-        if vectorstore is None:
-            vectorstore = FAISS.from_documents(
-                batch_docs,
-                embedding=embeddings,
-                distance_strategy=DistanceStrategy.COSINE,
-            )
-        else:
-            vectorstore.add_documents(batch_docs)
 
-    assert vectorstore is not None  # 위에서 total_docs==0 방어했으니 여기선 항상 존재
+def build_sharded_vectorstore(
+    index_dir: str = DEFAULT_SHARD_DIR,
+    shards: Optional[Iterable[str]] = None,  # None이면 전체 세그먼트, ["board"]처럼 일부만 재빌드 가능
+    chunk_size: int = 500,
+    overlap: int = 100,
+    limit: Optional[int] = None,
+    batch_size: int = 128,
+    index_type: str = DEFAULT_INDEX_TYPE,
+    nlist: Optional[int] = None,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    compression: str = DEFAULT_COMPRESSION,
+    rescore: Optional[bool] = None,
+    refine_factor: int = DEFAULT_REFINE_FACTOR,
+    report: bool = False,
+    rechunk: bool = True,             # chunks 재구성(+ BM25 동기화)부터 할지
+    lexical: bool = True,
+) -> Dict[str, Any]:
+    """
+    세그먼트(board / subview / file / manual / etc)별로 독립된 인덱스를 index_dir/<segment>/에 빌드.
+
+    - 지정한 샤드만 임베딩/저장하므로 공지 게시판 갱신 시 요람을 다시 임베딩하지 않는다.
+    - 샤드마다 L2 거리 분포(calibration)를 index_params.json에 남겨 라우터가 z-score로 병합한다.
+    - 서버의 각 샤드 엔진은 자기 디렉터리 시그니처만 보므로 바뀐 샤드만 다시 로드된다.
+    - faiss_mapping 테이블은 단일 인덱스 기준이라 샤드 빌드에서는 갱신하지 않는다.
+
+    반환: shards.json 내용 (샤드별 문서 수 / 빌드 시각 / calibration)
+    """
+    targets = list(shards) if shards is not None else list(SHARD_NAMES)
+    unknown = [name for name in targets if name not in SHARD_NAMES]
+    if unknown:
+        raise ValueError(f"알 수 없는 샤드: {unknown} (가능: {SHARD_NAMES})")
+
+    if rechunk:
+        logger.info("[STEP] TestMain → chunks 재구성")
+        rebuild_chunks(chunk_size=chunk_size, overlap=overlap, limit=limit)
+        if lexical:
+            logger.info("[STEP] BM25 역색인 동기화")
+            get_lexical_index().sync()
+
+    logger.info("[STEP] chunks → Document 리스트 생성 (세그먼트별 분류)")
+    by_segment: Dict[str, List[Any]] = {}
+    for doc in build_documents_from_chunks():
+        # 다른 세그먼트의 근사 중복을 대표하는 청크는 그 세그먼트 샤드에도 넣는다 (라우팅에서 빠지지 않도록)
+        for segment in doc.metadata.get("segments") or [doc.metadata.get("segment") or "etc"]:
+            by_segment.setdefault(segment, []).append(doc)
 
-    logger.info("[STEP] 인덱스 로컬 저장: %s", index_dir)
     os.makedirs(index_dir, exist_ok=True)
-    vectorstore.save_local(index_dir)
+    manifest_path = os.path.join(index_dir, SHARD_MANIFEST_FILE)
+    manifest: Dict[str, Any] = {"shards": {}}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
 
-    logger.info("[STEP] faiss_mapping 테이블 저장")
-    save_faiss_mapping(vectorstore)
+    embeddings = None
+    for name in targets:
+        documents = by_segment.get(name, [])
+        if not documents:
+            logger.info("[SKIP] 샤드 %s: Document 없음", name)
+            continue
+        if embeddings is None:
+            logger.info("[STEP] 임베딩 모델 로드")
+            embeddings = load_embedding_model()
 
-    logger.info("[DONE] FAISS 인덱스 빌드 완료")
-    return vectorstore, embeddings
+        logger.info("[STEP] 샤드 %s: Document %d개 임베딩", name, len(documents))
+        vectors = _embed_documents(documents, embeddings, batch_size)
+        shard_dir = os.path.join(index_dir, name)
+        _, _, params = _save_index_dir(
+            shard_dir,
+            documents,
+            vectors,
+            index_type=index_type,
+            nlist=nlist,
+            nprobe=nprobe,
+            ef_search=ef_search,
+            compression=compression,
+            rescore=rescore,
+            refine_factor=refine_factor,
+            report=report,
+            calibrate=True,
+        )
+        calibration = params["calibration"]
+        manifest["shards"][name] = {
+            "documents": len(documents),
+            "built_at": datetime.now().isoformat(timespec="seconds"),
+            "calibration": calibration,
+        }
+        logger.info("[INFO] 샤드 %s 완료: %d vectors, calibration=%s", name, len(documents), calibration)
+
+    tmp = f"{manifest_path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, manifest_path)
+
+    logger.info("[DONE] 샤드 인덱스 빌드 완료: %s", targets)
+    return manifest
 
 
 def load_vectorstore(
     index_dir: str = DEFAULT_INDEX_DIR,
+    embeddings: Optional[Any] = None,
 ) -> Tuple[FAISS, Any]:
     """
     기존 FAISS 인덱스를 로드.
     없으면 예외 발생.
+
+    embeddings를 넘기면 임베딩 모델을 새로 만들지 않고 재사용한다.
+    (인덱스만 교체할 때 모델 재로드 비용을 피하기 위함)
     """
     index_path = os.path.join(index_dir, "index.faiss")
     if not os.path.exists(index_path):
@@ -98,10 +358,32 @@ def load_vectorstore(
             f"FAISS 인덱스({index_path})가 없습니다. 먼저 build_vectorstore()를 실행하세요."
         )
 
-    embeddings = load_embedding_model()
+    if embeddings is None:
+        embeddings = load_embedding_model()
     vectorstore = FAISS.load_local(
         index_dir,
         embeddings,
         allow_dangerous_deserialization=True,
     )
+    # 빌드 시 저장한 nprobe / efSearch 적용 (Flat이면 아무 것도 안 함)
+    apply_search_params(vectorstore.index, load_index_params(index_dir))
     return vectorstore, embeddings
+
+
+def load_index(
+    index_dir: str = DEFAULT_INDEX_DIR,
+    embeddings: Optional[Any] = None,
+    mmap: bool = FAISS_MMAP,
+) -> Tuple[Any, IdStore, bool]:
+    """
+    검색용 (faiss index, IdStore, mmap 여부) 로드.
+    번들(bundle.json)이 있으면 피클 없이 (기본 read-only mmap으로) 로드하고,
+    없으면 구버전 LangChain 인덱스(index.pkl)를 읽어 ID 컬럼으로 변환한다. (mmap 불가)
+    """
+    if has_bundle(index_dir):
+        index, ids, manifest = load_index_bundle(index_dir, mmap=mmap)
+        apply_search_params(index, load_index_params(index_dir))
+        return index, ids, bool(manifest.get("mmap"))
+
+    vectorstore, _ = load_vectorstore(index_dir=index_dir, embeddings=embeddings)
+    return vectorstore.index, IdStore.from_vectorstore(vectorstore), False
@@ -13,3 +13,74 @@ export async function askChat(question: string) {
 
   return res.json();
 }
+
+export interface ChatStreamHandlers {
+  onSources?: (contexts: any[]) => void;
+  onToken?: (text: string) => void;
+  onDone?: (data: any) => void;
+}
+
+// POST /api/chat/stream (Server-Sent Events)
+// event 순서: sources → token(여러 번) → done  (실패 시 error)
+export async function streamChat(question: string, handlers: ChatStreamHandlers = {}) {
+  const res = await fetch("/api/chat/stream", {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      Accept: "text/event-stream",
+    },
+    body: JSON.stringify({ question }),
+  });
+
+  if (!res.ok || !res.body) {
+    throw new Error("Chat stream API failed");
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let result: any = null;
+
+  const dispatch = (raw: string) => {
+    let event = "message";
+    const dataLines: string[] = [];
+    for (const line of raw.split("\n")) {
+      if (line.startsWith("event:")) {
+        event = line.slice(6).trim();
+      } else if (line.startsWith("data:")) {
+        dataLines.push(line.slice(5).trimStart());
+      }
+    }
+    if (dataLines.length === 0) return;
+    const data = JSON.parse(dataLines.join("\n"));
+
+    if (event === "sources") {
+      handlers.onSources?.(data.contexts ?? []);
+    } else if (event === "token") {
+      handlers.onToken?.(data.text ?? "");
+    } else if (event === "done") {
+      result = data;
+      handlers.onDone?.(data);
+    } else if (event === "error") {
+      throw new Error(data.detail || "Chat stream failed");
+    }
+  };
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true }).replace(/\r\n/g, "\n");
+
+    let sep = buffer.indexOf("\n\n");
+    while (sep !== -1) {
+      dispatch(buffer.slice(0, sep));
+      buffer = buffer.slice(sep + 2);
+      sep = buffer.indexOf("\n\n");
+    }
+  }
+  if (buffer.trim()) {
+    dispatch(buffer);
+  }
+
+  return result;
+}
@@ -6,7 +6,7 @@ import { ChatInput } from "@/components/ChatInput";
 import { WelcomeScreen } from "@/components/WelcomeScreen";
 import { Button } from "@/components/ui/button";
 import { Moon, Sun, Home, ArrowUp } from "lucide-react";
-import { askChat } from "@/lib/chatApi";
+import { streamChat } from "@/lib/chatApi";
 // import { ChatMessageData  } from "../types/chat";
 
 //todo: remove mock functionality - these are example messages for design prototype
@@ -147,26 +147,50 @@ export default function ChatPage() {
       setMessages(prev => [...prev, userMessage]);
     }
 
-    // Add bot's response after a short delay
-    try {
-      const data = await askChat(content);
+    // 답변은 스트리밍으로 받아 토큰이 도착하는 대로 말풍선에 붙인다.
+    const timestamp = new Date().toLocaleTimeString("ko-KR", {
+      hour: "2-digit",
+      minute: "2-digit",
+    });
+    let started = false;
+    let streamedText = "";
+    let streamedContexts: any[] | undefined;
 
-      const aiMessage: ChatMessageProps = {
-        role: "assistant",
-        content: data.reply,
-        timestamp: new Date().toLocaleTimeString("ko-KR", {
-          hour: "2-digit",
-          minute: "2-digit",
-        }),
-        contexts: data.contexts,   // 🔥 여기
-      };
+    const upsertAiMessage = (patch: Partial<ChatMessageProps>) => {
+      if (!started) {
+        started = true;
+        const aiMessage: ChatMessageProps = { role: "assistant", content: "", timestamp, ...patch };
+        setMessages(prev => [...prev, aiMessage]);
+        return;
+      }
+      setMessages(prev => {
+        const next = [...prev];
+        next[next.length - 1] = { ...next[next.length - 1], ...patch };
+        return next;
+      });
+    };
 
-      setMessages(prev => [...prev, aiMessage]);
+    try {
+      const data = await streamChat(content, {
+        onSources: (contexts) => {
+          streamedContexts = contexts;
+          upsertAiMessage({ contexts });
+        },
+        onToken: (text) => {
+          streamedText += text;
+          upsertAiMessage({ content: streamedText });
+        },
+      });
+
+      upsertAiMessage({
+        content: data?.reply ?? streamedText,
+        contexts: streamedContexts ?? data?.contexts,   // 🔥 여기
+      });
 
       // 선택: 출처 기반 추천
-      if (data.sources) {
+      if (data?.sources && streamedContexts) {
         setSuggestions(
-          data.contexts
+          streamedContexts
             .map((c: any) => c.title)
             .filter(Boolean)
             .slice(0, 3)
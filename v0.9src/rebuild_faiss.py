@@ -1,5 +1,6 @@
 import os, shutil
-from langChain_v3.vectorstore import build_vectorstore, load_vectorstore, DEFAULT_INDEX_DIR
+import numpy as np
+from langChain_v3.vectorstore import build_vectorstore, load_index, DEFAULT_INDEX_DIR
 from langChain_v3.embeddings import load_embedding_model
 
 def main():
@@ -25,12 +26,13 @@ def main():
     )
     print("Built: d =", vs.index.d, "ntotal =", vs.index.ntotal)
 
-    # 4) 로드 + 검색 테스트
-    vs2, _ = load_vectorstore(index_dir=DEFAULT_INDEX_DIR)
-    print("Loaded: d =", vs2.index.d, "ntotal =", vs2.index.ntotal)
+    # 4) 번들 로드 + 검색 테스트
+    index, ids, _ = load_index(index_dir=DEFAULT_INDEX_DIR)
+    print("Loaded: d =", index.d, "ntotal =", index.ntotal, "ids =", len(ids))
 
-    out = vs2.similarity_search_with_score("일반 휴학 최대 몇 학기", k=3)
-    print("Search OK, top1 score =", out[0][1])
+    q = np.asarray([emb.embed_query("일반 휴학 최대 몇 학기")], dtype="float32")
+    D, I = index.search(q, 3)
+    print("Search OK, top1 score =", D[0][0], "chunk =", ids.row(int(I[0][0])))
 
 if __name__ == "__main__":
     main()